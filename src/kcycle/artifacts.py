@@ -0,0 +1,445 @@
+"""
+RacePredictor 를 버전이 있는 디렉터리 번들로 저장·로드합니다.
+
+pickle 은 모델 클래스를 되살리느라 로드할 때 sklearn · lightgbm 을 import 하고
+(그것만 ~2초), 라이브러리 버전이 바뀌면 읽지 못할 수 있습니다. 번들은 학습 산출물을
+라이브러리에 묶이지 않는 형식으로 나눠 담습니다.
+
+    model/
+      manifest.json          형식 이름·버전, 모델 종류, 파일 목록(크기)
+      pipeline.json          RaceFeaturePipeline 의 fit 통계와 범주 어휘
+      scale_mean.npy         표준화 (mean, std). 표준화하지 않았으면 없음
+      scale_std.npy
+      slot0/ ... slot6/      슬롯별 부스터 (RaceRanker 는 ranker/ 하나)
+        model.txt            LightGBM 모델 파일 (backend='lightgbm')
+        nodes.npy            트리 노드 배열 (backend='numpy')
+        values.npy
+        cats.npy
+        roots.npy
+
+- 배열은 np.load(mmap_mode='r') 로 열어 로드할 때 읽거나 복사하지 않습니다.
+- backend='numpy'(기본)는 트리를 NumPy 로 직접 평가하므로 sklearn · lightgbm 을 import 하지 않습니다.
+  backend='lightgbm' 은 model.txt 를 lightgbm.Booster 로 읽으며, 그때만 lightgbm 을 import 합니다.
+  두 backend 의 점수는 같습니다 (부동소수 합산 순서 차이 이내).
+- 경주 수가 많은 일괄 예측은 backend='lightgbm' 이 빠릅니다. numpy backend 는 당일 출주표처럼
+  작은 입력에서 시작 시간을 줄이기 위한 것입니다.
+- LightGBM 부스터(LGBMClassifier 슬롯, LGBMRanker)만 저장할 수 있습니다. 다른 모델은 pickle 을 씁니다.
+
+    from kcycle.artifacts import save_bundle, load_bundle
+
+    save_bundle(predictor, 'model')                        # RacePredictor.save('model') 와 같음
+    predictor = load_bundle('model')                       # RacePredictor.load('model')
+
+    python -m kcycle.artifacts model.pkl model             # 기존 pickle → 번들
+"""
+import os
+import json
+import math
+import shutil
+import argparse
+import datetime
+from pathlib import Path
+
+import numpy as np
+
+FORMAT = 'kcycle.bundle'
+VERSION = 1
+
+MANIFEST = 'manifest.json'
+PIPELINE = 'pipeline.json'
+SCALE_FILES = ('scale_mean.npy', 'scale_std.npy')
+TREE_ARRAYS = ('nodes', 'values', 'cats', 'roots')
+
+BACKENDS = ('numpy', 'lightgbm')
+
+# ───── 파이프라인 ─────────────────────────────────────────────────────────
+
+def _json_value(v):
+    # numpy 스칼라 → 파이썬 값, NaN → null
+    v = v.item() if isinstance(v, np.generic) else v
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+
+def pipeline_state(pipeline) -> dict:
+    """ fit 된 RaceFeaturePipeline → JSON 으로 쓸 수 있는 dict (partial_fit 누적 상태는 빠집니다) """
+    return {
+        'cat_cols':       list(pipeline.cat_cols),
+        'unused_cols':    list(pipeline.unused_cols),
+        'columns_':       list(pipeline.columns_),
+        'constant_cols_': list(pipeline.constant_cols_),
+        'vocab_':         {col: [_json_value(v) for v in vocab] for col, vocab in pipeline.vocab_.items()},
+        # 등급 → 평균 사전은 키 순서를 지키려고 [등급, 평균] 목록으로 씁니다
+        'group_means_':   {
+            col: [[_json_value(g), _json_value(m)] for g, m in means.items()]
+            for col, means in pipeline.group_means_.items()
+        },
+    }
+
+
+def pipeline_from_state(state: dict):
+    """ pipeline_state 결과 → transform 할 수 있는 RaceFeaturePipeline (다시 fit 하지 않음) """
+    from kcycle.features import RaceFeaturePipeline
+
+    pipe = RaceFeaturePipeline(state['cat_cols'], state['unused_cols'])
+    pipe.columns_       = list(state['columns_'])
+    pipe.constant_cols_ = list(state['constant_cols_'])
+    pipe.vocab_         = {col: list(vocab) for col, vocab in state['vocab_'].items()}
+    pipe.group_means_   = {
+        col: {g: math.nan if m is None else m for g, m in pairs}
+        for col, pairs in state['group_means_'].items()
+    }
+    return pipe
+
+
+# ───── 트리 앙상블 ────────────────────────────────────────────────────────
+
+# nodes 열: 피처 번호(잎은 -1), 왼쪽, 오른쪽(잎은 자기 자신), 범주 분기 번호(숫자 분기는 -1), 플래그
+_FEATURE, _LEFT, _RIGHT, _CAT, _FLAGS = range(5)
+# values 열: 임계값, 잎 값
+_THRESHOLD, _LEAF = range(2)
+
+# 플래그: bit0 = default_left, bit1-2 = missing_type
+_MISSING = {'None': 0, 'Zero': 1, 'NaN': 2}
+_ZERO_THRESHOLD = 1e-35             # LightGBM kZeroThreshold
+
+# 한 번에 평가하는 (행 수 × 트리 수) 상한
+_CHUNK = 1 << 20
+
+
+def _objective(spec: str) -> tuple:
+    """ LightGBM objective 문자열 → (출력 변환, 계수) """
+    name, *params = spec.split()
+    params = dict(p.split(':', 1) for p in params)
+    if name in ('binary', 'cross_entropy'):
+        return 'sigmoid', float(params.get('sigmoid', 1.0))
+    if name == 'multiclass':
+        return 'softmax', 1.0
+    if name in ('lambdarank', 'rank_xendcg') or name.startswith('regression') or name in ('huber', 'fair', 'quantile', 'mape'):
+        return 'identity', 1.0
+    raise ValueError(f"번들로 저장할 수 없는 objective: {spec}")
+
+
+class TreeEnsemble:
+    """
+    LightGBM 부스터의 트리를 노드 배열로 펼쳐 NumPy 로 평가합니다.
+
+    잎 노드는 왼쪽·오른쪽 자식이 자기 자신이므로, 모든 (행, 트리)를 최대 깊이만큼
+    한꺼번에 한 단계씩 내려가면 잎에 도착합니다. 분기 규칙은 LightGBM 과 같습니다
+    (숫자: missing_type · default_left, 범주: 정수로 자른 값이 왼쪽 집합에 있는지).
+    """
+
+    def __init__(self, nodes, values, cats, roots, meta: dict):
+        self.nodes  = nodes
+        self.values = values
+        self.cats   = cats
+        self.roots  = roots
+        self.meta   = meta
+        self.output, self.scale = _objective(meta['objective'])
+        self._has_cat = bool(cats.any())
+
+    @classmethod
+    def from_booster(cls, booster) -> 'TreeEnsemble':
+        """ lightgbm.Booster (best_iteration 이 있으면 거기까지) → TreeEnsemble """
+        model = booster.dump_model()
+        nodes, values, cat_sets, roots = [], [], [], []
+
+        def add(n) -> int:
+            i = len(nodes)
+            nodes.append([-1, i, i, -1, 0])
+            values.append([0.0, 0.0])
+            if 'split_feature' not in n:
+                values[i][_LEAF] = n['leaf_value']
+                return i
+            if n['decision_type'] == '==':
+                nodes[i][_CAT] = len(cat_sets)
+                cat_sets.append([int(c) for c in str(n['threshold']).split('||')])
+            elif n['decision_type'] == '<=':
+                values[i][_THRESHOLD] = n['threshold']
+            else:
+                raise ValueError(f"지원하지 않는 분기: {n['decision_type']}")
+            nodes[i][_FEATURE] = n['split_feature']
+            nodes[i][_FLAGS]   = int(n['default_left']) | _MISSING[n['missing_type']] << 1
+            nodes[i][_LEFT]    = add(n['left_child'])
+            nodes[i][_RIGHT]   = add(n['right_child'])
+            return i
+
+        depth = 0
+        for tree in model['tree_info']:
+            if 'leaf_coeff' in tree['tree_structure']:
+                raise ValueError("linear_tree 모델은 번들로 저장할 수 없습니다.")
+            roots.append(add(tree['tree_structure']))
+            depth = max(depth, _depth(tree['tree_structure']))
+
+        cats = np.zeros((max(1, len(cat_sets)), max([1] + [max(s) + 1 for s in cat_sets])), dtype=bool)
+        for j, s in enumerate(cat_sets):
+            cats[j, s] = True
+
+        meta = {
+            'objective':      model['objective'],
+            'num_class':      model['num_class'],
+            'per_iteration':  model['num_tree_per_iteration'],
+            'average_output': model['average_output'],
+            'n_features':     model['max_feature_idx'] + 1,
+            'depth':          depth,
+        }
+        return cls(
+            np.array(nodes, dtype=np.int32).reshape(-1, 5), np.array(values, dtype=np.float64).reshape(-1, 2),
+            cats, np.array(roots, dtype=np.int32), meta,
+        )
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in TREE_ARRAYS:
+            np.save(path / f'{name}.npy', getattr(self, name))
+
+    @classmethod
+    def load(cls, path, meta: dict, mmap_mode='r') -> 'TreeEnsemble':
+        path = Path(path)
+        arrs = [np.load(path / f'{name}.npy', mmap_mode=mmap_mode) for name in TREE_ARRAYS]
+        return cls(*arrs, meta)
+
+    def _go_left(self, v: np.ndarray, nodes: np.ndarray, node: np.ndarray) -> np.ndarray:
+        flags = nodes[..., _FLAGS]
+        missing = flags >> 1
+        nan = np.isnan(v)
+
+        # 숫자 분기: missing_type 이 NaN 이 아니면 NaN 을 0 으로 보고, 결측이면 default_left 방향
+        num = np.where(nan & (missing != _MISSING['NaN']), 0.0, v)
+        is_missing = (
+            ((missing == _MISSING['Zero']) & (num > -_ZERO_THRESHOLD) & (num <= _ZERO_THRESHOLD))
+            | ((missing == _MISSING['NaN']) & nan)
+        )
+        left = np.where(is_missing, (flags & 1).astype(bool), num <= self.values[node, _THRESHOLD])
+
+        # 범주 분기: NaN · 음수는 오른쪽, 나머지는 정수로 자른 값이 집합에 있으면 왼쪽
+        if self._has_cat:
+            cat  = nodes[..., _CAT]
+            code = np.trunc(np.where(nan, -1.0, v))
+            ok   = (code >= 0) & (code < self.cats.shape[1])
+            in_set = ok & self.cats[np.maximum(cat, 0), np.where(ok, code, 0).astype(np.intp)]
+            left = np.where(cat >= 0, in_set, left)
+        return left
+
+    def raw_score(self, X) -> np.ndarray:
+        """ (n, n_features) → (n, num_class) 트리 합 """
+        X = np.asarray(X)
+        n_trees = len(self.roots)
+        k = self.meta['per_iteration']
+        out = np.zeros((X.shape[0], k), dtype=np.float64)
+        if n_trees == 0:
+            return out
+        tree_class = np.arange(n_trees) % k
+        step = max(1, _CHUNK // n_trees)
+        for s in range(0, X.shape[0], step):
+            x = np.asarray(X[s:s + step], dtype=np.float64)
+            rows = np.arange(x.shape[0])[:, None]
+            node = np.broadcast_to(np.asarray(self.roots, dtype=np.intp), (x.shape[0], n_trees))
+            for _ in range(self.meta['depth']):
+                nodes = self.nodes[node]
+                v = x[rows, np.maximum(nodes[..., _FEATURE], 0)]
+                node = np.where(self._go_left(v, nodes, node), nodes[..., _LEFT], nodes[..., _RIGHT])
+            leaf = self.values[node, _LEAF]
+            for c in range(k):
+                out[s:s + step, c] = leaf[:, tree_class == c].sum(axis=1)
+        if self.meta['average_output']:
+            out /= max(1, n_trees // k)
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        """ lightgbm.Booster.predict 와 같은 출력 (이진: 양성 확률, 다중: 클래스 확률, 랭킹: 점수) """
+        raw = self.raw_score(X)
+        if self.output == 'sigmoid':
+            return 1.0 / (1.0 + np.exp(-self.scale * raw[:, 0]))
+        if self.output == 'softmax':
+            e = np.exp(raw - raw.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        return raw[:, 0] if raw.shape[1] == 1 else raw
+
+
+def _depth(n) -> int:
+    if 'split_feature' not in n:
+        return 0
+    return 1 + max(_depth(n['left_child']), _depth(n['right_child']))
+
+
+# ───── 모델 ──────────────────────────────────────────────────────────────
+
+class BundleModel:
+    """
+    번들에서 읽은 부스터로 MultiOutputRaceClassifier / RaceRanker 와 같은 점수를 냅니다.
+
+    kind='slots'  : 슬롯마다 이진 부스터 하나, 입력은 경주 단위 레이아웃, 점수는 양성 확률
+    kind='ranker' : 부스터 하나, 입력은 선수 단위 레이아웃, predict_proba 는 경주 안 softmax
+    boosters 는 predict(행렬) 를 가진 TreeEnsemble 또는 lightgbm.Booster 입니다.
+    """
+
+    def __init__(self, kind: str, boosters: list, per_race: int = 7):
+        self.kind     = kind
+        self.boosters = boosters
+        self.per_race = per_race
+
+    def _matrix(self, X) -> np.ndarray:
+        from kcycle.tensor import RaceTensor
+
+        if isinstance(X, RaceTensor):
+            return X.per_race() if self.kind == 'slots' else X.per_player()
+        X = np.asarray(X)
+        if X.ndim == 3:
+            return X.reshape(X.shape[0], -1) if self.kind == 'slots' else X.reshape(-1, X.shape[2])
+        return X
+
+    def decision_function(self, X) -> np.ndarray:
+        M = self._matrix(X)
+        if self.kind == 'slots':
+            return np.column_stack([np.asarray(b.predict(M), dtype=np.float64) for b in self.boosters])
+        return np.asarray(self.boosters[0].predict(M), dtype=np.float64).reshape(-1, self.per_race)
+
+    def predict_proba(self, X) -> np.ndarray:
+        s = self.decision_function(X)
+        if self.kind == 'slots':
+            return s
+        s = np.exp(s - s.max(axis=1, keepdims=True))
+        return s / s.sum(axis=1, keepdims=True)
+
+
+def _model_boosters(model) -> tuple:
+    """ 학습한 모델 → (kind, per_race, [(이름, lightgbm.Booster), ...]) """
+    from kcycle.models import MultiOutputRaceClassifier, RaceRanker
+
+    def booster(est):
+        b = getattr(est, 'booster_', None)
+        if b is None:
+            raise ValueError(f"LightGBM 모델이 아닙니다: {type(est).__name__} (pickle 로 저장하세요)")
+        return b
+
+    if isinstance(model, RaceRanker):
+        return 'ranker', model.per_race, [('ranker', booster(model.estimator_))]
+    if isinstance(model, MultiOutputRaceClassifier):
+        for est in model.estimators_:
+            if list(getattr(est, 'classes_', [0, 1])) != [0, 1]:
+                raise ValueError("슬롯 estimator 는 0/1 이진 분류기여야 합니다.")
+        return 'slots', len(model.estimators_), [(f'slot{i}', booster(e)) for i, e in enumerate(model.estimators_)]
+    raise ValueError(f"번들로 저장할 수 없는 모델: {type(model).__name__} (pickle 로 저장하세요)")
+
+
+# ───── 저장 / 로드 ────────────────────────────────────────────────────────
+
+def _is_bundle(path: Path) -> bool:
+    try:
+        return json.loads((path / MANIFEST).read_text(encoding='utf-8')).get('format') == FORMAT
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def save_bundle(predictor, path) -> Path:
+    """
+    RacePredictor → path 디렉터리 번들.
+    임시 디렉터리에 모두 쓴 뒤 이름을 바꾸므로 중간에 끊겨도 반쯤 쓴 번들이 남지 않습니다.
+    path 에 이미 무엇이 있으면 번들 디렉터리일 때만 바꿔 쓰고, 그 밖의 파일·디렉터리면
+    지우지 않고 FileExistsError 를 냅니다.
+    """
+    path = Path(path)
+    if path.exists() and not (path.is_dir() and _is_bundle(path)):
+        raise FileExistsError(f"{path} 는 번들 디렉터리가 아니라서 덮어쓰지 않습니다.")
+    kind, per_race, boosters = _model_boosters(predictor.model)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    (tmp / PIPELINE).write_text(
+        json.dumps(pipeline_state(predictor.pipeline), ensure_ascii=False, indent=1), encoding='utf-8'
+    )
+    if predictor.scale is not None:
+        for name, arr in zip(SCALE_FILES, predictor.scale):
+            np.save(tmp / name, np.ascontiguousarray(arr, dtype=np.float32))
+
+    metas = {}
+    for name, b in boosters:
+        trees = TreeEnsemble.from_booster(b)
+        trees.save(tmp / name)
+        b.save_model(str(tmp / name / 'model.txt'))
+        metas[name] = trees.meta
+
+    manifest = {
+        'format':   FORMAT,
+        'version':  VERSION,
+        'created':  datetime.datetime.now().isoformat(timespec='seconds'),
+        'region':   predictor.region,
+        'model':    {'kind': kind, 'per_race': per_race, 'boosters': metas},
+        'scale':    predictor.scale is not None,
+        'files':    {
+            f.relative_to(tmp).as_posix(): f.stat().st_size for f in sorted(tmp.rglob('*')) if f.is_file()
+        },
+    }
+    (tmp / MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding='utf-8')
+
+    # 쓰는 동안 다른 것이 생기지 않았는지 다시 확인합니다
+    if path.exists():
+        if not (path.is_dir() and _is_bundle(path)):
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise FileExistsError(f"{path} 는 번들 디렉터리가 아니라서 덮어쓰지 않습니다.")
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return path
+
+
+def read_manifest(path) -> dict:
+    """ manifest.json 을 읽고 형식·버전과 파일 크기를 확인합니다. 맞지 않으면 ValueError. """
+    path = Path(path)
+    if not (path / MANIFEST).is_file():
+        raise ValueError(f"{path} 에 {MANIFEST} 이 없습니다 (번들 디렉터리가 아님).")
+    manifest = json.loads((path / MANIFEST).read_text(encoding='utf-8'))
+    if manifest.get('format') != FORMAT:
+        raise ValueError(f"알 수 없는 번들 형식: {manifest.get('format')!r}")
+    if manifest.get('version', 0) > VERSION:
+        raise ValueError(f"번들 버전 {manifest['version']} 은 이 코드(최대 {VERSION})보다 새 버전입니다.")
+    for name, size in manifest['files'].items():
+        f = path / name
+        if not f.is_file() or f.stat().st_size != size:
+            raise ValueError(f"번들 파일이 없거나 크기가 다릅니다: {name}")
+    return manifest
+
+
+def load_model(path, manifest: dict, backend: str = 'numpy', mmap_mode='r') -> BundleModel:
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 backend: {backend} (가능: {list(BACKENDS)})")
+    path = Path(path)
+    spec = manifest['model']
+    if backend == 'lightgbm':
+        import lightgbm as lgb
+        boosters = [lgb.Booster(model_file=str(path / name / 'model.txt')) for name in spec['boosters']]
+    else:
+        boosters = [TreeEnsemble.load(path / name, meta, mmap_mode) for name, meta in spec['boosters'].items()]
+    return BundleModel(spec['kind'], boosters, spec['per_race'])
+
+
+def load_bundle(path, backend: str = 'numpy', mmap_mode='r'):
+    """
+    번들 디렉터리 → RacePredictor.
+    backend='numpy' 는 sklearn · lightgbm 없이, 'lightgbm' 은 lightgbm.Booster 로 점수를 냅니다.
+    """
+    from kcycle.serve import RacePredictor
+
+    path = Path(path)
+    manifest = read_manifest(path)
+    pipeline = pipeline_from_state(json.loads((path / PIPELINE).read_text(encoding='utf-8')))
+    scale = None
+    if manifest['scale']:
+        scale = tuple(np.load(path / name, mmap_mode=mmap_mode) for name in SCALE_FILES)
+    model = load_model(path, manifest, backend, mmap_mode)
+    return RacePredictor(pipeline, model, manifest['region'], scale)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="RacePredictor pickle → 번들 디렉터리 변환")
+    p.add_argument("pickle", help="RacePredictor.save 로 저장한 .pkl")
+    p.add_argument("out", help="번들 디렉터리")
+    args = p.parse_args()
+
+    from kcycle.serve import RacePredictor
+
+    out = save_bundle(RacePredictor.load(args.pickle), args.out)
+    print(f"✅ {args.pickle} → {out}")
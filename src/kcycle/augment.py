@@ -0,0 +1,139 @@
+"""
+경주 단위 데이터 증강.
+
+example.ipynb 의 shuffle_fixed_block / reverse_fixed_block 을 대체합니다.
+경주마다 pandas 그룹을 만들어 프로세스로 보내는 대신, 선택된 경주들의 순열을
+(n, 7) 정수 배열로 한 번에 만들고 (n_races, 7, F) 버퍼에 fancy indexing 으로 적용합니다.
+
+- 선수 슬롯은 번호 순서(슬롯 = 번호 - 1)라고 가정합니다 (reshape_by_race 와 같음).
+  선수를 옮긴 뒤에도 이 가정이 유지되도록 번호 피처(X·cat)는 순서를 바꾸지 않은 원래 슬롯 값으로
+  다시 찍습니다 (노트북에서 증강 후 번호 컬럼을 덮어쓰는 것과 같음). 옮긴 번호가 남으면 원래 자리가 새어 나갑니다.
+- 난수는 seed 로 만든 np.random.Generator 하나만 씁니다 (전역 np.random.seed 를 건드리지 않음).
+- 경주마다 서로 다른 순열을 씁니다.
+
+    from kcycle.augment import augment
+
+    rt_aug = augment(rt, shuffle=0.5, reverse=0.5, multiplier=10, exclude_back_no=[3], seed=42)
+"""
+import numpy as np
+
+from kcycle.tensor import RaceTensor
+
+# 선수가 아니라 슬롯에 붙은 피처. 증강 후에도 슬롯 자리 값을 유지합니다
+SLOT_COLS = ['번호']
+
+
+def select_races(n_races: int, ratio: float, rng) -> np.ndarray:
+    """ 전체 경주 중 int(n_races * ratio) 개를 중복 없이 고릅니다. """
+    return rng.choice(n_races, int(n_races * ratio), replace=False)
+
+
+def shuffle_perms(n: int, per_race: int = 7, exclude_back_no=None, rng=None) -> np.ndarray:
+    """
+    경주마다 독립적인 순열 (n, per_race). exclude_back_no 의 슬롯은 제자리에 둡니다.
+    """
+    rng   = np.random.default_rng(rng)
+    fixed = {int(b) - 1 for b in (exclude_back_no or ())}
+    free  = np.array([s for s in range(per_race) if s not in fixed])
+
+    perms = np.broadcast_to(np.arange(per_race), (n, per_race)).copy()
+    # 무작위 키를 정렬하면 행마다 독립적인 균등 순열이 나옵니다
+    order = np.argsort(rng.random((n, len(free))), axis=1)
+    perms[:, free] = free[order]
+    return perms
+
+
+def reverse_perms(n: int, per_race: int = 7) -> np.ndarray:
+    """ 1번 ~ 7번 순서를 뒤집는 순열 (n, per_race) """
+    return np.broadcast_to(np.arange(per_race)[::-1], (n, per_race))
+
+
+def gather(arr: np.ndarray, races: np.ndarray, perms: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    arr (n_races, per_race, ...) 에서 races 경주를 perms 순서로 꺼냅니다.
+    out 을 주면 임시 배열 없이 out 에 바로 씁니다.
+    """
+    per_race = arr.shape[1]
+    rows = (np.asarray(races)[:, None] * per_race + perms).ravel()
+    flat = arr.reshape(-1, *arr.shape[2:])
+    if out is None:
+        return flat[rows].reshape(len(races), per_race, *arr.shape[2:])
+    np.take(flat, rows, axis=0, out=out.reshape(-1, *arr.shape[2:]))
+    return out
+
+
+def _plan(rt: RaceTensor, shuffle: float, reverse: float, multiplier: int, exclude_back_no, rng) -> list:
+    """ [(races, perms), ...] 증강 한 묶음씩 """
+    n, per_race = rt.n_races, rt.per_race_size
+    plan = []
+    for _ in range(multiplier):
+        if shuffle:
+            races = select_races(n, shuffle, rng)
+            plan.append((races, shuffle_perms(len(races), per_race, exclude_back_no, rng)))
+        if reverse:
+            races = select_races(n, reverse, rng)
+            plan.append((races, reverse_perms(len(races), per_race)))
+    return plan
+
+
+def augment(
+    rt: RaceTensor,
+    shuffle: float = 0.5,
+    reverse: float = 0.5,
+    multiplier: int = 1,
+    exclude_back_no=None,
+    seed=None,
+    include_original: bool = True,
+) -> RaceTensor:
+    """
+    shuffle / reverse 비율만큼 경주를 골라 순서를 바꾼 복사본을 multiplier 번 만듭니다.
+
+    Parameters
+    ----------
+    rt : RaceTensor
+    shuffle : float, default=0.5
+        매 회 섞을 경주 비율 (0 이면 생략). shuffle_fixed_block 의 ratio.
+    reverse : float, default=0.5
+        매 회 순서를 뒤집을 경주 비율 (0 이면 생략). reverse_fixed_block 의 ratio.
+    multiplier : int, default=1
+        증강 반복 횟수. 결과 경주 수 ≈ n_races * (1 + multiplier * (shuffle + reverse))
+    exclude_back_no : list of int, optional
+        섞지 않고 제자리에 둘 번호 (예: [3]).
+    seed : int or np.random.Generator, optional
+    include_original : bool, default=True
+        결과 앞에 원본 경주를 포함할지.
+
+    Returns
+    -------
+    RaceTensor
+        X, cat, rank 는 한 번에 할당한 버퍼에 채우고, race_ids 는 원래 경주 키를 그대로 씁니다.
+    """
+    rng  = np.random.default_rng(seed)
+    plan = _plan(rt, shuffle, reverse, multiplier, exclude_back_no, rng)
+    if include_original:
+        plan.insert(0, (np.arange(rt.n_races), np.broadcast_to(np.arange(rt.per_race_size), (rt.n_races, rt.per_race_size))))
+
+    x_slot = [rt.columns.index(c) for c in SLOT_COLS if c in rt.columns]
+    c_slot = [rt.cat_cols.index(c) for c in SLOT_COLS if c in rt.cat_cols]
+
+    total = sum(len(races) for races, _ in plan)
+    X     = np.empty((total, *rt.X.shape[1:]),   dtype=rt.X.dtype)
+    cat   = np.empty((total, *rt.cat.shape[1:]), dtype=rt.cat.dtype)
+    rank  = None if rt.rank is None else np.empty((total, rt.per_race_size), dtype=rt.rank.dtype)
+
+    start = 0
+    for races, perms in plan:
+        stop = start + len(races)
+        gather(rt.X,   races, perms, out=X[start:stop])
+        gather(rt.cat, races, perms, out=cat[start:stop])
+        # 번호는 원래 슬롯 값으로 다시 찍습니다 (슬롯 = 번호 - 1)
+        for j in x_slot:
+            X[start:stop, :, j] = rt.X[races, :, j]
+        for j in c_slot:
+            cat[start:stop, :, j] = rt.cat[races, :, j]
+        if rank is not None:
+            gather(rt.rank, races, perms, out=rank[start:stop])
+        start = stop
+
+    race_ids = np.concatenate([rt.race_ids[races] for races, _ in plan]) if plan else rt.race_ids[:0]
+    return RaceTensor(X, cat, race_ids, rank, rt.columns, rt.cat_cols)
@@ -0,0 +1,344 @@
+"""
+Walk-forward 백테스트.
+
+example.ipynb 의 split_train_test_by_race 는 문자열 race_id 를 매번 만들어 한 번만 나눕니다.
+여기서는 load_data 의 정수 race_id 로 정렬된 데이터에서 기간(연/월/주) 경계를 이진 탐색으로 찾아
+여러 fold 를 만들고, fold 마다
+
+    train 기간으로 RaceFeaturePipeline fit → train/test RaceTensor → 모델 학습 → test 기간 평가
+
+를 돌려 기간별 RaceAccuracy 를 보고합니다.
+
+- fold 피처는 cache_dir 아래에 fold 마다 한 번만 만들어 저장합니다 (RaceTensor.save).
+  다시 실행하거나 모델만 바꿔 돌릴 때는 저장된 피처를 memmap 으로 바로 읽습니다.
+- 누적(expanding) 창에서는 이전 fold 의 파이프라인에 새 기간만 partial_fit 합니다.
+- fold 학습은 프로세스 풀에서 동시에 돌리고, 코어 예산을 동시 fold 수 × 모델 스레드로 나눕니다.
+
+    from kcycle.backtest import backtest
+
+    df = clean_race_data(load_data())
+    report = backtest(df, RaceRanker(), freq='M', start='2023-01')
+    report[['test_races', '단승', '복승', '삼복승']]
+"""
+import copy
+import json
+import pickle
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, parallel_config
+from sklearn.base import clone
+
+from kcycle.features import KEY_COL, RaceFeaturePipeline
+from kcycle.metrics import BET_TYPES, RaceMetrics
+from kcycle.models import RaceRanker, split_cores, with_threads
+from kcycle.tensor import RaceTensor
+
+# 기간 단위 → pandas Period freq
+FREQS = {'Y': 'Y', 'M': 'M', 'W': 'W'}
+
+
+def sort_races(df: pd.DataFrame) -> pd.DataFrame:
+    """ race_id 순으로 정렬 (이미 정렬되어 있으면 그대로). 같은 경주 안의 행 순서는 유지합니다. """
+    race_id = df[KEY_COL].to_numpy()
+    if len(race_id) and (np.diff(race_id) < 0).any():
+        df = df.iloc[np.argsort(race_id, kind='stable')]
+    return df.reset_index(drop=True)
+
+
+def holdout_slices(df: pd.DataFrame, test_size: float = 0.2) -> tuple:
+    """
+    race_id 순으로 정렬된 df 의 (train 행 slice, test 행 slice).
+    경주 순서대로 앞 int(n * (1 - test_size)) 경주가 train 입니다.
+    """
+    race_id = df[KEY_COL].to_numpy()
+    races   = race_id[np.r_[True, race_id[1:] != race_id[:-1]]] if len(race_id) else race_id
+    cutoff  = int(len(races) * (1 - test_size))
+    cut     = int(np.searchsorted(race_id, races[cutoff])) if cutoff < len(races) else len(race_id)
+    return slice(0, cut), slice(cut, len(race_id))
+
+
+def split_by_race(df: pd.DataFrame, test_size: float = 0.2) -> tuple:
+    """
+    split_train_test_by_race 와 같은 경주 단위 시간순 분할 (문자열 키 없이).
+    경주 순서대로 앞 int(n * (1 - test_size)) 경주가 train 입니다.
+    """
+    df = sort_races(df)
+    train, test = holdout_slices(df, test_size)
+    return df.iloc[train].reset_index(drop=True), df.iloc[test].reset_index(drop=True)
+
+
+def race_periods(df: pd.DataFrame, freq: str = 'M') -> tuple:
+    """
+    행마다 기간 번호(int64, 시간순 증가)와 {기간 번호: 라벨}.
+    날짜(yyyymmdd)는 고유값만 변환합니다.
+    """
+    if freq not in FREQS:
+        raise ValueError(f"알 수 없는 freq: {freq!r}. ({', '.join(FREQS)} 중 하나)")
+    codes, dates = pd.factorize(df['날짜'].to_numpy())
+    periods = pd.PeriodIndex(pd.to_datetime(pd.Index(dates).astype(str), format='%Y%m%d'), freq=FREQS[freq])
+    ordinal = periods.asi8
+    labels  = dict(zip(ordinal.tolist(), periods.astype(str)))
+    return ordinal[codes], labels
+
+
+def walk_forward_folds(
+    df: pd.DataFrame,
+    freq: str = 'M',
+    train_periods: int = None,
+    test_periods: int = 1,
+    min_train_periods: int = 1,
+    start: str = None,
+    end: str = None,
+) -> list:
+    """
+    race_id 순으로 정렬된 df 에서 [(라벨, train 행 slice, test 행 slice), ...].
+
+    test 는 기간 i 부터 test_periods 개, train 은 그 직전까지
+    (train_periods 가 None 이면 처음부터 누적, 아니면 직전 train_periods 개 기간).
+    race_id 순으로 정렬된 행에서 기간 번호도 정렬되어 있으므로 경계는 이진 탐색으로 찾고,
+    fold 는 경주를 자르지 않는 행 구간(slice)입니다.
+    start / end 는 평가할 첫 / 마지막 test 기간 라벨 (예: '2023-01').
+    """
+    race_id = df[KEY_COL].to_numpy()
+    if len(race_id) and (np.diff(race_id) < 0).any():
+        raise ValueError("df 가 race_id 순으로 정렬되어 있지 않습니다 (sort_races).")
+    period, labels = race_periods(df, freq)
+
+    if (np.diff(period) < 0).any():
+        raise ValueError("race_id 순서와 날짜 순서가 맞지 않습니다.")
+
+    # 정렬된 기간 번호에서 각 기간의 시작 행을 이진 탐색 (하루가 한 기간이므로 경주는 잘리지 않음)
+    uniq   = np.unique(period)
+    bounds = np.r_[np.searchsorted(period, uniq), len(period)]
+
+    lo = pd.Period(start, freq=FREQS[freq]).ordinal if start else None
+    hi = pd.Period(end,   freq=FREQS[freq]).ordinal if end   else None
+
+    folds = []
+    for i in range(max(1, min_train_periods), len(uniq), test_periods):
+        if (lo is not None and uniq[i] < lo) or (hi is not None and uniq[i] > hi):
+            continue
+        j = min(i + test_periods, len(uniq))
+        t = 0 if train_periods is None else max(0, i - train_periods)
+        label = labels[int(uniq[i])] if j == i + 1 else f"{labels[int(uniq[i])]}~{labels[int(uniq[j - 1])]}"
+        folds.append((label, slice(int(bounds[t]), int(bounds[i])), slice(int(bounds[i]), int(bounds[j]))))
+    return folds
+
+
+# ───── fold 피처 캐시 ────────────────────────────────────────────────────
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """ df 내용 해시 (fold 캐시 키) """
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))], ensure_ascii=False).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class FoldCache:
+    """
+    cache_dir/<fold 키>/{train,test}/*.npy, pipeline.pkl
+
+    fold 키는 (데이터 해시, train/test 행 구간, 파이프라인 설정) 의 해시입니다.
+    cache_dir 가 None 이면 메모리에만 둡니다.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.root = Path(cache_dir) if cache_dir else None
+        self._mem = {}
+
+    @staticmethod
+    def key(fingerprint: str, train: slice, test: slice, params: dict) -> str:
+        raw = json.dumps([fingerprint, train.start, train.stop, test.start, test.stop, params],
+                         ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:20]
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def has(self, key: str) -> bool:
+        if self.root is None:
+            return key in self._mem
+        return (self.path(key) / 'pipeline.pkl').is_file()
+
+    def put(self, key: str, pipe, train_rt: RaceTensor, test_rt: RaceTensor):
+        if self.root is None:
+            self._mem[key] = (pipe, train_rt, test_rt)
+            return
+        d = self.path(key)
+        train_rt.save(d / 'train')
+        test_rt.save(d / 'test')
+        # pipeline.pkl 을 마지막에 써서 완료 표시로 씁니다
+        tmp = d / '.pipeline.pkl.tmp'
+        tmp.write_bytes(pickle.dumps(pipe, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp.replace(d / 'pipeline.pkl')
+
+    def pipeline(self, key: str):
+        if self.root is None:
+            return self._mem[key][0]
+        return pickle.loads((self.path(key) / 'pipeline.pkl').read_bytes())
+
+    def tensors(self, key: str, mmap_mode='r') -> tuple:
+        if self.root is None:
+            return self._mem[key][1:]
+        d = self.path(key)
+        return RaceTensor.load(d / 'train', mmap_mode), RaceTensor.load(d / 'test', mmap_mode)
+
+
+def build_fold_features(df: pd.DataFrame, folds, cache: FoldCache, pipeline=None, verbose: bool = False) -> list:
+    """
+    fold 마다 파이프라인을 train 구간으로 fit 하고 train/test RaceTensor 를 캐시에 만듭니다.
+    이미 있는 fold 는 건너뜁니다. 앞 fold 와 train 시작이 같고 끝만 늘어난 fold 는
+    앞 fold 의 파이프라인을 복사해 늘어난 행만 partial_fit 합니다.
+    fold 순서대로 캐시 키 목록을 돌려줍니다.
+    """
+    pipeline = pipeline if pipeline is not None else RaceFeaturePipeline()
+    params   = {'cat_cols': pipeline.cat_cols, 'unused_cols': pipeline.unused_cols}
+    fp       = frame_fingerprint(df)
+
+    keys, prev = [], None   # prev: (key, train slice)
+    for label, train, test in folds:
+        key = FoldCache.key(fp, train, test, params)
+        keys.append(key)
+        if cache.has(key):
+            prev = (key, train)
+            continue
+
+        if prev is not None and prev[1].start == train.start and prev[1].stop <= train.stop:
+            pipe = copy.deepcopy(cache.pipeline(prev[0]))
+            if train.stop > prev[1].stop:
+                pipe.partial_fit(df.iloc[prev[1].stop:train.stop])
+        else:
+            pipe = copy.deepcopy(pipeline).fit(df.iloc[train])
+
+        cache.put(
+            key, pipe,
+            RaceTensor.from_frame(pipe.transform(df.iloc[train])),
+            RaceTensor.from_frame(pipe.transform(df.iloc[test])),
+        )
+        prev = (key, train)
+        if verbose:
+            print(f"[{label}] 피처 생성: train {train.stop - train.start:,}행, test {test.stop - test.start:,}행")
+    return keys
+
+
+# ───── fold 학습·평가 ────────────────────────────────────────────────────
+
+def fit_predict(model, train: RaceTensor, test: RaceTensor, bet_type: str = '삼복승', fit_kwargs=None) -> np.ndarray:
+    """
+    model 을 train 으로 학습하고 test 의 (n_races, 7) 점수를 돌려줍니다.
+    RaceRanker 는 rank 로, 그 밖의 모델은 bet_type 타깃 (n_races, 7) 으로 학습합니다.
+    """
+    fit_kwargs = fit_kwargs or {}
+    if isinstance(model, RaceRanker):
+        model.fit(train, **fit_kwargs)
+    else:
+        model.fit(train, train.targets(bet_type), **fit_kwargs)
+    return np.asarray(model.predict_proba(test), dtype=np.float64)
+
+
+def _run_fold(model, cache: FoldCache, key: str, scale: bool, bet_type: str, fit_kwargs) -> tuple:
+    # 표준화는 제자리 연산이므로 memmap(읽기 전용) 대신 메모리로 읽습니다
+    train, test = cache.tensors(key, mmap_mode=None if scale else 'r')
+    if scale:
+        if cache.root is None:
+            train, test = train.take(np.arange(train.n_races)), test.take(np.arange(test.n_races))
+        test.standardize_(train.standardize_())
+    y_score = fit_predict(model, train, test, bet_type, fit_kwargs)
+    return np.array(test.rank), y_score, train.n_races
+
+
+def backtest(
+    df: pd.DataFrame,
+    model,
+    freq: str = 'M',
+    train_periods: int = None,
+    test_periods: int = 1,
+    min_train_periods: int = 1,
+    start: str = None,
+    end: str = None,
+    bet_type: str = '삼복승',
+    scale: bool = False,
+    pipeline: RaceFeaturePipeline = None,
+    cache_dir='./data/cache/backtest',
+    n_jobs: int = -1,
+    fit_kwargs: dict = None,
+    metrics=('race_accuracy',),
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """
+    walk-forward 백테스트.
+
+    Parameters
+    ----------
+    df : clean_race_data 결과 (race_id, rank, 날짜 포함)
+    model : RaceRanker 또는 RaceTensor + (n_races, 7) 타깃으로 학습하는 모델 (MultiOutputRaceClassifier)
+        fold 마다 clone 해서 학습합니다.
+    freq : 'Y', 'M', 'W'
+    train_periods : int, optional
+        train 창 길이(기간 수). None 이면 처음부터 누적.
+    test_periods : int, default=1
+        fold 하나의 test 기간 수 (= 재학습 주기).
+    min_train_periods : int, default=1
+        첫 fold 전에 최소로 쌓을 기간 수.
+    start, end : str, optional
+        평가할 test 기간 범위 (예: '2023-01', '2024-12').
+    bet_type : str, default='삼복승'
+        RaceRanker 가 아닌 모델의 학습 타깃. 평가는 모든 베팅 종류에 대해 같은 점수로 합니다.
+    scale : bool, default=False
+        fold 마다 train 통계로 표준화 (RaceTensor.standardize_).
+    cache_dir : str, optional
+        fold 피처 캐시 위치. None 이면 메모리에만 둡니다.
+    n_jobs : int, default=-1
+        전체 코어 예산 (동시 fold 수 × 모델 스레드).
+    metrics : 보고할 지표 (metrics.METRICS 중)
+
+    Returns
+    -------
+    DataFrame
+        index 는 test 기간, 컬럼은 train_races, test_races 와 베팅 종류별 지표.
+        지표가 race_accuracy 하나면 컬럼 이름은 '단승', '복승', '삼복승', 아니면 '단승_f1' 처럼 붙입니다.
+        마지막 '전체' 행은 모든 test 기간을 합쳐 계산한 값입니다.
+    """
+    df    = sort_races(df)
+    folds = walk_forward_folds(df, freq, train_periods, test_periods, min_train_periods, start, end)
+    if not folds:
+        raise ValueError("만들 수 있는 fold 가 없습니다 (기간·start/end 를 확인하세요).")
+
+    cache = FoldCache(cache_dir)
+    keys  = build_fold_features(df, folds, cache, pipeline, verbose)
+
+    outer, inner = split_cores(n_jobs, len(folds))
+    if cache.root is None:
+        outer = 1   # 메모리 캐시는 프로세스 간에 공유되지 않으므로 순서대로
+    tasks = (
+        delayed(_run_fold)(with_threads(clone(model), inner), cache, key, scale, bet_type, fit_kwargs)
+        for key in keys
+    )
+    if outer == 1:
+        results = Parallel(n_jobs=1)(tasks)
+    else:
+        with parallel_config(backend='loky', inner_max_num_threads=inner):
+            results = Parallel(n_jobs=outer)(tasks)
+
+    total, rows = RaceMetrics(BET_TYPES), []
+    for (label, _, _), (rank, y_score, n_train) in zip(folds, results):
+        res = RaceMetrics(BET_TYPES).update(rank, y_score).result()
+        total.update(rank, y_score)
+        rows.append(_report_row(label, n_train, len(rank), res, metrics))
+    rows.append(_report_row('전체', np.nan, sum(len(r[0]) for r in results), total.result(), metrics))
+
+    report = pd.DataFrame(rows).set_index('period')
+    report.attrs['n_parallel'], report.attrs['n_threads'] = outer, inner
+    return report
+
+
+def _report_row(label, n_train, n_test, res: dict, metrics) -> dict:
+    row = {'period': label, 'train_races': n_train, 'test_races': n_test}
+    for b, vals in res.items():
+        for m in metrics:
+            row[b if len(metrics) == 1 else f'{b}_{m}'] = vals[m]
+    return row
@@ -0,0 +1,523 @@
+"""
+크롤러/파이프라인 벤치마크.
+
+저장해 둔 페이지를 로컬 fixture HTTP 서버로 띄워 실제 사이트에 부하를 주지 않고
+크롤러 성능을 측정합니다.
+
+fixture 디렉터리는 URL 경로를 그대로 미러링합니다.
+    <fixtures>/race/card/decision/2025/16/3.html  ← /race/card/decision/2025/16/3
+
+저장된 페이지가 없으면 data/*_sample.csv 형식의 출주표로 fixture 를 만들 수 있습니다.
+    python -m kcycle.bench fixtures --sample "data/20250420_광명01경주_sample.csv" --out ./fixtures --days 30
+
+pipeline 은 합성 데이터(kcycle.synth)를 실제 9년치의 1×/10×/100× 규모로 만들고
+html 파싱 → load_data → clean_race_data → 피처·RaceTensor → 증강 → 학습 → 지표 단계마다
+소요 시간·처리량(행/초)·최대 메모리를 잽니다. 단계마다 새 프로세스에서 돌리므로 메모리가
+서로 섞이지 않고, 한 단계가 메모리 부족으로 죽어도 나머지 결과는 남습니다.
+
+예시
+    python -m kcycle.bench crawl --fixtures ./fixtures --year 2025 --concurrency 1 4 8 --latency 0.05
+    python -m kcycle.bench parse --pages ./data/cache/pages --parsers html.parser lxml
+    python -m kcycle.bench pipeline --scales 1 10 100 --out ./bench_data --report runs/pipeline.json
+"""
+import os
+import gzip
+import json
+import time
+import pickle
+import shutil
+import argparse
+import threading
+import tracemalloc
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+from html import escape
+
+BASE_COLS  = [
+    "기어배수", "200m", "훈련지", "승률", "연대율", "삼연대율", "입상/출전", "선행",
+    "젖히기", "추입", "마크", "등급조정", "최근3득점", "최근3순위",
+]
+TRAIN_COLS = ["훈련일수", "훈련동참자", "훈련내용"]
+REC_COLS   = [
+    "최근3_장소일자", "최근3_1일", "최근3_2일", "최근3_3일",
+    "최근2_장소일자", "최근2_1일", "최근2_2일", "최근2_3일",
+    "최근1_장소일자", "최근1_1일", "최근1_2일", "최근1_3일",
+    "금회_1일", "금회_2일", "금회_3일",
+]
+
+
+def _cell(v) -> str:
+    return "" if pd.isna(v) else escape(str(v))
+
+
+def _player_th(row) -> str:
+    return (
+        f'<th><span class="sign">{_cell(row["번호"])}</span>'
+        f'<div class="name"><a href="#">{_cell(row["이름"])}</a></div>'
+        f'<span class="other">{int(row["기수"]):02d}기/{_cell(row["나이"])}세</span></th>'
+    )
+
+
+def render_card_page(card: pd.DataFrame) -> str:
+    """
+    parse_all_races 출력 형식(출주표 DataFrame)으로부터 출주표 페이지 html 을 만듭니다.
+    경주(경주지역, 경주번호)마다 swiper 버튼과 세 개의 excel_table 을 생성합니다.
+    """
+    buttons, races = [], []
+    for i, ((region, no), race) in enumerate(card.groupby(["경주지역", "경주번호"], sort=False)):
+        rid = f"race{i}"
+        head = race.iloc[0]
+        buttons.append(
+            f'<div class="swiper-slide"><button onclick="scrlMoveTo(\'{rid}\')">'
+            f'<span class="region">{_cell(region)}</span><span class="date">{int(no):02d}</span>'
+            f'</button></div>'
+        )
+        tables = []
+        for cols in (BASE_COLS, TRAIN_COLS, REC_COLS):
+            trs = "".join(
+                "<tr>" + _player_th(r) + "".join(f"<td>{_cell(r[c])}</td>" for c in cols) + "</tr>"
+                for _, r in race.iterrows()
+            )
+            tables.append(f'<table class="excel_table"><tbody>{trs}</tbody></table>')
+        races.append(
+            f'<div id="{rid}"><h2>{_cell(region)} {int(no):02d}경주 '
+            f'( {_cell(head["경주종류"])} {_cell(head["경주시간"])} )</h2>{"".join(tables)}</div>'
+        )
+    return (
+        "<html><body><div class='swiper'>" + "".join(buttons) + "</div>"
+        + "".join(races) + "</body></html>"
+    )
+
+
+def render_day_list_page(days) -> str:
+    """ days: [(회차, 일차, yyyymmdd), ...] (오래된 순) """
+    opts = "".join(
+        f"<option>({int(c)}회 {int(d)}일) {int(ymd[4:6])}월 {int(ymd[6:8])}일</option>"
+        for c, d, ymd in reversed(list(days))
+    )
+    return f'<html><body><select name="tmsDayOrd">{opts}</select></body></html>'
+
+
+def write_fixtures(sample, out, year: int = None, n_days: int = 30, races_per_day: int = 15):
+    """
+    sample 출주표(7행 경주)를 복제해 n_days 일차 × races_per_day 경주 분량의 fixture 를 만듭니다.
+    """
+    card = pd.read_csv(sample, dtype=str, keep_default_na=False)
+    year = year or int(card["연도"].iloc[0])
+    out  = Path(out)
+
+    days = []
+    for k in range(n_days):
+        회차, 일차 = k // 3 + 1, k % 3 + 1
+        ymd = f"{year}{1 + k // 28 % 12:02d}{1 + k % 28:02d}"
+        days.append((f"{회차:02d}", str(일차), ymd))
+        day = pd.concat(
+            [card.assign(경주번호=f"{no:02d}") for no in range(1, races_per_day + 1)],
+            ignore_index=True,
+        )
+        # 크롤러는 목록의 회차를 그대로 경로에 씁니다 ("(3회 1일)" → /3/1)
+        page = out / "race/card/decision" / str(year) / str(회차) / f"{일차}.html"
+        page.parent.mkdir(parents=True, exist_ok=True)
+        page.write_text(render_card_page(day), encoding="utf-8")
+
+    index = out / "race/card/decision" / str(year) / "01" / "1.html"
+    index.parent.mkdir(parents=True, exist_ok=True)
+    index.write_text(render_day_list_page(days), encoding="utf-8")
+    return days
+
+
+class FixtureServer:
+    """
+    fixtures 디렉터리의 html 을 URL 경로 그대로 서빙하는 로컬 서버.
+    latency 초만큼 응답을 지연시켜 네트워크 왕복 시간을 흉내냅니다.
+    """
+
+    def __init__(self, fixtures, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        root = Path(fixtures)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = root / (self.path.split("?", 1)[0].strip("/") + ".html")
+                if latency:
+                    time.sleep(latency)
+                if not path.is_file():
+                    self.send_error(404)
+                    return
+                body = path.read_bytes()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd  = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bench_crawl(fixtures, year: int, concurrencies=(1, 4, 8), latency: float = 0.05, rate: float = None):
+    """
+    concurrency 별 crawl_year 소요 시간을 재고, 결과가 순차 크롤링과 동일한지 확인합니다.
+    """
+    from kcycle.fetcher import make_fetcher
+    from kcycle.kcycle_race_crawler import crawl_year
+
+    rows, baseline = [], None
+    with FixtureServer(fixtures, latency=latency) as server:
+        for c in concurrencies:
+            fetcher = make_fetcher(pause=0, rate=rate, concurrency=c, base_url=server.url)
+            t0 = time.perf_counter()
+            df = crawl_year(year, concurrency=c, fetcher=fetcher)
+            elapsed = time.perf_counter() - t0
+            if baseline is None:
+                baseline = df
+            rows.append({
+                "concurrency": c,
+                "seconds":     round(elapsed, 3),
+                "rows":        len(df),
+                "identical":   df.equals(baseline),
+            })
+    return pd.DataFrame(rows)
+
+
+def _load_pages(pages=None, sample=None, n_pages: int = 20, races_per_day: int = 15) -> list:
+    """
+    pages 디렉터리의 *.html / *.html.gz(PageCache) 를 읽거나,
+    sample 출주표로 n_pages 개의 페이지를 메모리에서 만듭니다.
+    캐시에는 결과 페이지도 섞여 있으므로 경주 버튼(scrlMoveTo)이 있는 출주표 페이지만 씁니다.
+    """
+    if pages is not None:
+        out = []
+        for p in sorted(Path(pages).rglob("*.html*")):
+            raw  = p.read_bytes()
+            html = (gzip.decompress(raw) if p.suffix == ".gz" else raw).decode("utf-8")
+            if "scrlMoveTo" in html:
+                out.append(html)
+        return out
+    card = pd.read_csv(sample, dtype=str, keep_default_na=False)
+    day  = pd.concat(
+        [card.assign(경주번호=f"{no:02d}") for no in range(1, races_per_day + 1)],
+        ignore_index=True,
+    )
+    return [render_card_page(day)] * n_pages
+
+
+def bench_parse(pages=None, sample=None, parsers=("html.parser", "lxml"), n_pages: int = 20):
+    """
+    저장된 출주표 페이지를 parse_card_html 로 파싱하는 처리량(페이지·행/초)을 백엔드별로 잽니다.
+    """
+    from kcycle.fetcher import PARSER, set_parser
+    from kcycle.kcycle_race_crawler import parse_card_html
+
+    htmls = _load_pages(pages, sample, n_pages)
+    rows  = []
+    try:
+        for parser in parsers:
+            set_parser(parser)
+            n_rows = 0
+            t0 = time.perf_counter()
+            for html in htmls:
+                n_rows += len(parse_card_html(html, 2025, "1", "1", "20250101"))
+            elapsed = time.perf_counter() - t0
+            rows.append({
+                "parser":    parser,
+                "pages":     len(htmls),
+                "rows":      n_rows,
+                "seconds":   round(elapsed, 3),
+                "pages/s":   round(len(htmls) / elapsed, 1),
+                "rows/s":    round(n_rows / elapsed, 1),
+            })
+    finally:
+        set_parser(PARSER)
+    return pd.DataFrame(rows)
+
+
+# ───── 파이프라인 단계별 벤치마크 ─────────────────────────────────────────
+
+PIPELINE_STAGES = ("generate", "parse", "load", "load_cache", "clean", "features", "augment", "train", "metrics")
+
+# 단계 → 입력을 만드는 앞 단계
+STAGE_DEPENDS = {
+    "parse": "generate", "load": "generate", "load_cache": "load", "clean": "load",
+    "features": "clean", "augment": "features", "train": "features", "metrics": "train",
+}
+
+
+def _status_mb(field: str):
+    """ /proc/self/status 의 VmRSS·VmHWM (MB). 리눅스가 아니면 None """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class StageMeter:
+    """
+    구간 소요 시간과 최대 메모리.
+    리눅스에서는 시작할 때 VmHWM 을 현재 RSS 로 되돌려(clear_refs) 구간 안의 최대 RSS 를 재고,
+    아니면 tracemalloc 의 최대 할당량(파이썬·numpy 할당만)으로 대신합니다.
+    """
+
+    def __enter__(self):
+        self.base_mb = _status_mb("VmRSS")
+        try:
+            Path("/proc/self/clear_refs").write_text("5")
+            self.traced = False
+        except OSError:
+            tracemalloc.start()
+            self.traced = True
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.t0
+        if self.traced:
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            self.peak_mb = (self.base_mb or 0) + peak
+        else:
+            self.peak_mb = _status_mb("VmHWM")
+
+
+def _stage_inputs(stage: str, data_dir: Path, work: Path, opts: dict):
+    """ 단계 입력을 준비합니다 (측정하지 않음). 측정할 함수 run() → 처리 행 수 를 돌려줍니다. """
+    from kcycle.loader import load_data
+
+    if stage == "generate":
+        from kcycle.synth import write_synthetic
+
+        def run():
+            return write_synthetic(data_dir, opts["scale"], opts["seed"], force=True)["rows"]
+        return run
+
+    if stage == "parse":
+        from kcycle.card_parser import parse_card_html
+        # 앞쪽 일차 몇 개를 출주표 페이지로 그려 둡니다 (페이지당 비용은 규모와 무관)
+        per_day = sum(json.loads((data_dir / "synth.json").read_text(encoding="utf-8"))["volume"]["races_per_day"].values()) * 7
+        card  = pd.read_csv(data_dir / "race_info.csv", dtype=str, keep_default_na=False, nrows=per_day * opts["pages"])
+        pages = [(render_card_page(day), key) for key, day in card.groupby(["연도", "회차", "일차"], sort=False)]
+
+        def run():
+            return sum(len(parse_card_html(html, y, c, d, "")) for html, (y, c, d) in pages)
+        return run
+
+    if stage == "load":
+        shutil.rmtree(data_dir / "cache", ignore_errors=True)
+
+        def run():
+            return len(load_data(data_dir=data_dir))          # CSV 병합 + Parquet 캐시 생성
+        return run
+
+    if stage == "load_cache":
+        def run():
+            return len(load_data(data_dir=data_dir))
+        return run
+
+    if stage == "clean":
+        from kcycle.features import clean_race_data
+        df = load_data(data_dir=data_dir)
+
+        def run():
+            out = clean_race_data(df)
+            out.to_parquet(work / "clean.parquet", index=False)
+            return len(df)
+        return run
+
+    if stage == "features":
+        from kcycle.features import RaceFeaturePipeline
+        from kcycle.tensor import RaceTensor
+        df = pd.read_parquet(work / "clean.parquet")
+
+        def run():
+            rt = RaceTensor.from_frame(RaceFeaturePipeline().fit(df).transform(df))
+            rt.save(work / "tensor")
+            return len(df)
+        return run
+
+    from kcycle.tensor import PER_RACE, RaceTensor
+    rt = RaceTensor.load(work / "tensor")
+
+    if stage == "augment":
+        from kcycle.augment import augment
+
+        def run():
+            return augment(rt, multiplier=1, seed=opts["seed"]).n_races * PER_RACE
+        return run
+
+    if stage == "train":
+        from lightgbm import LGBMRanker
+        from kcycle.models import RaceRanker
+
+        def run():
+            model = RaceRanker(LGBMRanker(n_estimators=opts["estimators"], verbose=-1)).fit(rt)
+            (work / "model.pkl").write_bytes(pickle.dumps(model))
+            return rt.n_races * PER_RACE
+        return run
+
+    if stage == "metrics":
+        from kcycle.metrics import evaluate
+        model = pickle.loads((work / "model.pkl").read_bytes())
+
+        def run():
+            evaluate(rt.rank, model.predict_proba(rt))
+            return rt.n_races * PER_RACE
+        return run
+
+    raise ValueError(f"알 수 없는 단계: {stage}")
+
+
+def run_stage(stage: str, data_dir, work, opts: dict) -> dict:
+    """ 단계 하나를 준비·측정합니다. bench_pipeline 이 단계마다 새 프로세스에서 부릅니다. """
+    data_dir, work = Path(data_dir), Path(work)
+    work.mkdir(parents=True, exist_ok=True)
+    run = _stage_inputs(stage, data_dir, work, opts)
+    with StageMeter() as m:
+        rows = run()
+    return {
+        "rows":     int(rows),
+        "seconds":  round(m.seconds, 3),
+        "rows/s":   round(rows / m.seconds, 1) if m.seconds else None,
+        "base_mb":  round(m.base_mb, 1) if m.base_mb is not None else None,
+        "peak_mb":  round(m.peak_mb, 1) if m.peak_mb is not None else None,
+    }
+
+
+def bench_pipeline(
+    scales=(1, 10, 100),
+    out="./bench_data",
+    stages=PIPELINE_STAGES,
+    seed: int = 0,
+    pages: int = 10,
+    estimators: int = 100,
+    report=None,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """
+    규모(scale)마다 합성 데이터를 out/x{scale} 에 만들고 stages 를 차례로 측정합니다.
+
+    - 단계마다 spawn 한 새 프로세스에서 입력을 읽은 뒤 측정 구간만 잽니다.
+    - 이전 단계 산출물(Parquet 캐시, clean.parquet, RaceTensor, 모델)을 다음 단계가 읽습니다.
+    - 단계가 실패(예외·메모리 부족으로 프로세스 종료)하면 status 에 남기고, 그 산출물이 필요한 뒤 단계만 건너뜁니다.
+    - parse 는 앞쪽 pages 개 일차만 파싱합니다 (페이지당 비용이 규모와 무관하므로 처리량만 봅니다).
+    - generate 는 out/x{scale}/synth.json 이 같은 설정이면 이미 만든 데이터를 재사용합니다.
+    """
+    from kcycle.synth import is_synthetic, synth_meta
+
+    ctx  = multiprocessing.get_context("spawn")
+    rows = []
+    for scale in scales:
+        data_dir = Path(out) / f"x{scale:g}"
+        work     = data_dir / "work"
+        opts     = {"scale": scale, "seed": seed, "pages": pages, "estimators": estimators}
+        meta     = synth_meta(scale, seed)
+        reuse    = is_synthetic(data_dir, meta)
+        failed   = set()
+        for stage in stages:
+            row = {"scale": scale, "stage": stage, "data_rows": meta["rows"]}
+            if STAGE_DEPENDS.get(stage) in failed:
+                failed.add(stage)
+                row["status"] = f"skipped ({STAGE_DEPENDS[stage]})"
+            elif stage == "generate" and reuse:
+                row["status"] = "cached"
+            else:
+                try:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                        row.update(pool.submit(run_stage, stage, data_dir, work, opts).result())
+                    row["status"] = "ok"
+                except BrokenProcessPool:
+                    row["status"] = "killed"
+                    failed.add(stage)
+                except Exception as e:
+                    row["status"] = f"error: {type(e).__name__}: {e}"
+                    failed.add(stage)
+            rows.append(row)
+            if verbose:
+                print({k: v for k, v in row.items() if k != "data_rows"}, flush=True)
+
+    df = pd.DataFrame(rows)
+    if report is not None:
+        report = Path(report)
+        report.parent.mkdir(parents=True, exist_ok=True)
+        report.write_text(json.dumps({
+            "started":  time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cpu":      os.cpu_count(),
+            "seed":     seed,
+            "results":  df.astype(object).where(df.notna(), None).to_dict("records"),
+        }, ensure_ascii=False, indent=1), encoding="utf-8")
+    return df
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="kcycle 벤치마크")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    pc = sub.add_parser("crawl", help="로컬 fixture 서버로 출주표 크롤러 측정")
+    pc.add_argument("--fixtures", required=True, help="저장된 페이지 디렉터리")
+    pc.add_argument("--year", type=int, required=True)
+    pc.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    pc.add_argument("--latency", type=float, default=0.05, help="응답 지연(초)")
+    pc.add_argument("--rate", type=float, default=None, help="초당 최대 요청 수")
+
+    pf = sub.add_parser("fixtures", help="sample 출주표로 fixture 페이지 생성")
+    pf.add_argument("--sample", required=True, help="*_sample.csv 형식의 출주표")
+    pf.add_argument("--out", required=True)
+    pf.add_argument("--days", type=int, default=30)
+    pf.add_argument("--races", type=int, default=15, help="일차당 경주 수")
+
+    pp = sub.add_parser("parse", help="출주표 파싱 처리량 측정")
+    src = pp.add_mutually_exclusive_group(required=True)
+    src.add_argument("--pages", help="저장된 페이지 디렉터리 (fixture 또는 html 캐시)")
+    src.add_argument("--sample", help="*_sample.csv 형식의 출주표로 페이지 생성")
+    pp.add_argument("--n-pages", type=int, default=20, help="--sample 사용 시 페이지 수")
+    pp.add_argument("--parsers", nargs="+", default=["html.parser", "lxml"])
+
+    pl = sub.add_parser("pipeline", help="합성 데이터 1×/10×/100× 규모의 단계별 시간·메모리 측정")
+    pl.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100], help="실제 9년치 대비 배수")
+    pl.add_argument("--out", default="./bench_data", help="합성 데이터·중간 산출물 디렉터리")
+    pl.add_argument("--stages", nargs="+", default=list(PIPELINE_STAGES), choices=PIPELINE_STAGES)
+    pl.add_argument("--seed", type=int, default=0)
+    pl.add_argument("--pages", type=int, default=10, help="parse 단계에서 파싱할 일차 페이지 수")
+    pl.add_argument("--estimators", type=int, default=100, help="train 단계 LGBMRanker 트리 수")
+    pl.add_argument("--report", default=None, help="결과를 저장할 JSON 경로")
+
+    args = p.parse_args()
+    if args.cmd == "fixtures":
+        days = write_fixtures(args.sample, args.out, n_days=args.days, races_per_day=args.races)
+        print(f"✅ fixture 생성: {args.out} ({len(days)} 일차)")
+    elif args.cmd == "crawl":
+        print(bench_crawl(
+            args.fixtures, args.year,
+            concurrencies=args.concurrency, latency=args.latency, rate=args.rate,
+        ).to_string(index=False))
+    elif args.cmd == "parse":
+        print(bench_parse(
+            args.pages, args.sample, parsers=args.parsers, n_pages=args.n_pages,
+        ).to_string(index=False))
+    elif args.cmd == "pipeline":
+        print(bench_pipeline(
+            args.scales, args.out, stages=args.stages, seed=args.seed,
+            pages=args.pages, estimators=args.estimators, report=args.report, verbose=False,
+        ).to_string(index=False))
@@ -0,0 +1,248 @@
+"""
+배당 기반 베팅 시뮬레이터.
+
+race_results.csv 의 배당 컬럼(연승식 ~ 삼쌍승식, "조합|배당|조합|배당" 형식 문자열)을
+경주(race_id)별 숫자 컬럼으로 파싱하고, (n_races, 7) 점수 행렬로 전략별 수익을 계산합니다.
+
+전략은 (베팅 종류, k, threshold) 입니다.
+    - 점수 상위 k 명을 박스로 삽니다. 티켓 수는 베팅 종류에 따라 C(k, s) 또는 P(k, s) 입니다.
+      (복승식 k=2, 삼복승식 k=3 이면 예측 조합 하나만 사는 것과 같습니다.)
+    - 상위 k 번째 선수의 점수가 threshold 이상인 경주에만 겁니다.
+    - 적중한 조합마다 배당 × 1 단위를 돌려받습니다 (티켓 1장 = 1 단위).
+
+경주마다 "조합의 선수가 모두 상위 k 안에 드는 최소 k" 를 한 번 구해 두면 모든 k 의 적중이 나오고,
+threshold 는 경주 축 누적합으로 한꺼번에 계산하므로 수천 개 전략도 몇 초 안에 끝납니다.
+
+    from kcycle.betting import load_odds, simulate
+
+    odds   = load_odds()                                   # race_id 인덱스
+    report = simulate(y_score, rt.race_ids, odds, thresholds=np.linspace(0, 1, 201))
+    report.sort_values('roi', ascending=False).head()
+"""
+import re
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kcycle.loader import result_race_ids
+from kcycle.metrics import order_positions
+from kcycle.tensor import PER_RACE
+
+# 베팅 종류 → (조합 선수 수, 티켓 수 함수(k))
+#   연승식   1명 (입상)              쌍승식  1·2착 순서대로     복승식   1·2착 순서 무관
+#   쌍복승식 1착 + 2·3착 순서 무관   삼복승식 1~3착 순서 무관   삼쌍승식 1~3착 순서대로
+BET_RULES = {
+    '연승식':   (1, lambda k: k),
+    '쌍승식':   (2, lambda k: k * (k - 1)),
+    '복승식':   (2, lambda k: math.comb(k, 2)),
+    '쌍복승식': (3, lambda k: k * math.comb(k - 1, 2)),
+    '삼복승식': (3, lambda k: math.comb(k, 3)),
+    '삼쌍승식': (3, lambda k: k * (k - 1) * (k - 2)),
+}
+ODDS_COLS = list(BET_RULES)
+
+_COMBO_RE = re.compile(r'^\d+(?:\s*[-=>]\s*\d+)*$')
+_SEP_RE   = re.compile(r'\s*[-=>]\s*')
+
+
+def parse_odds_text(text) -> list:
+    """
+    "3-5|12.3" / "3|1.2|5|1.4" / "3-5-4|36.7|3-5-1|20.1" → [(조합 번호 tuple, 배당), ...]
+    조합 토큰 바로 뒤에 숫자 토큰이 오는 쌍만 씁니다 (배당의 ',' 는 무시).
+    """
+    if not isinstance(text, str):
+        return []
+    tokens = [t.strip() for t in text.split('|')]
+    out, i = [], 0
+    while i + 1 < len(tokens):
+        combo, odds = tokens[i], tokens[i + 1].replace(',', '')
+        if _COMBO_RE.match(combo):
+            try:
+                out.append((tuple(int(x) for x in _SEP_RE.split(combo)), float(odds)))
+                i += 2
+                continue
+            except ValueError:
+                pass
+        i += 1
+    return out
+
+
+def _encode(combo) -> int:
+    """ (3, 5, 4) → 354. 선수 번호는 한 자리(1~9)입니다. """
+    code = 0
+    for no in combo:
+        code = code * 10 + no
+    return code
+
+
+def parse_odds(result_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    race_results DataFrame → race_id 인덱스의 숫자 배당 표.
+
+    베팅 종류마다 적중 조합 j (동착이면 여러 개) 에 대해
+        '{종류}_조합{j}' : int 조합 코드 (예: 3-5-4 → 354, 없으면 -1)
+        '{종류}_배당{j}' : float 배당 (없으면 NaN)
+    조합 선수 수가 베팅 종류와 맞지 않는 항목은 버립니다.
+    """
+    race_id, valid = result_race_ids(result_data)
+    cols = {}
+    for bet, (size, _) in BET_RULES.items():
+        if bet not in result_data.columns:
+            continue
+        values = result_data[bet].to_numpy()
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        # 고유 문자열만 파싱
+        parsed = [
+            [(c, o) for c, o in parse_odds_text(u) if len(c) == size and all(1 <= n <= 9 for n in c)]
+            for u in uniques
+        ]
+        width = max((len(p) for p in parsed), default=0)
+        combo = np.full((len(uniques), max(width, 1)), -1, dtype=np.int32)
+        odds  = np.full((len(uniques), max(width, 1)), np.nan)
+        for u, entries in enumerate(parsed):
+            for j, (c, o) in enumerate(entries):
+                combo[u, j], odds[u, j] = _encode(c), o
+        for j in range(max(width, 1)):
+            cols[f'{bet}_조합{j + 1}'] = combo[codes, j]
+            cols[f'{bet}_배당{j + 1}'] = odds[codes, j]
+
+    out = pd.DataFrame(cols, index=pd.Index(race_id, name='race_id'))[valid]
+    return out[~out.index.duplicated()].sort_index()
+
+
+def load_odds(data_dir='./data') -> pd.DataFrame:
+    """ data_dir/race_results.csv 의 배당만 읽어 parse_odds 합니다. """
+    usecols = ['연도', '회차', '일차', '경주'] + ODDS_COLS
+    result_data = pd.read_csv(
+        Path(data_dir) / 'race_results.csv', low_memory=False,
+        usecols=lambda c: c in usecols, dtype={c: str for c in ODDS_COLS},
+    )
+    return parse_odds(result_data)
+
+
+def odds_entries(odds: pd.DataFrame, race_ids, bet: str) -> tuple:
+    """
+    race_ids 순서로 정렬한 bet 의 적중 조합.
+        slots : (n_races, W, size) int   선수 슬롯 (번호 - 1), 없으면 -1
+        pay   : (n_races, W) float       배당, 없으면 0
+    odds 에 없는 경주는 조합이 모두 -1 입니다.
+    """
+    size  = BET_RULES[bet][0]
+    width = sum(1 for c in odds.columns if c.startswith(f'{bet}_조합'))
+    rows  = odds.index.get_indexer(np.asarray(race_ids))
+    found = rows >= 0
+
+    codes = np.full((len(rows), width), -1, dtype=np.int64)
+    pay   = np.zeros((len(rows), width))
+    for j in range(width):
+        codes[found, j] = odds[f'{bet}_조합{j + 1}'].to_numpy()[rows[found]]
+        pay[found, j]   = np.nan_to_num(odds[f'{bet}_배당{j + 1}'].to_numpy()[rows[found]])
+
+    # 조합 코드 → 자리별 선수 번호 → 슬롯
+    digits = (codes[..., None] // 10 ** np.arange(size - 1, -1, -1)) % 10
+    slots  = np.where(codes[..., None] >= 0, digits - 1, -1)
+    pay[codes < 0] = 0.0
+    return slots, pay
+
+
+def _need_k(pos: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    """ (n, W) 조합의 선수가 모두 상위 k 안에 드는 최소 k. 조합이 없으면 PER_RACE + 1 """
+    n, width, size = slots.shape
+    valid = (slots >= 0).all(axis=2) & (slots < pos.shape[1]).all(axis=2)
+    safe  = np.where(slots >= 0, slots, 0).clip(max=pos.shape[1] - 1)
+    p = np.take_along_axis(pos, safe.reshape(n, -1), axis=1).reshape(n, width, size)
+    return np.where(valid, p.max(axis=2) + 1, PER_RACE + 1)
+
+
+def _max_drawdown(pnl: np.ndarray) -> np.ndarray:
+    """
+    (T, n) 경주별 손익 → (T,) 최대 낙폭 (누적 손익의 고점 대비 최대 하락, 시작점 0 포함).
+    pnl 버퍼를 누적합으로 덮어씁니다.
+    """
+    cum  = np.cumsum(pnl, axis=1, out=pnl)
+    peak = np.maximum.accumulate(cum, axis=1)
+    np.maximum(peak, 0, out=peak)
+    peak -= cum
+    return peak.max(axis=1, initial=0)
+
+
+def simulate(
+    y_score: np.ndarray,
+    race_ids,
+    odds: pd.DataFrame,
+    bet_types=ODDS_COLS,
+    ks=range(1, PER_RACE + 1),
+    thresholds=None,
+    max_cells: int = 1 << 22,
+) -> pd.DataFrame:
+    """
+    전략 격자 (베팅 종류 × k × threshold) 의 성과.
+
+    Parameters
+    ----------
+    y_score : (n_races, 7) 점수 (슬롯 = 번호 - 1)
+    race_ids : (n_races,) 경주 키. 낙폭은 race_id 순서(시간순)로 계산합니다.
+    odds : parse_odds / load_odds 결과
+    ks : 박스로 살 상위 선수 수. 베팅 종류의 조합 선수 수보다 작은 k 는 건너뜁니다.
+    thresholds : 상위 k 번째 점수의 하한 목록 (기본 0 ~ 1, 0.01 간격)
+    max_cells : 낙폭 계산 때 한 번에 만들 (threshold × 경주) 칸 수 상한
+
+    Returns
+    -------
+    DataFrame (전략마다 한 행)
+        bet_type, k, threshold,
+        races    : 배당이 있는 경주 수
+        bets     : 건 경주 수,  tickets : 산 티켓 수 (= 투입 단위)
+        hits     : 적중 경주 수, hit_rate : hits / bets
+        returns  : 돌려받은 금액, profit : returns - tickets, roi : profit / tickets
+        max_drawdown : 누적 손익의 최대 낙폭 (단위)
+    """
+    y_score  = np.asarray(y_score, dtype=np.float64)
+    race_ids = np.asarray(race_ids)
+    order    = np.argsort(race_ids, kind='stable')
+    y_score, race_ids = y_score[order], race_ids[order]
+
+    thresholds = np.linspace(0, 1, 101) if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+    pos    = order_positions(y_score)
+    ranked = -np.sort(-y_score, axis=1)     # 상위 k 번째 점수 = ranked[:, k-1]
+    chunk  = max(1, max_cells // max(1, len(race_ids)))
+
+    rows = []
+    for bet in bet_types:
+        size, n_tickets = BET_RULES[bet]
+        slots, pay = odds_entries(odds, race_ids, bet)
+        has  = pay.sum(axis=1) > 0
+        need = _need_k(pos[has], slots[has])
+        pay, conf_all = pay[has], ranked[has]
+
+        for k in ks:
+            if k < size or k > PER_RACE:
+                continue
+            cost = n_tickets(k)
+            ret  = (pay * (need <= k)).sum(axis=1)       # 경주별 환급
+            conf = conf_all[:, k - 1]
+
+            # 건 경주 수·환급·적중은 점수 내림차순 누적합에서 threshold 마다 이진 탐색
+            desc  = np.argsort(-conf, kind='stable')
+            cnt   = np.searchsorted(-conf[desc], -thresholds, side='right')
+            c_ret = np.r_[0.0, np.cumsum(ret[desc])][cnt]
+            c_hit = np.r_[0, np.cumsum(ret[desc] > 0)][cnt]
+
+            # 낙폭만 시간순 (threshold × 경주) 누적이 필요합니다
+            pnl = ret - cost
+            dd  = np.concatenate([
+                _max_drawdown((conf[None, :] >= thresholds[s:s + chunk, None]) * pnl[None, :])
+                for s in range(0, len(thresholds), chunk)
+            ]) if len(thresholds) else np.empty(0)
+            for t, b, r, h, d in zip(thresholds, cnt, c_ret, c_hit, dd):
+                staked = b * cost
+                rows.append({
+                    'bet_type': bet, 'k': k, 'threshold': t,
+                    'races': int(has.sum()), 'bets': int(b), 'tickets': int(staked),
+                    'hits': int(h), 'hit_rate': h / b if b else np.nan,
+                    'returns': r, 'profit': r - staked, 'roi': (r - staked) / staked if staked else np.nan,
+                    'max_drawdown': d,
+                })
+    return pd.DataFrame(rows)
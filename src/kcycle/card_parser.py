@@ -0,0 +1,293 @@
+"""
+출주표 페이지 파싱 엔진.
+
+parse_all_races / parse_one_race 가 공유하는 단일 파서입니다.
+lxml 이 설치되어 있으면 lxml.html 트리를 컴파일된 XPath 로 직접 훑고,
+없으면(또는 BeautifulSoup 객체를 넘기면) 컴파일된 soupsieve 선택자로 같은 일을 합니다.
+세 표(기본 정보·훈련·최근 성적)는 선수 번호로 이어 붙여 행 리스트로 모으고,
+하루치 페이지에서 DataFrame 은 한 번만 만듭니다.
+"""
+import re
+
+import pandas as pd
+import soupsieve as sv
+from bs4 import BeautifulSoup
+
+from kcycle import fetcher, telemetry
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml 이 없으면 BeautifulSoup 경로만 사용
+    etree = lxml_html = None
+
+TITLE_RE   = re.compile(r"(.+?)\s+(\d+)경주\s*\(\s*(\S+)\s+([\d:]+)\s*\)")
+RACE_NO_RE = re.compile(r"(\d+)경주")
+OTHER_RE   = re.compile(r"(\d+)기/(\d+)세")
+ONCLICK_RE = re.compile(r"scrlMoveTo\(['\"]([^'\"]+)['\"]")
+
+META_COLS  = ["날짜", "연도", "회차", "일차", "경주지역", "경주번호", "경주종류", "경주시간"]
+BASE_COLS  = [
+    "이름", "번호", "기수", "나이",
+    "기어배수", "200m", "훈련지", "승률", "연대율", "삼연대율", "입상/출전", "선행",
+    "젖히기", "추입", "마크", "등급조정", "최근3득점", "최근3순위",
+]
+TRAIN_COLS = ["훈련일수", "훈련동참자", "훈련내용"]
+REC_COLS   = [
+    "최근3_장소일자", "최근3_1일", "최근3_2일", "최근3_3일",
+    "최근2_장소일자", "최근2_1일", "최근2_2일", "최근2_3일",
+    "최근1_장소일자", "최근1_1일", "최근1_2일", "최근1_3일",
+    "금회_1일", "금회_2일", "금회_3일",
+]
+COLUMNS = META_COLS + BASE_COLS + TRAIN_COLS + REC_COLS
+
+
+class SoupOps:
+    """ BeautifulSoup 트리용 노드 연산 (컴파일된 soupsieve 선택자 사용). """
+
+    BUTTONS = sv.compile("div.swiper-slide button")
+    TABLES  = sv.compile("table.excel_table")
+    ROWS    = sv.compile("tbody tr")
+
+    @staticmethod
+    def parse(html: str):
+        return BeautifulSoup(html, "html.parser")
+
+    @classmethod
+    def buttons(cls, doc):
+        for btn in cls.BUTTONS.select(doc):
+            yield cls.text(btn, "region"), cls.text(btn, "date"), btn.get("onclick", "")
+
+    @staticmethod
+    def race_divs(doc) -> dict:
+        return {d["id"]: d for d in doc.find_all("div", id=True)}
+
+    @staticmethod
+    def title(race) -> str:
+        h2 = race.find("h2")
+        return h2.get_text(strip=True) if h2 else ""
+
+    @classmethod
+    def tables(cls, race) -> list:
+        return cls.TABLES.select(race)
+
+    @classmethod
+    def rows(cls, table) -> list:
+        return cls.ROWS.select(table)
+
+    # 행 안의 작은 서브트리는 CSS 매칭보다 find 가 훨씬 빠릅니다
+    @staticmethod
+    def name(r):
+        box = r.find(class_="name")
+        a = box.find("a") if box else None
+        return a.text.strip() if a else None
+
+    @staticmethod
+    def text(r, cls: str) -> str:
+        tag = r.find(class_=cls)
+        return tag.get_text(strip=True) if tag else ""
+
+    @staticmethod
+    def cells(r) -> list:
+        return [td.get_text(strip=True) for td in r.find_all("td")]
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlOps:
+    """ lxml.html 트리용 노드 연산 (컴파일된 XPath 사용). """
+
+    if etree is not None:
+        BUTTONS   = etree.XPath(f"//div[{_has_class('swiper-slide')}]//button")
+        RACE_DIVS = etree.XPath("//div[@id]")
+        H2        = etree.XPath(".//h2")
+        TABLES    = etree.XPath(f".//table[{_has_class('excel_table')}]")
+        ROWS      = etree.XPath(".//tbody//tr")
+        NAME      = etree.XPath(f".//*[{_has_class('name')}]//a")
+        TDS       = etree.XPath(".//td")
+        TEXTS     = etree.XPath(".//text()")
+        CLASS     = {
+            c: etree.XPath(f".//*[{_has_class(c)}]")
+            for c in ("region", "date", "sign", "other")
+        }
+
+    @staticmethod
+    def parse(html: str):
+        return lxml_html.fromstring(html)
+
+    @classmethod
+    def _strip_text(cls, el) -> str:
+        # BeautifulSoup 의 get_text(strip=True) 와 같은 규칙
+        return "".join(t.strip() for t in cls.TEXTS(el))
+
+    @classmethod
+    def buttons(cls, doc):
+        for btn in cls.BUTTONS(doc):
+            yield cls.text(btn, "region"), cls.text(btn, "date"), btn.get("onclick", "")
+
+    @classmethod
+    def race_divs(cls, doc) -> dict:
+        return {d.get("id"): d for d in cls.RACE_DIVS(doc)}
+
+    @classmethod
+    def title(cls, race) -> str:
+        h2 = cls.H2(race)
+        return cls._strip_text(h2[0]) if h2 else ""
+
+    @classmethod
+    def tables(cls, race) -> list:
+        return cls.TABLES(race)
+
+    @classmethod
+    def rows(cls, table) -> list:
+        return cls.ROWS(table)
+
+    @classmethod
+    def name(cls, r):
+        a = cls.NAME(r)
+        return "".join(cls.TEXTS(a[0])).strip() if a else None
+
+    @classmethod
+    def text(cls, r, c: str) -> str:
+        tag = cls.CLASS[c](r)
+        return cls._strip_text(tag[0]) if tag else ""
+
+    @classmethod
+    def cells(cls, r) -> list:
+        return [cls._strip_text(td) for td in cls.TDS(r)]
+
+
+def make_doc(html):
+    """
+    html 문자열은 현재 백엔드(fetcher.PARSER)로, BeautifulSoup 객체는 그대로 씁니다.
+    (ops, doc) 를 돌려줍니다.
+    """
+    if isinstance(html, BeautifulSoup):
+        return SoupOps, html
+    if fetcher.PARSER == "lxml" and lxml_html is not None:
+        return LxmlOps, LxmlOps.parse(html)
+    return SoupOps, SoupOps.parse(html)
+
+
+def find_race_ids(ops, doc, region: str = None, race_no: str = None) -> list:
+    """
+    swiper 버튼에서 경주 div id 를 모읍니다.
+    region 을 주면 region(과 race_no) 이 일치하는 첫 경주 하나만 돌려줍니다.
+    """
+    race_ids = []
+    for reg, num, onclick in ops.buttons(doc):
+        if region is not None and (reg != region or (race_no is not None and num != race_no)):
+            continue
+        m = ONCLICK_RE.search(onclick)
+        if m:
+            race_ids.append(m.group(1))
+            if region is not None:
+                break
+    return race_ids
+
+
+def _side_rows(ops, table, cols) -> tuple:
+    """
+    훈련/최근성적 표의 행을 선수 번호(.sign)와 이름 양쪽으로 색인합니다.
+    값은 cols 순서의 리스트이며 모자란 칸은 "" 로 채웁니다.
+    """
+    by_no, by_name = {}, {}
+    for r in ops.rows(table):
+        name = ops.name(r)
+        if name is None:
+            continue
+        vals = (ops.cells(r) + [""] * len(cols))[:len(cols)]
+        sign = ops.text(r, "sign")
+        if sign:
+            by_no.setdefault(sign, vals)
+        by_name.setdefault(name, vals)
+    return by_no, by_name
+
+
+def parse_race(ops, race, year: int, 회차: str, 일차: str, 날짜: str) -> list:
+    """
+    경주 div 하나를 파싱해 선수별 행(list)을 COLUMNS 순서로 돌려줍니다.
+    세 표는 선수 번호로 이어 붙이며, 번호가 없는 행은 이름으로 찾습니다.
+    참가 선수가 7명이 아니면 [] 를 돌려줍니다.
+    """
+    title = ops.title(race)
+    m = TITLE_RE.match(title)
+    if m:
+        경주지역, 경주번호, 경주종류, 경주시간 = m.groups()
+    else:
+        경주지역 = 경주종류 = 경주시간 = ""
+        no = RACE_NO_RE.search(title)
+        경주번호 = no.group(1) if no else ""
+    meta = [날짜, year, 회차, 일차, 경주지역, 경주번호, 경주종류, 경주시간]
+
+    tables = ops.tables(race)
+    if len(tables) < 3:
+        return []
+
+    # (가) 기본 선수 정보
+    base = []
+    for r in ops.rows(tables[0]):
+        name = ops.name(r)
+        if name is None:
+            continue
+        t = ops.cells(r)
+        # 결장 선수가 있으면 생략
+        if len(t) < 14:
+            continue
+        # "01기/51세" → 기수, 나이 분리
+        mm = OTHER_RE.match(ops.text(r, "other"))
+        기수, 나이 = (mm.group(1), mm.group(2)) if mm else ("", "")
+        base.append((name, ops.text(r, "sign"), 기수, 나이, t[:14]))
+
+    # 참가 선수가 7명이 아니면 생략
+    if len(base) != 7:
+        return []
+
+    # (나) 훈련 상담, (다) 최근 성적
+    train_no, train_name = _side_rows(ops, tables[1], TRAIN_COLS)
+    rec_no,   rec_name   = _side_rows(ops, tables[2], REC_COLS)
+    no_train = [None] * len(TRAIN_COLS)
+    no_rec   = [None] * len(REC_COLS)
+
+    rows = []
+    for 이름, 번호, 기수, 나이, t in base:
+        rows.append(
+            meta + [이름, 번호, 기수, 나이] + t
+            + (train_no.get(번호) or train_name.get(이름) or no_train)
+            + (rec_no.get(번호)   or rec_name.get(이름)   or no_rec)
+        )
+    return rows
+
+
+def parse_races(ops, doc, race_ids, year: int, 회차: str, 일차: str, 날짜: str) -> pd.DataFrame:
+    """
+    race_ids 의 경주들을 파싱해 DataFrame 하나로 만듭니다.
+    경주 div 가 하나도 없으면 깨진 페이지로 보고 ValueError 를 냅니다.
+    (7명 경주가 없어 빈 DataFrame 인 것과 구분합니다)
+    """
+    # 경주 div 는 id 로 한 번에 색인해 경주마다 문서 전체를 다시 훑지 않습니다
+    divs = ops.race_divs(doc) if race_ids else {}
+    races = [divs[rid] for rid in race_ids if rid in divs]
+    if not races:
+        raise ValueError(f"경주를 찾을 수 없습니다. (경주 버튼 {len(race_ids)}개)")
+    rows = []
+    for race in races:
+        with telemetry.timer("parse_race"):
+            rows.extend(parse_race(ops, race, year, 회차, 일차, 날짜))
+    with telemetry.timer("parse_frame"):
+        return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def parse_card_html(
+    html, year: int, 회차: str, 일차: str, 날짜: str,
+    region: str = None, race_no: str = None
+) -> pd.DataFrame:
+    """
+    출주표 페이지(html 문자열 또는 BeautifulSoup)를 파싱해 하루치 DataFrame 하나를 만듭니다.
+    region/race_no 를 주면 일치하는 경주만, race_no 가 None 이면 region 의 첫 경주만 파싱합니다.
+    파싱할 경주가 없으면 ValueError 를 내서 크롤러가 그 일차를 완료로 기록하지 않고 다시 받게 합니다.
+    """
+    with telemetry.timer("parse_doc"):
+        ops, doc = make_doc(html)
+    return parse_races(ops, doc, find_race_ids(ops, doc, region, race_no), year, 회차, 일차, 날짜)
@@ -0,0 +1,162 @@
+"""
+재개 가능한 증분 크롤링을 위한 원본 페이지 캐시와 체크포인트 매니페스트.
+
+- PageCache : URL 해시로 주소를 정하는 gzip html 캐시. 재파싱에 네트워크가 필요 없습니다.
+- Manifest  : 출력에 기록을 마친 (연도, 회차, 일차) 목록.
+- append_csv: 일차 단위로 결과 CSV 에 이어 씁니다.
+- DayWriter : 크롤러 on_day 콜백. CSV + Manifest 또는 파티션 데이터셋(storage)에 일차를 기록합니다.
+
+날짜가 지나지 않은 일차(오늘·미래)는 아직 바뀔 수 있으므로 캐시를 건너뛰고 새로 받되 캐시에 저장하지
+않습니다. 그래서 일차가 확정된 뒤 첫 실행은 최신 페이지를 다시 받고, 출력과 매니페스트에는 날짜가 지난
+일차만 기록합니다.
+"""
+import os
+import gzip
+import json
+import hashlib
+import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from kcycle import telemetry
+
+
+def _atomic_write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PageCache:
+    """ root/ab/abcdef….html.gz 형태로 URL 별 원본 html 을 저장합니다. """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, url: str) -> Path:
+        h = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / h[:2] / f"{h}.html.gz"
+
+    def get(self, url: str):
+        p = self.path(url)
+        if not p.is_file():
+            return None
+        return gzip.decompress(p.read_bytes()).decode("utf-8")
+
+    def put(self, url: str, text: str):
+        _atomic_write(self.path(url), gzip.compress(text.encode("utf-8")))
+
+
+def day_key(year, 회차, 일차) -> str:
+    return f"{int(year)}-{int(회차)}-{int(일차)}"
+
+
+class Manifest:
+    """ 출력에 기록을 마친 일차 키("2023-16-3")를 json 으로 보관합니다. """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        if self.path.is_file():
+            self.done = set(json.loads(self.path.read_text(encoding="utf-8"))["done"])
+
+    def __contains__(self, key) -> bool:
+        return key in self.done
+
+    def add(self, key: str):
+        self.done.add(key)
+        self.save()
+
+    def save(self):
+        with telemetry.timer("manifest"):
+            body = json.dumps({"done": sorted(self.done)}, ensure_ascii=False, indent=0)
+            _atomic_write(self.path, body.encode("utf-8"))
+
+    def seed_from_csv(self, csv_path):
+        """ 매니페스트 없이 만들어진 기존 출력 CSV 의 일차들을 완료로 등록합니다. """
+        keys = pd.read_csv(csv_path, usecols=["연도", "회차", "일차"]).drop_duplicates()
+        self.done.update(day_key(*k) for k in keys.itertuples(index=False))
+        self.save()
+
+
+def is_final(날짜: str, today: datetime.date = None) -> bool:
+    """ 날짜(yyyymmdd)가 오늘 이전이면 더 이상 바뀌지 않는 일차로 봅니다. """
+    today = today or datetime.date.today()
+    return 날짜 < today.strftime("%Y%m%d")
+
+
+def is_open_year(year, today: datetime.date = None) -> bool:
+    """ 올해(또는 미래) 연도는 일차 목록이 계속 늘어납니다. """
+    today = today or datetime.date.today()
+    return int(year) >= today.year
+
+
+def append_csv(df: pd.DataFrame, path):
+    """ 파일이 없으면 BOM 과 헤더를 포함해 새로 쓰고, 있으면 행만 이어 씁니다. """
+    path = Path(path)
+    with telemetry.timer("write_csv"):
+        if path.exists() and path.stat().st_size > 0:
+            df.to_csv(path, mode="a", header=False, index=False, encoding="utf-8")
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(path, index=False, encoding="utf-8-sig")
+    telemetry.count("rows_written", len(df))
+
+
+def open_checkpoint(output, manifest_path=None, full: bool = False) -> Manifest:
+    """
+    출력 CSV 에 대응하는 매니페스트를 엽니다.
+    full 이면 기존 출력과 매니페스트를 지우고 처음부터 시작합니다.
+    """
+    output   = Path(output)
+    manifest = Path(manifest_path or f"{output}.manifest.json")
+    if full:
+        output.unlink(missing_ok=True)
+        manifest.unlink(missing_ok=True)
+    m = Manifest(manifest)
+    if not manifest.exists() and output.exists():
+        m.seed_from_csv(output)
+    return m
+
+
+class DayWriter:
+    """
+    크롤러 on_day(key, df) 콜백. 날짜가 지난 일차를 파싱 즉시 기록하고 완료로 남깁니다.
+
+    - store(storage.PartitionedDataset) 가 있으면 그 일차가 속한 회차 파티션(part.parquet)을 다시 씁니다.
+      파티션 파일 메타데이터의 일차 목록이 완료 기록이므로 데이터셋 자체가 manifest 가 됩니다.
+    - 없으면 output CSV 에 행을 이어 쓰고 manifest(Manifest) 에 완료로 기록합니다.
+    """
+
+    def __init__(self, output, manifest=None, store=None):
+        self.output   = output
+        self.store    = store
+        self.manifest = store if store is not None else manifest
+        self.n_rows   = 0
+
+    def __call__(self, key: str, df: pd.DataFrame):
+        if self.store is not None:
+            self.store.write_day(key, df)
+        else:
+            if not df.empty:
+                append_csv(df, self.output)
+            self.manifest.add(key)
+        self.n_rows += len(df)
+
+
+def open_day_writer(output, manifest_path=None, full: bool = False, dataset=None, kind: str = None) -> DayWriter:
+    """
+    크롤러 CLI 의 출력 설정(--output/--manifest/--full/--dataset)으로 DayWriter 를 엽니다.
+    dataset 을 주면 CSV 대신 kind 종류의 파티션 데이터셋에 씁니다.
+    """
+    if dataset:
+        from kcycle.storage import PartitionedDataset
+
+        store = PartitionedDataset(dataset, kind)
+        if full:
+            store.clear()
+        return DayWriter(dataset, store=store)
+    return DayWriter(output, manifest=open_checkpoint(output, manifest_path, full=full))
@@ -0,0 +1,390 @@
+"""
+출주표 피처 엔지니어링.
+
+example.ipynb 의 clean_race_data → impute_missing_value → drop_constant_columns →
+drop_unused_columns → encode_categorical → cast_features 흐름을 패키지로 옮긴 것입니다.
+
+- clean_race_data : 문자열 컬럼을 숫자/범주로 정리합니다. 같은 형식의 컬럼 묶음은
+  하나로 쌓아 고유값에만 정규식을 한 번 적용하고, 버릴 컬럼은 한 번에 drop 합니다.
+- RaceFeaturePipeline : 학습 데이터에서 등급별 평균, 상수 컬럼, 범주 사전을 fit 하고
+  검증·테스트·당일 출주표에는 같은 통계로 transform 만 합니다.
+- RowEncoder : fit 된 파이프라인의 clean_race_data → transform 을 출주표 행(dict) 단위로 합니다.
+  한두 경주처럼 작은 입력용 (serve).
+
+    from kcycle.loader import load_data
+    from kcycle.features import clean_race_data, RaceFeaturePipeline
+
+    df = clean_race_data(load_data())
+    pipe = RaceFeaturePipeline().fit(train_df)
+    X_train, X_val = pipe.transform(train_df), pipe.transform(val_df)
+"""
+import re
+import math
+
+import numpy as np
+import pandas as pd
+
+# 드롭할 컬럼
+DROP_COLS = [
+    '경주시간', '이름', '기수', '훈련지',
+    '훈련동참자', '훈련내용', '훈련일수',
+    '최근3_장소일자', '최근2_장소일자', '최근1_장소일자',
+]
+
+# 괄호 안 보조 수치를 떼어낼 지표 컬럼
+RATE_COLS = ['승률', '연대율', '삼연대율', '입상/출전', '선행', '젖히기', '추입', '마크']
+
+# 최근 경주 기록 ("선발 5-2선" 형식)
+RECENT_COLS = [
+    '최근3_1일', '최근3_2일', '최근3_3일',
+    '최근2_1일', '최근2_2일', '최근2_3일',
+    '최근1_1일', '최근1_2일', '최근1_3일',
+    '금회_1일', '금회_2일', '금회_3일',
+]
+RANK_COLS = [f'{c}_순위' for c in RECENT_COLS]
+
+# 경주종류 단순화
+RACE_TYPE_MAP = {
+    '특선': '특선',
+    '특별특선': '특선',
+    '특선결승': '특선결승',
+    '특선준결': '특선결승',
+    '그랑프리결승': '특선결승',
+    '우수': '우수',
+    '우수결승': '우수결승',
+    '우수준결': '우수결승',
+    '선발': '선발',
+    '선발결승': '선발결승',
+    '선발준결': '선발결승',
+
+    '준결': '특선',  # 준결 경기에는 S등급 선수들이 가장 많음
+    '특별': '우수',  # 특별 경기에는 A등급 선수들이 가장 많음
+    '특우': '특선',  # 특우 경기에는 S등급 선수들이 가장 많음
+    '특별우수': '우수',
+}
+
+# 현재 등급 평균으로 결측을 채울 컬럼
+IMPUTE_COLS = ['200m', '종합_3득점']
+
+CAT_COLS = ['경주지역', '경주종류', '번호', '현재_등급', '이전_등급'] + RANK_COLS
+
+UNUSED_COLS = ['날짜', '연도', '회차', '일차', '경주번호']
+
+KEY_COL   = 'race_id'
+LABEL_COL = 'rank'
+
+
+def _stacked(df: pd.DataFrame, cols) -> np.ndarray:
+    """ 여러 컬럼을 문자열 배열 하나로 이어 붙입니다 (행 우선). """
+    return df[cols].astype(str).to_numpy().ravel()
+
+
+def _on_unique(values, func) -> pd.DataFrame:
+    """
+    func(고유값 Series) 를 고유값에만 적용하고 코드로 원래 길이에 펼칩니다.
+    출주표 문자열은 반복이 많아 행마다 정규식을 돌리는 것보다 훨씬 빠릅니다.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    res = func(pd.Series(uniques, dtype=object))
+    return res.iloc[codes].reset_index(drop=True)
+
+
+def clean_race_data(df: pd.DataFrame, region: str = '광명') -> pd.DataFrame:
+    """
+    load_data() 결과를 정리합니다.
+    region 이 None 이면 모든 경주장을 유지합니다.
+    """
+    if region is not None:
+        df = df[(df['경주지역'] == region).to_numpy()]
+    n = len(df)
+
+    # 지표관련 변수: 괄호 바깥쪽 데이터 사용 (8개 컬럼을 한 번에)
+    rates = _on_unique(
+        _stacked(df, RATE_COLS),
+        lambda s: s.str.replace(r"\(.*?\)", "", regex=True).str.strip(),
+    ).to_numpy().reshape(n, len(RATE_COLS))
+    rates = pd.DataFrame(rates, columns=RATE_COLS, index=df.index)
+
+    # '입상/출전' 분리
+    ratio_split = _on_unique(rates['입상/출전'], lambda s: s.str.extract(r"(\d+)/(\d+)").astype(float))
+
+    # '최근3순위' 계산 (소수) ('279/554' → 0.5036)
+    ratio_recent = _on_unique(
+        df['최근3순위'].astype(str), lambda s: s.str.extract(r"(\d+)/(\d+)").astype(float)
+    )
+
+    # 등급조정, 현재와 이전 등급 분리
+    grade = _on_unique(
+        df['등급조정'].astype(str), lambda s: pd.DataFrame({0: s.str.slice(5, 7), 1: s.str.slice(12, 14)})
+    )
+
+    # 최근3득점: 광명과 종합 점수를 정규식 한 번으로 분리
+    score = _on_unique(
+        df['최근3득점'].astype(str),
+        lambda s: s.str.extract(
+            r"(?s)^(?=(?:.*?\(광명\)\s*([\d.]+))?)(?=(?:.*?\(종합\)\s*([\d.]+))?)"
+        ).apply(pd.to_numeric, errors='coerce'),
+    )
+
+    # 최근 경주 순위: 12개 컬럼을 쌓아서 정규식 한 번으로 추출
+    recent = _on_unique(
+        _stacked(df, RECENT_COLS),
+        lambda s: pd.to_numeric(s.str.extract(r'^(\S{2})\s*(\d+)-(\d+)(\S?)')[2], errors='coerce'),
+    ).clip(upper=7).to_numpy().reshape(n, len(RECENT_COLS))
+
+    out = df.drop(columns=DROP_COLS + ['입상/출전', '등급조정', '최근3득점'] + RECENT_COLS, errors='ignore')
+    out = out.assign(**{
+        '기어배수': _on_unique(df['기어배수'].astype(str), lambda s: s.str.strip().str[:4]).to_numpy(),
+        '200m':     _on_unique(df['200m'].astype(str), lambda s: s.str.replace('"', '.', regex=False)).to_numpy(),
+        **{col: rates[col] for col in RATE_COLS if col != '입상/출전'},
+        '최근3순위': (ratio_recent[0] / ratio_recent[1]).to_numpy(),
+        '경주종류': df['경주종류'].astype(str).map(RACE_TYPE_MAP),
+    })
+    added = pd.DataFrame({
+        '입상':       ratio_split[0].to_numpy(),
+        '출전':       ratio_split[1].to_numpy(),
+        '현재_등급':  grade[0].to_numpy(),
+        '이전_등급':  grade[1].to_numpy(),
+        '광명_3득점': score[0].to_numpy(),
+        '종합_3득점': score[1].to_numpy(),
+        **{col: recent[:, i] for i, col in enumerate(RANK_COLS)},
+    }, index=df.index)
+
+    return pd.concat([out, added], axis=1).reset_index(drop=True)
+
+
+class RaceFeaturePipeline:
+    """
+    clean_race_data 결과 → 모델 입력 피처.
+
+    fit 에서 학습 데이터의 통계를 저장하고 transform 은 저장된 통계만 씁니다.
+        group_means_   : {컬럼: {현재_등급: 평균}}  (200m, 종합_3득점 결측 대체)
+        constant_cols_ : 학습 데이터에서 값이 하나뿐인 컬럼
+        vocab_         : {범주 컬럼: 정렬된 값 목록}  (LabelEncoder 와 같은 코드)
+        columns_       : 출력 피처 컬럼 순서
+
+    transform 결과는 피처 컬럼(+ 입력에 있으면 rank)이며, race_id 가 있으면 인덱스로 둡니다.
+    학습 때 없던 범주 값은 -1 로 인코딩합니다.
+    """
+
+    def __init__(self, cat_cols=CAT_COLS, unused_cols=UNUSED_COLS):
+        self.cat_cols    = list(cat_cols)
+        self.unused_cols = list(unused_cols)
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.assign(**{
+            '200m': pd.to_numeric(df['200m'].replace('-', np.nan), errors='coerce'),
+            # 최근 순위가 결측인 경우(후보, 결장 등), 입상하지 못한 것과 동일하게 대체
+            # 1,2,3 > 순위 / 4 > 미입상
+            **{col: df[col].fillna(7).clip(upper=4) for col in RANK_COLS if col in df.columns},
+        })
+        return df
+
+    def _impute(self, df: pd.DataFrame) -> pd.DataFrame:
+        # 선수가 속한 현재 등급의 평균으로 대체
+        grade = df['현재_등급']
+        return df.assign(**{
+            col: df[col].fillna(grade.map(means).astype(float))
+            for col, means in self.group_means_.items()
+        })
+
+    def _reset(self):
+        self._sums      = {col: pd.Series(dtype=float) for col in IMPUTE_COLS}
+        self._counts    = {col: pd.Series(dtype=float) for col in IMPUTE_COLS}
+        self._null_grade = {col: set() for col in IMPUTE_COLS}
+        self._features  = None
+        self._seen      = {}
+
+    def fit(self, df: pd.DataFrame):
+        self._reset()
+        return self.partial_fit(df)
+
+    def partial_fit(self, df: pd.DataFrame):
+        """
+        조각(iter_data) 단위로 통계를 누적합니다. 모든 조각을 넣은 뒤의 결과는
+        전체를 한 번에 fit 한 것과 같습니다.
+        """
+        if getattr(self, '_seen', None) is None:
+            self._reset()
+        x = self._prepare(df)
+        grade = x['현재_등급']
+
+        # 등급별 합계·개수 (평균은 누적이 끝난 뒤 계산)
+        for col in IMPUTE_COLS:
+            agg = x[col].groupby(grade, observed=True).agg(['sum', 'count'])
+            self._sums[col]   = self._sums[col].add(agg['sum'], fill_value=0)
+            self._counts[col] = self._counts[col].add(agg['count'], fill_value=0)
+            self._null_grade[col].update(pd.unique(grade[x[col].isna()].dropna()).tolist())
+
+        # 관측된 값 (범주 컬럼은 전부, 나머지는 상수 여부만 알면 되므로 2개까지)
+        if self._features is None:
+            self._features = [c for c in x.columns if c not in (KEY_COL, LABEL_COL)]
+        for col in self._features:
+            seen = self._seen.setdefault(col, set())
+            if col in self.cat_cols or len(seen) < 2:
+                values = pd.unique(x[col].dropna())
+                seen.update((values if col in self.cat_cols else values[:2]).tolist())
+
+        self._finalize()
+        return self
+
+    def _finalize(self):
+        self.group_means_ = {
+            col: (self._sums[col] / self._counts[col]).to_dict() for col in IMPUTE_COLS
+        }
+
+        def n_values(col):
+            seen = self._seen[col]
+            if col in self.group_means_:
+                # 결측은 등급 평균으로 채워지므로 그 값도 관측값에 포함
+                means = self.group_means_[col]
+                seen = seen | {means[g] for g in self._null_grade[col] if not pd.isna(means.get(g))}
+            return len(seen)
+
+        self.constant_cols_ = [c for c in self._features if n_values(c) == 1]
+
+        drop = set(self.constant_cols_) | set(self.unused_cols)
+        self.columns_ = [c for c in self._features if c not in drop]
+        self.vocab_ = {
+            col: sorted(self._seen[col]) for col in self.cat_cols if col in self.columns_
+        }
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        x = self._impute(self._prepare(df))
+
+        out = {}
+        for col in self.columns_:
+            if col in self.vocab_:
+                out[col] = pd.Categorical(x[col], categories=self.vocab_[col]).codes.astype(np.int64)
+            elif pd.api.types.is_numeric_dtype(x[col]):
+                out[col] = x[col].to_numpy()
+            else:
+                out[col] = _on_unique(x[col], lambda s: pd.to_numeric(s, errors='coerce')).to_numpy()
+        if LABEL_COL in x.columns:
+            out[LABEL_COL] = x[LABEL_COL].to_numpy()
+
+        index = pd.Index(x[KEY_COL].to_numpy(), name=KEY_COL) if KEY_COL in x.columns else None
+        return pd.DataFrame(
+            {k: np.asarray(v) for k, v in out.items()}, index=index
+        )
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+
+# ───── 행 단위 경로 (당일 출주표) ──────────────────────────────────────────
+# 7행짜리 출주표에서는 pandas 연산 하나하나의 고정 비용이 대부분이라
+# clean_race_data → transform 을 행마다 파이썬으로 다시 계산합니다. 결과는 같습니다.
+
+_PAREN_RE  = re.compile(r"\(.*?\)")
+_RATIO_RE  = re.compile(r"(\d+)/(\d+)")
+_SCORE_RE  = re.compile(r"(?s)^(?=(?:.*?\(광명\)\s*([\d.]+))?)(?=(?:.*?\(종합\)\s*([\d.]+))?)")
+_RECENT_RE = re.compile(r'^(\S{2})\s*(\d+)-(\d+)(\S?)')
+
+
+def _str(v):
+    """ 결측(None, NaN, '')이면 None, 아니면 str """
+    if v is None or v == '' or (isinstance(v, float) and math.isnan(v)):
+        return None
+    return str(v)
+
+
+def _num(v) -> float:
+    """ pd.to_numeric(errors='coerce') 와 같은 스칼라 변환 """
+    s = _str(v)
+    if s is None:
+        return math.nan
+    try:
+        return float(s) if '_' not in s else math.nan
+    except ValueError:
+        return math.nan
+
+
+def _ratio(s, i=None):
+    m = _RATIO_RE.search(s) if s is not None else None
+    if m is None:
+        return math.nan
+    a, b = float(m.group(1)), float(m.group(2))
+    if i is not None:
+        return (a, b)[i]
+    return a / b if b else (math.nan if a == 0 else math.inf)
+
+
+def _rate(s):
+    return None if s is None else _PAREN_RE.sub('', s).strip()
+
+
+def _score(s, i):
+    return math.nan if s is None else _num(_SCORE_RE.match(s).group(i + 1))
+
+
+def _recent_rank(s):
+    m = _RECENT_RE.match(s) if s is not None else None
+    x = math.nan if m is None else min(float(m.group(3)), 7.0)
+    # _prepare: fillna(7).clip(upper=4)
+    return 4.0 if math.isnan(x) else min(x, 4.0)
+
+
+def _back_no(s):
+    x = _num(s)
+    return None if math.isnan(x) else str(int(x))
+
+
+def _grade(s, i):
+    return None if s is None else s[5:7] if i == 0 else s[12:14]
+
+
+# clean_race_data 결과 컬럼 → (원본 컬럼, 원본 문자열 → 값)
+ROW_CLEANERS = {
+    '경주지역':   ('경주지역', lambda s: s),
+    '경주종류':   ('경주종류', lambda s: RACE_TYPE_MAP.get(s)),
+    '번호':       ('번호',     _back_no),
+    '나이':       ('나이',     _num),
+    '기어배수':   ('기어배수', lambda s: math.nan if s is None else _num(s.strip()[:4])),
+    '200m':       ('200m',     lambda s: math.nan if s is None else _num(s.replace('"', '.'))),
+    **{col: (col, lambda s: _num(_rate(s))) for col in RATE_COLS if col != '입상/출전'},
+    '입상':       ('입상/출전', lambda s: _ratio(_rate(s), 0)),
+    '출전':       ('입상/출전', lambda s: _ratio(_rate(s), 1)),
+    '최근3순위':  ('최근3순위', _ratio),
+    '현재_등급':  ('등급조정', lambda s: _grade(s, 0)),
+    '이전_등급':  ('등급조정', lambda s: _grade(s, 1)),
+    '광명_3득점': ('최근3득점', lambda s: _score(s, 0)),
+    '종합_3득점': ('최근3득점', lambda s: _score(s, 1)),
+    **{f'{col}_순위': (col, _recent_rank) for col in RECENT_COLS},
+}
+
+
+class RowEncoder:
+    """
+    fit 된 RaceFeaturePipeline 으로 출주표 행(dict, 원본 문자열 값)을 바로 피처 행렬로 바꿉니다.
+    clean_race_data(...) → pipeline.transform(...) 의 피처 컬럼과 같은 값입니다 (범주는 코드).
+
+    pipeline.columns_ 에 ROW_CLEANERS 로 계산할 수 없는 컬럼이 있으면 ValueError.
+    """
+
+    def __init__(self, pipeline: RaceFeaturePipeline):
+        unknown = [c for c in pipeline.columns_ if c not in ROW_CLEANERS]
+        if unknown:
+            raise ValueError(f"행 단위로 계산할 수 없는 컬럼: {unknown}")
+        self.columns = list(pipeline.columns_)
+        self.codes   = {col: {v: i for i, v in enumerate(vocab)} for col, vocab in pipeline.vocab_.items()}
+        self.means   = pipeline.group_means_
+
+    def transform(self, rows) -> np.ndarray:
+        """ rows: dict 목록 → (len(rows), len(columns)) float32 """
+        grade_src, grade = ROW_CLEANERS['현재_등급']
+        plan = [(col, *ROW_CLEANERS[col], self.codes.get(col), self.means.get(col)) for col in self.columns]
+
+        out = np.empty((len(rows), len(self.columns)), dtype=np.float32)
+        for i, r in enumerate(rows):
+            g = grade(_str(r.get(grade_src)))
+            vals = out[i]
+            for j, (col, src, func, codes, means) in enumerate(plan):
+                v = func(_str(r.get(src)))
+                if codes is not None:
+                    v = codes.get(v, -1)
+                elif means is not None and math.isnan(v):
+                    v = means.get(g, math.nan)
+                vals[j] = v
+        return out
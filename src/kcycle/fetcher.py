@@ -0,0 +1,169 @@
+import time
+import threading
+import importlib.util
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+
+from kcycle import telemetry
+from kcycle.checkpoint import PageCache
+
+BASE_URL = "https://www.kcycle.or.kr"
+
+# 설치되어 있으면 lxml 을, 아니면 표준 html.parser 를 씁니다
+PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+headers = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36")
+}
+
+
+def set_parser(name: str):
+    """ BeautifulSoup 백엔드("lxml" 또는 "html.parser")를 바꿉니다. """
+    global PARSER
+    PARSER = name
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    with telemetry.timer("soup"):
+        return BeautifulSoup(html, PARSER)
+
+
+class RateLimiter:
+    """
+    호스트 단위 토큰 버킷.
+    초당 rate 개의 토큰이 채워지고 최대 burst 개까지 쌓입니다.
+    acquire() 는 토큰이 생길 때까지 대기하므로 여러 스레드가 공유해도
+    전체 요청 속도가 rate 를 넘지 않습니다.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError(f"rate 는 0보다 커야 합니다. (현재 {rate})")
+        self.rate   = rate
+        self.burst  = max(1, burst)
+        self.tokens = float(self.burst)
+        self.last   = time.monotonic()
+        self.lock   = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """
+    keep-alive 커넥션 풀을 재사용하는 HTTP 클라이언트.
+
+    - 스레드마다 requests.Session 을 하나씩 두고 커넥션을 재사용합니다.
+    - 5xx 응답과 연결/읽기 타임아웃은 지수 백오프로 재시도합니다.
+    - limiter 가 있으면 모든 요청이 같은 토큰 버킷을 거칩니다.
+    - cache(PageCache) 가 있으면 refresh=False 인 요청은 캐시에서 바로 돌려주고,
+      새로 받은 html 은 store 가 참일 때만 저장합니다. store 의 기본값은 not refresh 라서
+      아직 바뀔 수 있어 새로 받는 페이지(오늘·미래 일차, 올해 일차 목록)는 캐시에 남지 않고,
+      일차가 확정된 뒤 처음 읽을 때 다시 받습니다.
+    - telemetry 가 설치되어 있으면 요청 지연·대기·바이트·재시도·캐시 적중을 기록합니다.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter = None,
+        base_url: str = BASE_URL,
+        cache=None,
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10,
+    ):
+        self.limiter   = limiter
+        self.base_url  = base_url.rstrip("/")
+        self.cache     = cache
+        self.pool_size = pool_size
+        self.retries   = retries
+        self.backoff   = backoff
+        self.timeout   = timeout
+        self._local    = threading.local()
+
+    def session(self) -> requests.Session:
+        s = getattr(self._local, "session", None)
+        if s is None:
+            retry = Retry(
+                total=self.retries,
+                connect=self.retries,
+                read=self.retries,
+                status=self.retries,
+                backoff_factor=self.backoff,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=("GET",),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size,
+                max_retries=retry,
+            )
+            s = requests.Session()
+            s.headers.update(headers)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            self._local.session = s
+        return s
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def get_text(self, url: str, refresh: bool = False, store: bool = None) -> str:
+        if self.cache is not None and not refresh:
+            text = self.cache.get(url)
+            if text is not None:
+                telemetry.count("cache_hits")
+                return text
+        if self.limiter is not None:
+            with telemetry.timer("rate_wait"):
+                self.limiter.acquire()
+        with telemetry.timer("fetch"):
+            resp = self.session().get(url, timeout=self.timeout)
+        telemetry.count("requests")
+        telemetry.count("bytes", len(resp.content))
+        retries = getattr(getattr(resp.raw, "retries", None), "history", None)
+        if retries:
+            telemetry.count("retries", len(retries))
+        resp.raise_for_status()
+        if self.cache is not None and (not refresh if store is None else store):
+            self.cache.put(url, resp.text)
+        return resp.text
+
+    def get_soup(self, url: str, refresh: bool = False, store: bool = None) -> BeautifulSoup:
+        return make_soup(self.get_text(url, refresh, store))
+
+
+def make_fetcher(
+    pause: float = 0.5,
+    rate: float = None,
+    concurrency: int = 1,
+    base_url: str = BASE_URL,
+    cache_dir: str = None,
+) -> Fetcher:
+    """
+    CLI 인자로 Fetcher 를 만듭니다.
+    rate 가 없으면 기존 --pause 와 같은 속도(초당 1/pause 회)로 제한합니다.
+    """
+    if rate is None and pause and pause > 0:
+        rate = 1.0 / pause
+    limiter = RateLimiter(rate, burst=max(1, concurrency)) if rate else None
+    cache   = PageCache(cache_dir) if cache_dir else None
+    return Fetcher(
+        limiter=limiter, base_url=base_url, cache=cache, pool_size=max(10, concurrency),
+    )
@@ -0,0 +1,348 @@
+"""
+선수별 과거 성적 저장소.
+
+출주표에는 최근 세 회차 기록만 문자열로 있어서, 최근 N 경주 승률·상대 전적·경주종류별 성적 같은
+피처를 만들려면 race_info.csv 와 race_results.csv 를 매번 처음부터 다시 훑어야 합니다.
+PlayerHistoryStore 는 load_data 결과를 날짜 순으로 한 번만 읽으며 선수별 누적값을
+선수 번호로 색인한 배열에 쌓고, 새 경주일이 오면 그 날만 update 합니다.
+
+    from kcycle.history import PlayerHistoryStore, history_features
+
+    raw = load_data()
+    hist, store = history_features(raw)               # 행마다 "그 날 이전" 기록만 쓴 피처
+    df = clean_race_data(raw.join(hist))              # hist_* 컬럼이 숫자 피처로 들어감
+
+    store.save('data/cache/history.pkl')              # 경주 당일
+    store.features(card)                              # card 날짜 > store.as_of 여야 함
+    store.update(day_with_results)                    # 결과가 나오면 그 날만 반영
+
+- 선수 키는 (이름, 기수) 입니다.
+- features 는 store 에 반영된 마지막 날짜(as_of)보다 뒤의 경주만 받습니다 (미래 결과 누수 방지).
+  같은 날 앞 경주의 결과도 쓰지 않습니다.
+- 경주 하나(7명) 조회는 배열 색인과 21개 상대 전적 조회뿐이라 과거 기록 길이와 관계없이 일정합니다.
+"""
+import pickle
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kcycle.features import RACE_TYPE_MAP
+
+# 경주종류(단순화 후) 목록
+RACE_TYPES = sorted(set(RACE_TYPE_MAP.values()))
+
+_EPOCH = date(1970, 1, 1)
+
+# 순위 → 입상 여부 (rank NaN 은 4착 이하)
+UNPLACED = 4
+
+FEATURE_COLS = [
+    'hist_starts', 'hist_win_rate', 'hist_top2_rate', 'hist_top3_rate',
+    'hist_recent_starts', 'hist_recent_win_rate', 'hist_recent_top3_rate',
+    'hist_type_starts', 'hist_type_top3_rate',
+    'hist_days_since',
+    'hist_h2h_meets', 'hist_h2h_ahead_rate',
+]
+
+
+def _player_key(name, no) -> str:
+    try:
+        no = int(no)
+    except (TypeError, ValueError):
+        no = ''
+    return f"{name}|{no}"
+
+
+def player_keys(df: pd.DataFrame) -> np.ndarray:
+    """ (이름, 기수) → 선수 키 문자열 """
+    cache = {}
+    return np.array([
+        cache[p] if p in cache else cache.setdefault(p, _player_key(*p))
+        for p in zip(df['이름'].tolist(), df['기수'].tolist())
+    ], dtype=object)
+
+
+def _day_numbers(dates) -> np.ndarray:
+    """ yyyymmdd → 1970-01-01 부터의 일수 (고유값만 변환) """
+    uniq, inv = np.unique(np.asarray(dates, dtype=np.int64), return_inverse=True)
+    days = np.array([
+        (date(d // 10000, d // 100 % 100, d % 100) - _EPOCH).days for d in uniq.tolist()
+    ], dtype=np.int64)
+    return days[inv.reshape(-1)]
+
+
+_TYPE_CODES = {raw: RACE_TYPES.index(t) for raw, t in RACE_TYPE_MAP.items()}
+
+
+def _race_type_codes(race_type) -> np.ndarray:
+    """ 원래 경주종류 → RACE_TYPES 번호 (모르면 -1) """
+    return np.array([_TYPE_CODES.get(str(t), -1) for t in list(race_type)], dtype=np.int64)
+
+
+def _finish(rank) -> np.ndarray:
+    rank = np.asarray(rank, dtype=np.float64)
+    return np.where(np.isnan(rank) | (rank > 3), UNPLACED, rank).astype(np.int8)
+
+
+class PlayerHistoryStore:
+    """
+    window : 최근 성적 링 버퍼 길이 (최근 window 경주)
+
+    선수 i 의 상태 (배열 행 i):
+        counts   (P, 4)       출전, 1착, 2착 이내, 3착 이내
+        by_type  (P, T, 2)    경주종류별 출전, 3착 이내
+        recent   (P, window)  최근 착순 링 버퍼 (1~3, 4 = 미입상, 0 = 비어 있음)
+        last_day (P,)         마지막 출전일 (1970-01-01 부터 일수, 없으면 -1)
+    상대 전적: (i, j) (i < j) → [만난 횟수, i 가 앞선 횟수, j 가 앞선 횟수]
+    """
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self.index  = {}       # 선수 키 → 행
+        self.as_of  = None     # 마지막으로 반영한 날짜 (yyyymmdd)
+        self.counts   = np.zeros((0, 4), dtype=np.int32)
+        self.by_type  = np.zeros((0, len(RACE_TYPES), 2), dtype=np.int32)
+        self.recent   = np.zeros((0, window), dtype=np.int8)
+        self.last_day = np.zeros(0, dtype=np.int64)
+        self.h2h_index = {}    # (i << 32) | j → 행
+        self.h2h       = np.zeros((0, 3), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __repr__(self) -> str:
+        return f"PlayerHistoryStore(players={len(self)}, window={self.window}, as_of={self.as_of})"
+
+    # ───── 선수 색인 ─────
+    def _grow(self, n: int):
+        """ 배열을 최소 n 행으로 (두 배씩) 늘립니다. """
+        cap = len(self.counts)
+        if n <= cap:
+            return
+        new = max(n, 2 * cap, 64)
+
+        def grow(a, fill=0):
+            out = np.full((new, *a.shape[1:]), fill, dtype=a.dtype)
+            out[:cap] = a
+            return out
+
+        self.counts, self.by_type = grow(self.counts), grow(self.by_type)
+        self.recent, self.last_day = grow(self.recent), grow(self.last_day, -1)
+
+    def ids(self, keys, create: bool = False) -> np.ndarray:
+        """ 선수 키 → 행 번호 (모르는 선수는 create 면 새로 만들고, 아니면 -1) """
+        uniq, inv = np.unique(np.asarray(keys, dtype=object), return_inverse=True)
+        rows = np.empty(len(uniq), dtype=np.int64)
+        for u, key in enumerate(uniq):
+            i = self.index.get(key)
+            if i is None and create:
+                i = self.index[key] = len(self.index)
+            rows[u] = -1 if i is None else i
+        if create:
+            self._grow(len(self.index))
+        return rows[inv]
+
+    def _pair_rows(self, a: np.ndarray, b: np.ndarray, create: bool = False) -> np.ndarray:
+        """ 선수 쌍 (a, b) → 상대 전적 행 (없으면 -1). a, b 는 같은 길이의 행 번호 """
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        keys = ((lo << 32) | hi).tolist()
+        get  = self.h2h_index.get
+        if create:
+            for k in keys:
+                if k not in self.h2h_index:
+                    self.h2h_index[k] = len(self.h2h_index)
+            if len(self.h2h_index) > len(self.h2h):
+                grown = np.zeros((max(len(self.h2h_index), 2 * len(self.h2h), 256), 3), dtype=np.int32)
+                grown[:len(self.h2h)] = self.h2h
+                self.h2h = grown
+        return np.array([get(k, -1) for k in keys], dtype=np.int64)
+
+    # ───── 조회 ─────
+    def _check_after(self, dates):
+        if self.as_of is not None and len(dates) and int(np.min(dates)) <= self.as_of:
+            raise ValueError(
+                f"{int(np.min(dates))} 은(는) 이미 반영된 날짜({self.as_of}) 이전입니다. "
+                "미래 결과가 섞이지 않도록 as_of 이후 경주만 조회할 수 있습니다."
+            )
+
+    def _features(self, rows, race_id, race_type, day) -> np.ndarray:
+        n   = len(rows)
+        out = np.full((n, len(FEATURE_COLS)), np.nan)
+        known = rows >= 0
+        r = np.where(known, rows, 0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            c = self.counts[r].astype(np.float64)
+            c[~known] = 0
+            out[:, 0] = c[:, 0]
+            out[:, 1:4] = c[:, 1:4] / c[:, [0]]
+
+            buf = self.recent[r]
+            buf[~known] = 0
+            played = (buf > 0).sum(axis=1)
+            out[:, 4] = played
+            out[:, 5] = (buf == 1).sum(axis=1) / played
+            out[:, 6] = ((buf > 0) & (buf <= 3)).sum(axis=1) / played
+
+            has_type = known & (race_type >= 0)
+            bt = self.by_type[r, np.where(race_type >= 0, race_type, 0)].astype(np.float64)
+            bt[~has_type] = 0
+            out[:, 7] = bt[:, 0]
+            out[:, 8] = bt[:, 1] / bt[:, 0]
+
+            last = self.last_day[r]
+            out[:, 9] = np.where(known & (last >= 0), day - last, np.nan)
+
+            meets, ahead, decided = self._h2h_sums(rows, race_id)
+            out[:, 10] = meets
+            out[:, 11] = ahead / decided
+        return out
+
+    def _h2h_sums(self, rows, race_id) -> tuple:
+        """ 행마다 같은 경주의 다른 선수들과의 (만난 횟수 합, 앞선 횟수 합, 승부가 난 횟수 합) """
+        n = len(rows)
+        a, b = _same_race_pairs(race_id)
+        meets, ahead, decided = np.zeros(n), np.zeros(n), np.zeros(n)
+        if len(a) == 0:
+            return meets, ahead, decided
+        ok = (rows[a] >= 0) & (rows[b] >= 0)
+        a, b = a[ok], b[ok]
+        pr = self._pair_rows(rows[a], rows[b])
+        found = pr >= 0
+        a, b, pr = a[found], b[found], pr[found]
+        rec = self.h2h[pr]
+        a_is_lo = rows[a] < rows[b]
+        a_ahead = np.where(a_is_lo, rec[:, 1], rec[:, 2])
+        b_ahead = np.where(a_is_lo, rec[:, 2], rec[:, 1])
+        for idx, m, ah, dc in ((a, rec[:, 0], a_ahead, rec[:, 1] + rec[:, 2]),
+                               (b, rec[:, 0], b_ahead, rec[:, 1] + rec[:, 2])):
+            np.add.at(meets, idx, m)
+            np.add.at(ahead, idx, ah)
+            np.add.at(decided, idx, dc)
+        return meets, ahead, decided
+
+    def features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        df (load_data 형식: race_id, 날짜, 이름, 기수, 경주종류) 의 행마다 FEATURE_COLS.
+        모든 날짜가 as_of 이후여야 합니다. 인덱스는 df 와 같습니다.
+        """
+        self._check_after(df['날짜'].to_numpy())
+        out = self._features(
+            self.ids(player_keys(df)), df['race_id'].to_numpy(),
+            _race_type_codes(df['경주종류']), _day_numbers(df['날짜']),
+        )
+        return pd.DataFrame(out, columns=FEATURE_COLS, index=df.index)
+
+    # ───── 갱신 ─────
+    def _update_day(self, rows, race_id, race_type, day, finish):
+        """ 하루치 결과 반영 (rows 는 create 된 행 번호) """
+        # 최근 착순 링 버퍼 (같은 날 두 번 나온 선수는 행 순서대로)
+        nth  = pd.Series(rows).groupby(rows).cumcount().to_numpy()
+        slot = (self.counts[rows, 0] + nth) % self.window
+        self.recent[rows, slot] = finish
+        self.last_day[rows] = day
+
+        # 출전·입상 횟수
+        np.add.at(self.counts, rows, np.stack([
+            np.ones_like(finish), finish == 1, finish <= 2, finish <= 3,
+        ], axis=1).astype(np.int32))
+        t = race_type >= 0
+        np.add.at(self.by_type, (rows[t], race_type[t]), np.stack([
+            np.ones(t.sum(), dtype=np.int32), (finish[t] <= 3).astype(np.int32),
+        ], axis=1))
+
+        # 상대 전적
+        a, b = _same_race_pairs(race_id)
+        if len(a):
+            pr = self._pair_rows(rows[a], rows[b], create=True)
+            a_is_lo = rows[a] < rows[b]
+            fa, fb = finish[a], finish[b]
+            lo_ahead = np.where(a_is_lo, fa < fb, fb < fa)
+            hi_ahead = np.where(a_is_lo, fb < fa, fa < fb)
+            np.add.at(self.h2h, pr, np.stack([np.ones(len(pr)), lo_ahead, hi_ahead], axis=1).astype(np.int32))
+
+    def update(self, df: pd.DataFrame):
+        """
+        결과(rank)가 붙은 경주들을 날짜 순으로 반영합니다. 날짜는 모두 as_of 이후여야 합니다.
+        """
+        dates = df['날짜'].to_numpy().astype(np.int64)
+        self._check_after(dates)
+        rows   = self.ids(player_keys(df), create=True)
+        rtype  = _race_type_codes(df['경주종류'])
+        days   = _day_numbers(dates)
+        finish = _finish(df['rank'])
+        race_id = df['race_id'].to_numpy()
+
+        order = np.argsort(dates, kind='stable')
+        bounds = np.flatnonzero(np.diff(dates[order])) + 1
+        for sel in np.split(order, bounds):
+            if len(sel):
+                self._update_day(rows[sel], race_id[sel], rtype[sel], days[sel[0]], finish[sel])
+                self.as_of = int(dates[sel[0]])
+        return self
+
+    # ───── 저장 ─────
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.tmp')
+        tmp.write_bytes(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp.replace(path)
+
+    @staticmethod
+    def load(path) -> 'PlayerHistoryStore':
+        return pickle.loads(Path(path).read_bytes())
+
+
+def _same_race_pairs(race_id) -> tuple:
+    """ 같은 경주에 속한 행 쌍 (a, b), a < b (행 위치) """
+    race_id = np.asarray(race_id)
+    order = np.argsort(race_id, kind='stable')
+    sr = race_id[order]
+    starts = np.flatnonzero(np.r_[True, sr[1:] != sr[:-1]])
+    sizes  = np.diff(np.r_[starts, len(sr)])
+    a_list, b_list = [], []
+    for size in np.unique(sizes):
+        if size < 2:
+            continue
+        st = starts[sizes == size]
+        ia, ib = np.triu_indices(size, k=1)
+        a_list.append(order[(st[:, None] + ia[None, :]).ravel()])
+        b_list.append(order[(st[:, None] + ib[None, :]).ravel()])
+    if not a_list:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(a_list), np.concatenate(b_list)
+
+
+def history_features(df: pd.DataFrame, window: int = 10, store: PlayerHistoryStore = None) -> tuple:
+    """
+    load_data 결과 전체에 대해 날짜 순으로 "조회 → 그 날 결과 반영" 을 반복해
+    행마다 그 날 이전 기록만으로 만든 피처를 돌려줍니다.
+
+    Returns
+    -------
+    (DataFrame, PlayerHistoryStore)
+        피처는 df 와 같은 인덱스 (FEATURE_COLS). store 는 df 의 마지막 날까지 반영된 상태.
+    """
+    store = store if store is not None else PlayerHistoryStore(window)
+    dates = df['날짜'].to_numpy().astype(np.int64)
+    store._check_after(dates)
+
+    rows    = store.ids(player_keys(df), create=True)
+    rtype   = _race_type_codes(df['경주종류'])
+    days    = _day_numbers(dates)
+    finish  = _finish(df['rank'])
+    race_id = df['race_id'].to_numpy()
+
+    out    = np.empty((len(df), len(FEATURE_COLS)))
+    order  = np.argsort(dates, kind='stable')
+    bounds = np.flatnonzero(np.diff(dates[order])) + 1
+    for sel in np.split(order, bounds):
+        if not len(sel):
+            continue
+        out[sel] = store._features(rows[sel], race_id[sel], rtype[sel], days[sel[0]])
+        store._update_day(rows[sel], race_id[sel], rtype[sel], days[sel[0]], finish[sel])
+        store.as_of = int(dates[sel[0]])
+    return pd.DataFrame(out, columns=FEATURE_COLS, index=df.index), store
@@ -1,31 +1,33 @@
 import re
-import time
-import requests
 import pandas as pd
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import soupsieve as sv
 from bs4 import BeautifulSoup
 from tqdm.auto import tqdm
 
-headers = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36")
-}
+from kcycle import telemetry
+# headers 는 예전 이 모듈의 전역 변수였으므로 하위 호환을 위해 다시 내보냅니다
+from kcycle.fetcher import BASE_URL, Fetcher, headers, make_fetcher, set_parser  # noqa: F401
+from kcycle.card_parser import find_race_ids, make_doc, parse_card_html, parse_races
+from kcycle.checkpoint import day_key, is_final, is_open_year, open_day_writer
 
-def get_soup(url: str) -> BeautifulSoup:
-    resp = requests.get(url, headers=headers, timeout=10)
-    resp.raise_for_status()
-    return BeautifulSoup(resp.text, "html.parser")
+# fetcher 를 넘기지 않은 호출이 공유하는 기본 클라이언트 (속도 제한 없음)
+default_fetcher = Fetcher()
 
-def get_race_day_list(year: int):
-    soup = get_soup(f"https://www.kcycle.or.kr/race/card/decision/{year}/01/1")
-    opts   = soup.select('select[name="tmsDayOrd"] option')
+def get_soup(url: str, fetcher: Fetcher = None, refresh: bool = False) -> BeautifulSoup:
+    return (fetcher or default_fetcher).get_soup(url, refresh)
+
+DAY_RE       = re.compile(r"\((\d+)회 (\d+)일\)\s+(\d{1,2})월\s*(\d{1,2})일")
+SEL_DAY_OPTS = sv.compile('select[name="tmsDayOrd"] option')
+
+def get_race_day_list(year: int, fetcher: Fetcher = None):
+    fetcher = fetcher or default_fetcher
+    # 올해 목록은 새 일차가 추가되므로 캐시를 쓰지 않습니다
+    soup = get_soup(fetcher.url(f"/race/card/decision/{year}/01/1"), fetcher, is_open_year(year))
     result = []
-    for op in opts:
-        m = re.search(
-            r"\((\d+)회 (\d+)일\)\s+(\d{1,2})월\s*(\d{1,2})일",
-            op.text
-        )
+    for op in SEL_DAY_OPTS.select(soup):
+        m = DAY_RE.search(op.text)
         if not m:
             continue
         회차, 일차 = m.group(1), m.group(2)
@@ -40,266 +42,99 @@ def parse_one_race(
     일차: str,
     날짜: str,
     region: str = "광명",
-    race_no: str = None
+    race_no: str = None,
+    fetcher: Fetcher = None,
+    refresh: bool = True
 ) -> pd.DataFrame:
     """
     year, 회차, 일차, 날짜 로 페이지를 열고,
     region (e.g. "광명") 과 race_no (e.g. "01") 조합에 해당하는 경주를 파싱합니다.
     race_no 가 None 이면 해당 day 의 첫 번째 region 경주를 가져옵니다.
+    refresh 가 True 이면 캐시가 있어도 최신 페이지를 받습니다.
+    참가 선수가 7명이 아니면 빈 DataFrame 을 돌려줍니다.
     """
-    url  = f"https://www.kcycle.or.kr/race/card/decision/{year}/{회차}/{일차}"
-    soup = get_soup(url)
+    fetcher = fetcher or default_fetcher
+    url = fetcher.url(f"/race/card/decision/{year}/{회차}/{일차}")
+    ops, doc = make_doc(fetcher.get_text(url, refresh))
 
     # 1) swiper 버튼 중에서 region 과 (race_no 일치시) 선택
-    btns = soup.select("div.swiper-slide button")
-    target_onclick = None
-    for btn in btns:
-        reg = btn.select_one(".region").text.strip()
-        num = btn.select_one(".date").text.strip()
-        if reg == region and (race_no is None or num == race_no):
-            target_onclick = btn["onclick"]
-            break
-    if not target_onclick:
+    race_ids = find_race_ids(ops, doc, region, race_no)
+    if not race_ids:
         raise ValueError(f"{region}{race_no or ''} 경주 버튼을 찾을 수 없습니다.")
 
-    race_id = re.search(r"scrlMoveTo\(['\"](.*?)['\"]", target_onclick).group(1)
-    race    = soup.find("div", id=race_id)
-
-    # 2) h2 제목에서 지역·번호·종류·시간 추출
-    title = race.select_one("h2").get_text(strip=True)
-    m = re.match(r"(.+?)\s+(\d+)경주\s*\(\s*(\S+)\s+([\d:]+)\s*\)", title)
-    if m:
-        경주지역, 경주번호, 경주종류, 경주시간 = m.groups()
-    else:
-        경주지역 = 경주번호 = 경주종류 = 경주시간 = ""
-
-    # 3) 표0: 기본 선수 정보 (기수/나이, 7명만)
-    base = []
-    for r in race.select("table.excel_table")[0].select("tbody tr"):
-        name_a = r.select_one(".name a")
-        if not name_a:
-            continue
-        num = r.select_one(".sign").text.strip()
-        oth = r.select_one(".other").text.strip()
-        mm = re.match(r"(\d+)기/(\d+)세", oth)
-        기수, 나이 = (mm.group(1), mm.group(2)) if mm else ("", "")
-        tds = [td.get_text(strip=True) for td in r.select("td")]
-        if len(tds) < 14:
-            continue  # 결장 처리
-        base.append({
-            "이름":        name_a.text.strip(),
-            "번호":        num,
-            "기수":        기수,
-            "나이":        나이,
-            "기어배수":    tds[0],
-            "200m":       tds[1],
-            "훈련지":      tds[2],
-            "승률":        tds[3],
-            "연대율":      tds[4],
-            "삼연대율":    tds[5],
-            "입상/출전":   tds[6],
-            "선행":        tds[7],
-            "젖히기":      tds[8],
-            "추입":        tds[9],
-            "마크":        tds[10],
-            "등급조정":    tds[11],
-            "최근3득점":   tds[12],
-            "최근3순위":   tds[13],
-        })
-    df_base = pd.DataFrame(base)
-    if len(df_base) != 7:
-        # 7명 아니면 빈 데이터프레임 리턴
-        return pd.DataFrame()
-
-    # 4) 표1: 훈련 일지
-    train = []
-    for r in race.select("table.excel_table")[1].select("tbody tr"):
-        name_a = r.select_one(".name a")
-        if not name_a:
-            continue
-        tds = [td.get_text(strip=True) for td in r.select("td")]
-        train.append({
-            "이름":        name_a.text.strip(),
-            "훈련일수":    tds[0],
-            "훈련동참자":  tds[1],
-            "훈련내용":    tds[2],
-        })
-    df_train = pd.DataFrame(train)
-
-    # 5) 표2: 최근 성적
-    rec = []
-    for r in race.select("table.excel_table")[2].select("tbody tr"):
-        name_a = r.select_one(".name a")
-        if not name_a:
-            continue
-        tds = [td.get_text(strip=True) for td in r.select("td")]
-        rec.append({
-            "이름":          name_a.text.strip(),
-            "최근3_장소일자": tds[0], "최근3_1일": tds[1], "최근3_2일": tds[2], "최근3_3일": tds[3],
-            "최근2_장소일자": tds[4], "최근2_1일": tds[5], "최근2_2일": tds[6], "최근2_3일": tds[7],
-            "최근1_장소일자": tds[8], "최근1_1일": tds[9], "최근1_2일": tds[10], "최근1_3일": tds[11],
-            "금회_1일":      tds[12], "금회_2일": tds[13],
-            "금회_3일":      tds[14] if len(tds) > 14 else "",
-        })
-    df_rec = pd.DataFrame(rec)
-
-    # 6) 병합
-    df = (
-        df_base
-        .merge(df_train, on="이름", how="left")
-        .merge(df_rec,   on="이름", how="left")
-    )
-
-    # 7) 앞에 메타컬럼 삽입
-    df.insert(0, '경주시간', 경주시간)
-    df.insert(0, '경주종류', 경주종류)
-    df.insert(0, '경주번호', 경주번호)
-    df.insert(0, '경주지역', 경주지역)
-    df.insert(0, '일차',   일차)
-    df.insert(0, '회차',   회차)
-    df.insert(0, '연도',   year)
-    df.insert(0, '날짜',   날짜)
-
-    return df
-
-def parse_all_races(year: int, 회차: str, 일차: str, 날짜: str):
-    url  = f"https://www.kcycle.or.kr/race/card/decision/{year}/{회차}/{일차}"
-    soup = get_soup(url)
-
-    # 1) swiper 에 있는 모든 버튼에서 race_id 추출
-    race_ids = []
-    for btn in soup.select("div.swiper-slide button"):
-        onclick = btn["onclick"]
-        m = re.search(r'scrlMoveTo\(["\']([^"\']+)["\']', onclick)
-        if m:
-            race_ids.append(m.group(1))
-
-    all_dfs = []
-    for rid in race_ids:
-        race = soup.find("div", id=rid)
-        if not race:
-            continue
-
-        title = race.select_one("h2").get_text(strip=True)
-        m = re.match(
-            r"(.+?)\s+(\d+)경주\s*\(\s*(\S+)\s+([\d:]+)\s*\)",
-            title
-        )
-        if m:
-            경주지역, 경주번호, 경주종류, 경주시간 = m.groups()
-        else:
-            경주지역 = 경주번호 = 경주종류 = 경주시간 = ""
-
-        # print(경주지역, 경주번호, 경주종류, 경주시간)
-        # (가) 기본 선수 정보
-        base = []
-        for r in race.select("table.excel_table")[0].select("tbody tr"):
-            a = r.select_one('.name a')
-            num = r.select_one('.sign')
-            other_tag = r.select_one('.other')
-            if not a:
-                continue
-
-            # "01기/51세" → 기수, 나이 분리
-            oth = other_tag.get_text(strip=True)
-            m   = re.match(r"(\d+)기/(\d+)세", oth)
-            기수 = m.group(1) if m else ""
-            나이 = m.group(2) if m else ""
-
-            t = [td.get_text(strip=True) for td in r.select("td")]
-            # 결장 선수가 있으면 생략
-            if len(t) < 14:
-                continue
-
-            base.append({
-                "이름": a.text.strip(),   "번호": num.text.strip(),
-                "기수": 기수,             "나이": 나이,
-                "기어배수": t[0],         "200m": t[1],
-                "훈련지": t[2],           "승률": t[3],
-                "연대율": t[4],           "삼연대율": t[5],
-                "입상/출전": t[6],        "선행": t[7],
-                "젖히기": t[8],           "추입": t[9],
-                "마크": t[10],            "등급조정": t[11],
-                "최근3득점": t[12],       "최근3순위": t[13],
-            })
-        df_base = pd.DataFrame(base)
-
-        # 참가 선수가 7명이 아니면 생략
-        if len(df_base) != 7:
-            continue
-
-        # (나) 훈련 상담
-        train = []
-        for r in race.select("table.excel_table")[1].select("tbody tr"):
-            a = r.select_one('.name a')
-            if not a:
-                continue
-            t = [td.get_text(strip=True) for td in r.select("td")]
-            train.append({
-                "이름": a.text.strip(),
-                "훈련일수": t[0],
-                "훈련동참자": t[1],
-                "훈련내용": t[2],
-            })
-        df_train = pd.DataFrame(train)
-
-        # (다) 최근 성적
-        rec = []
-        for r in race.select("table.excel_table")[2].select("tbody tr"):
-            a = r.select_one('.name a')
-            if not a:
-                continue
-            t = [td.get_text(strip=True) for td in r.select("td")]
-            rec.append({
-                "이름":        a.text.strip(),
-                "최근3_장소일자": t[0],  "최근3_1일":  t[1],  "최근3_2일":  t[2],  "최근3_3일":  t[3],
-                "최근2_장소일자": t[4],  "최근2_1일":  t[5],  "최근2_2일":  t[6],  "최근2_3일":  t[7],
-                "최근1_장소일자": t[8],  "최근1_1일":  t[9],  "최근1_2일": t[10], "최근1_3일": t[11],
-                "금회_1일":      t[12], "금회_2일":    t[13],
-                "금회_3일":      t[14] if len(t) > 14 else ""
-            })
-        df_rec = pd.DataFrame(rec)
+    # 2) 7명이 아니면 빈 데이터프레임 리턴
+    df = parse_races(ops, doc, race_ids, year, 회차, 일차, 날짜)
+    return df if not df.empty else pd.DataFrame()
 
-        # 병합
-        df = (
-            df_base
-            .merge(df_train, on="이름", how="left")
-            .merge(df_rec,   on="이름", how="left")
-        )
+def parse_all_races(
+    year: int, 회차: str, 일차: str, 날짜: str,
+    fetcher: Fetcher = None, refresh: bool = None
+):
+    # refresh 를 지정하지 않으면 날짜가 지나지 않은 일차만 새로 받습니다
+    if refresh is None:
+        refresh = not is_final(날짜)
+    fetcher = fetcher or default_fetcher
+    url  = fetcher.url(f"/race/card/decision/{year}/{회차}/{일차}")
+    return parse_card_html(fetcher.get_text(url, refresh), year, 회차, 일차, 날짜)
 
-        # h2에서 “XX경주” 번호 추출
-        title = race.select_one("h2").get_text(strip=True)
-        no = re.search(r"(\d+)경주", title)
-        경주번호 = no.group(1) if no else ""
 
-        # 맨 앞에 공통 컬럼 추가
-        df.insert(0, '경주시간',  경주시간)
-        df.insert(0, '경주종류',  경주종류)
-        df.insert(0, '경주번호',  경주번호)
-        df.insert(0, '경주지역',  경주지역)
-        df.insert(0, '일차',    일차)
-        df.insert(0, '회차',    회차)
-        df.insert(0, '연도',    year)
-        df.insert(0, '날짜',    날짜)
-
-        all_dfs.append(df)
-
-    return pd.concat(all_dfs, ignore_index=True)
+def crawl_year(
+    year: int,
+    pause: float = 1.0,
+    concurrency: int = 1,
+    rate: float = None,
+    fetcher: Fetcher = None,
+    manifest=None,
+    on_day=None,
+    collect: bool = True,
+) -> pd.DataFrame:
+    """
+    year 의 모든 (회차, 일차) 출주표를 크롤링합니다.
 
+    concurrency 개의 스레드가 커넥션 풀을 공유하며 일차 페이지를 동시에 받고,
+    요청 속도는 고정 pause 대신 토큰 버킷(초당 rate 회, 기본 1/pause)으로 제한합니다.
+    결과는 병렬 여부와 관계없이 일차 순서대로 합쳐집니다.
 
-def crawl_year(year: int, pause: float = 1.0) -> pd.DataFrame:
-    days = get_race_day_list(year)
-    year_dfs = []
-    for 회차, 일차, 날짜 in tqdm(days, desc=f"{year}년 크롤링", unit="일차"):
+    manifest 가 있으면 이미 완료된 일차는 건너뜁니다.
+    on_day(key, df) 는 날짜가 지난 일차를 파싱할 때마다 순서대로 호출됩니다.
+    collect 가 False 이면 일차 DataFrame 을 모아 두지 않고 빈 DataFrame 을 돌려줍니다
+    (on_day 로 바로 저장할 때 메모리가 연도 크기만큼 늘지 않습니다).
+    """
+    fetcher = fetcher or make_fetcher(pause=pause, rate=rate, concurrency=concurrency)
+    days = get_race_day_list(year, fetcher)
+    if manifest is not None:
+        days = [d for d in days if day_key(year, d[0], d[1]) not in manifest]
+
+    @telemetry.profiled
+    def _crawl_day(day):
+        회차, 일차, 날짜 = day
         try:
-            df = parse_all_races(year, 회차, 일차, 날짜)
-            if not df.empty:
-                year_dfs.append(df)
+            with telemetry.timer("day"):
+                df = parse_all_races(year, 회차, 일차, 날짜, fetcher)
             # tqdm.write(f"[{year}] {회차}회차 {일차}일차 → {len(df)}건")
+            telemetry.count("days")
+            telemetry.count("rows", len(df))
+            return df
         except Exception as e:
+            telemetry.failure("day", e, f"{year}-{회차}-{일차}")
             tqdm.write(f"⚠️ 실패: {year}-{회차}-{일차} ({e})")
-        time.sleep(pause)
-    return pd.concat(year_dfs, ignore_index=True) if year_dfs else pd.DataFrame()
+            return None
+
+    year_dfs = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        # map 은 제출 순서대로 결과를 돌려주므로 출력 순서가 결정적입니다
+        results = pool.map(_crawl_day, days)
+        for (회차, 일차, 날짜), df in tqdm(
+            zip(days, results), total=len(days), desc=f"{year}년 크롤링", unit="일차"
+        ):
+            if df is None:
+                continue
+            if on_day is not None and is_final(날짜):
+                on_day(day_key(year, 회차, 일차), df)
+            if collect and not df.empty:
+                year_dfs.append(df)
+    with telemetry.timer("concat"):
+        return pd.concat(year_dfs, ignore_index=True) if year_dfs else pd.DataFrame()
 
 # ───── 커맨드라인 인자 처리 ────────────────────────────────────────────────
 
@@ -321,27 +156,72 @@ if __name__ == "__main__":
     )
     p.add_argument(
         "--pause", type=float, default=0.5,
-        help="요청 사이 대기 시간(초)"
+        help="요청 사이 대기 시간(초). --rate 가 없으면 초당 1/pause 회로 제한"
+    )
+    p.add_argument(
+        "--concurrency", type=int, default=1,
+        help="동시에 받을 일차 페이지 수"
+    )
+    p.add_argument(
+        "--rate", type=float, default=None,
+        help="호스트당 초당 최대 요청 수 (토큰 버킷)"
+    )
+    p.add_argument(
+        "--base-url", default=BASE_URL,
+        help="크롤링 대상 호스트 (로컬 fixture 서버 벤치마크용)"
     )
     p.add_argument(
         "--output", default="./data/race_inputs.csv",
         help="결과를 저장할 CSV 파일명"
     )
+    p.add_argument(
+        "--cache-dir", default="./data/cache/pages",
+        help="원본 html 캐시 디렉터리 (빈 문자열이면 캐시 사용 안 함)"
+    )
+    p.add_argument(
+        "--manifest", default=None,
+        help="완료 일차 매니페스트 (기본: <output>.manifest.json)"
+    )
+    p.add_argument(
+        "--full", action="store_true",
+        help="기존 출력과 매니페스트를 지우고 처음부터 크롤링"
+    )
+    p.add_argument(
+        "--dataset", default=None,
+        help="CSV 대신 연도·회차 파티션 Parquet 데이터셋에 저장. 일차를 받을 때마다 그 회차 파일을 다시 씀 (예: ./data/race_info)"
+    )
+    p.add_argument(
+        "--parser", default=None, choices=["lxml", "html.parser"],
+        help="BeautifulSoup 백엔드 (기본: lxml 이 있으면 lxml)"
+    )
+    telemetry.add_cli_args(p)
     args = p.parse_args()
+    if args.parser:
+        set_parser(args.parser)
 
     years = parse_years_arg(args.years)
-    all_dfs = []
-    for y in years:
-        df_y = crawl_year(y, pause=args.pause)
-        if not df_y.empty:
-            all_dfs.append(df_y)
-
-    if all_dfs:
-        df_all = pd.concat(all_dfs, ignore_index=True)
-        df_all.to_csv(args.output, index=False, encoding="utf-8-sig")
-        print(f"✅ 저장 완료: {args.output} ({len(df_all)} rows)")
+    fetcher = make_fetcher(
+        pause=args.pause, rate=args.rate,
+        concurrency=args.concurrency, base_url=args.base_url,
+        cache_dir=args.cache_dir or None,
+    )
+    # 날짜가 지난 일차는 파싱 즉시 CSV 에 이어 쓰거나 데이터셋의 회차 파티션에 반영하고 완료로 기록합니다
+    writer = open_day_writer(args.output, args.manifest, args.full, args.dataset, "race_info")
+
+    with telemetry.session(args.metrics, args.profile, meta={"crawler": "race", "years": years}):
+        for y in years:
+            crawl_year(
+                y, concurrency=args.concurrency, fetcher=fetcher,
+                manifest=writer.manifest, on_day=writer, collect=False,
+            )
+
+    if writer.n_rows:
+        print(f"✅ 저장 완료: {writer.output} (+{writer.n_rows} rows)")
     else:
-        print("⚠️ 수집된 데이터가 없습니다.")
+        print("⚠️ 새로 수집된 데이터가 없습니다.")
 
     # 예시
     # python kcycle_race_crawler.py --years 2017-2025 --pause 0.5
+    # python kcycle_race_crawler.py --years 2017-2025 --concurrency 8 --rate 4
+    # python kcycle_race_crawler.py --years 2024 --metrics runs/race.json --profile runs/race.prof
+    # python kcycle_race_crawler.py --years 2017-2025 --dataset ./data/race_info
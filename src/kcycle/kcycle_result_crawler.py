@@ -1,13 +1,18 @@
 import re, time, argparse
-import requests, pandas as pd
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from tqdm.auto import tqdm
 
+from kcycle import telemetry
+from kcycle.fetcher import BASE_URL, Fetcher, make_fetcher
+from kcycle.checkpoint import day_key, is_final, is_open_year, open_day_writer
 
-def get_soup(url: str, headers=None) -> BeautifulSoup:
-    resp = requests.get(url, headers=headers or {}, timeout=10)
-    resp.raise_for_status()
-    return BeautifulSoup(resp.text, "html.parser")
+default_fetcher = Fetcher()
+
+
+def get_soup(url: str, fetcher: Fetcher = None, refresh: bool = False) -> BeautifulSoup:
+    return (fetcher or default_fetcher).get_soup(url, refresh)
 
 
 def parse_race_results(html, year, 회차, 일차, 날짜):
@@ -34,6 +39,7 @@ def parse_race_results(html, year, 회차, 일차, 날짜):
 
     records = []
     for row in html.select('tr'):
+        t0 = time.perf_counter()
         tds = row.find_all(['th','td'])
         # 0번 th 에서 경주 아이디(예: "광명01") 뽑기
         race_label = row.select_one('th span.mark').get_text(strip=True)
@@ -69,17 +75,35 @@ def parse_race_results(html, year, 회차, 일차, 날짜):
             '쌍복승식':   ps,
             '삼쌍승식':   ts,
         })
+        # 경주(행)별 파싱 시간
+        telemetry.observe('parse_result_race', (time.perf_counter() - t0) * 1e3)
 
     return pd.DataFrame(records)
 
 
-def crawl_yearly_results(year: int, pause: float = 0.5) -> pd.DataFrame:
+def crawl_yearly_results(
+    year: int,
+    pause: float = 0.5,
+    concurrency: int = 1,
+    rate: float = None,
+    fetcher: Fetcher = None,
+    manifest=None,
+    on_day=None,
+    collect: bool = True,
+) -> pd.DataFrame:
     """
     주어진 연도의 모든 회차·일차에 대해 경주 결과를 크롤링하여
     하나의 DataFrame으로 반환합니다.
+
+    manifest 가 있으면 이미 완료된 일차는 건너뛰고,
+    on_day(key, df) 는 날짜가 지난 일차를 파싱할 때마다 순서대로 호출됩니다.
+    collect 가 False 이면 일차 DataFrame 을 모아 두지 않고 빈 DataFrame 을 돌려줍니다
+    (on_day 로 바로 저장할 때 메모리가 연도 크기만큼 늘지 않습니다).
     """
+    fetcher = fetcher or make_fetcher(pause=pause, rate=rate, concurrency=concurrency)
+
     # 1) 해당 year의 (회차, 일차, 날짜) 리스트 가져오기
-    soup = get_soup(f"https://www.kcycle.or.kr/race/result/general/{year}/01/1")
+    soup = get_soup(fetcher.url(f"/race/result/general/{year}/01/1"), fetcher, is_open_year(year))
     opts = soup.select('select[name="tmsDayOrd"] option')
     days = []
     for op in opts:
@@ -91,40 +115,62 @@ def crawl_yearly_results(year: int, pause: float = 0.5) -> pd.DataFrame:
         ymd = f"{year}{mon:02d}{day:02d}"
         days.append((c, d, ymd))
     days.reverse()
+    if manifest is not None:
+        days = [x for x in days if day_key(year, x[0], x[1]) not in manifest]
 
-    all_results = []
-    for 회차, 일차, 날짜 in tqdm(days, desc=f"{year} 결과 크롤링", unit="일차"):
+    @telemetry.profiled
+    def _crawl_day(x):
+        회차, 일차, 날짜 = x
         try:
-            # 2) 페이지 요청
-            url = f"https://www.kcycle.or.kr/race/result/general/{year}/{int(회차):02d}/{일차}"
-            day_soup = get_soup(url, headers={"User-Agent":"Mozilla/5.0"})
-
-            # 3) tbody 추출
-            tbody = day_soup.select_one("div.comDataTable table.excel_table tbody")
-            if not tbody:
-                tqdm.write(f"⚠️ tbody 없음: {year}-{회차}-{일차}")
-                continue
-
-            # 4) 파싱
-            df = parse_race_results(
-                html=tbody,
-                year=year,
-                회차=회차,
-                일차=일차,
-                날짜=날짜
-            )
-            if not df.empty:
-                all_results.append(df)
+            with telemetry.timer("day"):
+                # 2) 페이지 요청 (날짜가 지나지 않은 일차는 캐시를 쓰지 않음)
+                url = fetcher.url(f"/race/result/general/{year}/{int(회차):02d}/{일차}")
+                day_soup = get_soup(url, fetcher, not is_final(날짜))
+
+                # 3) tbody 추출
+                # 일차 목록에 있는 일차는 경주가 있어야 하므로, 표가 없거나 비어 있으면 일시적인
+                # 페이지 오류로 보고 실패 처리합니다 (완료로 기록하지 않아 다음 실행에서 다시 받음)
+                tbody = day_soup.select_one("div.comDataTable table.excel_table tbody")
+                if not tbody:
+                    raise ValueError("tbody 없음")
+
+                # 4) 파싱
+                df = parse_race_results(
+                    html=tbody,
+                    year=year,
+                    회차=회차,
+                    일차=일차,
+                    날짜=날짜
+                )
+                if df.empty:
+                    raise ValueError("경주 결과 없음")
+            telemetry.count("days")
+            telemetry.count("rows", len(df))
+            return df
 
         except Exception as e:
+            telemetry.failure("day", e, f"{year}-{회차}-{일차}")
             tqdm.write(f"❌ 오류: {year}-{회차}-{일차}: {e}")
+            return None
 
-        time.sleep(pause)
+    all_results = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = pool.map(_crawl_day, days)
+        for (회차, 일차, 날짜), df in tqdm(
+            zip(days, results), total=len(days), desc=f"{year} 결과 크롤링", unit="일차"
+        ):
+            if df is None:
+                continue
+            if on_day is not None and is_final(날짜):
+                on_day(day_key(year, 회차, 일차), df)
+            if collect and not df.empty:
+                all_results.append(df)
 
-    if all_results:
-        return pd.concat(all_results, ignore_index=True)
-    else:
-        return pd.DataFrame()
+    with telemetry.timer("concat"):
+        if all_results:
+            return pd.concat(all_results, ignore_index=True)
+        else:
+            return pd.DataFrame()
 
 
 def parse_years_arg(s: str):
@@ -143,27 +189,63 @@ if __name__ == "__main__":
     )
     p.add_argument(
         "--pause", type=float, default=0.5,
-        help="각 페이지 요청 사이 대기 시간(초)"
+        help="각 페이지 요청 사이 대기 시간(초). --rate 가 없으면 초당 1/pause 회로 제한"
+    )
+    p.add_argument(
+        "--concurrency", type=int, default=1,
+        help="동시에 받을 일차 페이지 수"
+    )
+    p.add_argument(
+        "--rate", type=float, default=None,
+        help="호스트당 초당 최대 요청 수 (토큰 버킷)"
+    )
+    p.add_argument(
+        "--base-url", default=BASE_URL,
+        help="크롤링 대상 호스트"
     )
     p.add_argument(
         "--output", default="./data/race_results.csv",
         help="저장할 CSV 파일명"
     )
+    p.add_argument(
+        "--cache-dir", default="./data/cache/pages",
+        help="원본 html 캐시 디렉터리 (빈 문자열이면 캐시 사용 안 함)"
+    )
+    p.add_argument(
+        "--manifest", default=None,
+        help="완료 일차 매니페스트 (기본: <output>.manifest.json)"
+    )
+    p.add_argument(
+        "--full", action="store_true",
+        help="기존 출력과 매니페스트를 지우고 처음부터 크롤링"
+    )
+    p.add_argument(
+        "--dataset", default=None,
+        help="CSV 대신 연도·회차 파티션 Parquet 데이터셋에 저장. 일차를 받을 때마다 그 회차 파일을 다시 씀 (예: ./data/race_results)"
+    )
+    telemetry.add_cli_args(p)
     args = p.parse_args()
 
     years = parse_years_arg(args.years)
-    result_dfs = []
-    for y in years:
-        df_y = crawl_yearly_results(y, pause=args.pause)
-        if not df_y.empty:
-            result_dfs.append(df_y)
-
-    if result_dfs:
-        df_all = pd.concat(result_dfs, ignore_index=True)
-        df_all.to_csv(args.output, index=False, encoding="utf-8-sig")
-        print(f"✅ 저장 완료: {args.output} ({len(df_all)} rows)")
+    fetcher = make_fetcher(
+        pause=args.pause, rate=args.rate,
+        concurrency=args.concurrency, base_url=args.base_url,
+        cache_dir=args.cache_dir or None,
+    )
+    # 날짜가 지난 일차는 파싱 즉시 CSV 에 이어 쓰거나 데이터셋의 회차 파티션에 반영하고 완료로 기록합니다
+    writer = open_day_writer(args.output, args.manifest, args.full, args.dataset, "race_results")
+
+    with telemetry.session(args.metrics, args.profile, meta={"crawler": "result", "years": years}):
+        for y in years:
+            crawl_yearly_results(
+                y, concurrency=args.concurrency, fetcher=fetcher,
+                manifest=writer.manifest, on_day=writer, collect=False,
+            )
+
+    if writer.n_rows:
+        print(f"✅ 저장 완료: {writer.output} (+{writer.n_rows} rows)")
     else:
-        print("⚠️ 수집된 데이터가 없습니다.")
+        print("⚠️ 새로 수집된 데이터가 없습니다.")
 
     # 예시
     # python kcycle_result_crawler.py --years 2017-2025 --pause 0.3
\ No newline at end of file
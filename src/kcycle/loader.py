@@ -1,55 +1,432 @@
-import re
+import os
+import json
+import zlib
+import hashlib
+import importlib.util
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-def load_data():
-
-    # 1) CSV 읽기
-    info_data   = pd.read_csv('./data/race_info.csv',   low_memory=False)
-    result_data = pd.read_csv('./data/race_results.csv', low_memory=False)
-
-    # 2) result_data를 long 포맷으로 변환하며 rank 부여
-    records = []
-    for _, row in result_data.iterrows():
-        연도 = int(row['연도'])
-        회차 = str(row['회차']).zfill(2)
-        일차 = int(row['일차'])
-        경주 = row['경주']
-        for rank in (1, 2, 3):
-            num_col = f"{rank}착 번호"
-            num = row[num_col]
-            if pd.isna(num) or str(num).strip() in ('', '-'):
+# 캐시에 category dtype 으로 저장할 저카디널리티 문자열 컬럼
+CATEGORY_COLS = ['경주지역', '경주종류', '훈련지', '등급조정']
+
+# 캐시 형식이 바뀌면 올려서 기존 캐시를 무효화합니다
+CACHE_VERSION = 1
+
+# race_id 의 경주지역 자리. 목록에 없는 경주장은 이름 해시로 10~99 를 씁니다.
+VENUE_CODES = {'광명': 1, '창원': 2, '부산': 3}
+
+# 해시로 정한 코드 → 경주장 이름 (프로세스 안에서 본 것 전부)
+_HASHED_CODES = {}
+
+
+def venue_code(region) -> int:
+    """
+    경주장 → race_id 의 두 자리 코드.
+    해시 코드가 다른 경주장과 겹치면 두 경주장의 race_id 가 같아지므로 ValueError 를 냅니다.
+    (VENUE_CODES 에 고정 코드를 추가해서 풉니다)
+    """
+    if region in VENUE_CODES:
+        return VENUE_CODES[region]
+    name = str(region)
+    code = 10 + zlib.crc32(name.encode('utf-8')) % 90
+    other = _HASHED_CODES.setdefault(code, name)
+    if other != name:
+        raise ValueError(
+            f"경주장 코드 충돌: {other!r} 와 {name!r} 가 같은 코드 {code} 입니다. VENUE_CODES 에 추가하세요."
+        )
+    return code
+
+
+def make_race_id(연도, 회차, 일차, 경주지역, 경주번호) -> np.ndarray:
+    """
+    (연도, 회차, 일차, 경주지역, 경주번호) → int64 경주 키.
+    연도·회차·일차가 앞자리에 오므로 race_id 순서가 곧 일차 순서입니다.
+        2025 16 3 01 05  →  20251630105
+    """
+    venue = pd.Series(경주지역).map(
+        {r: venue_code(r) for r in pd.unique(pd.Series(경주지역))}
+    ).to_numpy(np.int64)
+    return (
+        ((np.asarray(연도, np.int64) * 100 + np.asarray(회차, np.int64)) * 10
+         + np.asarray(일차, np.int64)) * 10000
+        + venue * 100 + np.asarray(경주번호, np.int64)
+    )
+
+
+def _zfill2(s: pd.Series) -> pd.Series:
+    # 고유값만 포맷해서 매핑 (행마다 astype(str).str.zfill 하지 않음)
+    return s.map({v: f"{v:02d}" for v in pd.unique(s)})
+
+
+def _as_str(s: pd.Series) -> pd.Series:
+    return s.map({v: str(v) for v in pd.unique(s)})
+
+
+def result_race_ids(result_data: pd.DataFrame) -> tuple:
+    """
+    race_results 의 '경주'(예: '광명01') 로 (race_id, 경주번호가 있는 행 마스크) 를 만듭니다.
+    """
+    # '경주' 컬럼에서 지역/번호 분리 (고유값에 대해서만 정규식 적용)
+    labels  = pd.Series(pd.unique(result_data['경주']))
+    parts   = labels.str.extract(r'(.+?)(\d+)$')
+    region  = result_data['경주'].map(dict(zip(labels, parts[0])))
+    race_no = result_data['경주'].map(dict(zip(labels, pd.to_numeric(parts[1]))))
+
+    race_id = make_race_id(
+        result_data['연도'].astype(int),
+        result_data['회차'].astype(int),
+        result_data['일차'].astype(int),
+        region,
+        race_no.fillna(0).astype(int),
+    )
+    return race_id, race_no.notna().to_numpy()
+
+
+def results_long(result_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    race_results(경주당 1행) → (race_id, 번호, rank) long 포맷.
+    번호가 비었거나 '-', 동착('1/2') 처럼 숫자가 아니면 제외합니다.
+    """
+    race_id, valid = result_race_ids(result_data)
+
+    nums = result_data[['1착 번호', '2착 번호', '3착 번호']].to_numpy().ravel()
+    nums = pd.to_numeric(pd.Series(nums, dtype=object).astype(str).str.strip(), errors='coerce')
+    res_long = pd.DataFrame({
+        'race_id': np.repeat(race_id, 3),
+        '번호':    nums.to_numpy(),
+        'rank':    np.tile(np.array([1, 2, 3]), len(result_data)),
+    })
+    res_long = res_long[res_long['번호'].notna() & np.repeat(valid, 3)]
+    res_long['번호'] = res_long['번호'].astype(np.int64)
+    return res_long.reset_index(drop=True)
+
+
+# results_long 에 필요한 race_results.csv 컬럼
+RESULT_COLS = ['연도', '회차', '일차', '경주', '1착 번호', '2착 번호', '3착 번호']
+
+# race_id·rank 계산에 필요한 race_info.csv 컬럼
+KEY_COLS = ['연도', '회차', '일차', '경주지역', '경주번호', '번호']
+
+
+def rank_lookup(result_data: pd.DataFrame) -> pd.Series:
+    """ (race_id*100 + 번호) int64 키 → rank Series. 경주당 3개 항목이라 전체 기간도 작습니다. """
+    res_long = results_long(result_data)
+    res_key  = res_long['race_id'].to_numpy() * 100 + res_long['번호'].to_numpy()
+    rank = pd.Series(res_long['rank'].to_numpy(), index=res_key)
+    return rank[~rank.index.duplicated()]
+
+
+def attach_rank(info_data: pd.DataFrame, rank: pd.Series) -> pd.DataFrame:
+    """ race_info 행들에 race_id 와 rank 를 붙입니다 (info_data 를 제자리에서 수정). """
+
+    # info_data key 컬럼을 정수로 통일하고 race_id 부여
+    연도   = info_data['연도'].astype(int)
+    회차   = info_data['회차'].astype(int)
+    일차   = info_data['일차'].astype(int)
+    경주번호 = info_data['경주번호'].astype(int)
+    번호   = pd.to_numeric(info_data['번호'], errors='coerce')
+    race_id = make_race_id(연도, 회차, 일차, info_data['경주지역'], 경주번호)
+
+    # 출력 포맷은 기존과 동일하게 유지 (회차·경주번호 2자리 문자열, 번호 문자열)
+    info_data['연도']     = 연도
+    info_data['회차']     = _zfill2(회차)
+    info_data['일차']     = 일차
+    info_data['경주번호'] = _zfill2(경주번호)
+    info_data['번호']     = _as_str(info_data['번호'])
+    info_data.insert(0, 'race_id', race_id)
+
+    # (race_id, 번호) 를 int64 키 하나로 합쳐 rank 붙이기
+    player_key = race_id * 100 + 번호.fillna(-1).astype(np.int64).to_numpy()
+    info_data['rank'] = pd.Series(player_key).map(rank).to_numpy(dtype=float)
+    return info_data
+
+
+def csv_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    문자열 컬럼을 CSV 로 저장했다 read_csv 로 읽은 것과 같은 타입으로 맞춥니다 (df 를 제자리에서 수정).
+    빈 칸은 결측으로 두고, 결측이 아닌 값이 모두 숫자인 컬럼만 int64(결측 없음) 또는 float64 로 바꿉니다.
+    """
+    for col in df.columns:
+        s = df[col]
+        if not (s.dtype == object or pd.api.types.is_string_dtype(s)):
+            continue
+        s   = s.replace('', np.nan)
+        num = pd.to_numeric(s, errors='coerce')
+        if num.notna().sum() == s.notna().sum():
+            integer = pd.api.types.is_integer_dtype(num) and not num.isna().any()
+            s = num.astype(np.int64 if integer else np.float64)
+        df[col] = s
+    return df
+
+
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    # 저카디널리티 문자열 컬럼은 category 로
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _build(data_dir: Path) -> pd.DataFrame:
+    info_data   = pd.read_csv(data_dir / 'race_info.csv',    low_memory=False)
+    result_data = pd.read_csv(data_dir / 'race_results.csv', low_memory=False)
+    return _categorize(attach_rank(info_data, rank_lookup(result_data)))
+
+
+# ───── 컬럼형 캐시 ───────────────────────────────────────────────────────
+# data/cache/race_data.parquet 에 병합 결과를 저장하고, 원본 CSV 의
+# (mtime, 크기, sha256) 을 race_data.json 에 함께 기록합니다.
+# mtime 이나 크기가 바뀌면 해시를 다시 계산해 내용이 다를 때만 캐시를 다시 만듭니다.
+
+SOURCES = ('race_info.csv', 'race_results.csv')
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _stat(path: Path) -> dict:
+    st = path.stat()
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+def _cache_valid(data_dir: Path, meta_path: Path, cache_path: Path) -> bool:
+    if not (meta_path.is_file() and cache_path.is_file()):
+        return False
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    if meta.get('version') != CACHE_VERSION:
+        return False
+
+    touched = False
+    for name in SOURCES:
+        src, old = data_dir / name, meta['sources'].get(name)
+        if old is None or not src.is_file():
+            return False
+        cur = _stat(src)
+        if cur == {k: old[k] for k in cur}:
+            continue
+        # mtime 만 바뀐 경우(복사·touch)에는 해시가 같으면 그대로 사용
+        if cur['size'] != old['size'] or _sha256(src) != old['sha256']:
+            return False
+        old.update(cur)
+        touched = True
+
+    if touched:
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding='utf-8')
+    return True
+
+
+def _write_cache(df: pd.DataFrame, data_dir: Path, meta_path: Path, cache_path: Path):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(f'.{cache_path.name}.{os.getpid()}.tmp')
+    # 연도 순으로 정렬되어 있으므로 row group 통계로 연도 필터가 파일 단위에서 걸러집니다
+    df.to_parquet(tmp, index=False, row_group_size=50_000)
+    os.replace(tmp, cache_path)
+    meta = {
+        'version': CACHE_VERSION,
+        'sources': {
+            name: {**_stat(data_dir / name), 'sha256': _sha256(data_dir / name)}
+            for name in SOURCES
+        },
+    }
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding='utf-8')
+
+
+# ───── 파티션 데이터셋 ───────────────────────────────────────────────────
+# data/race_info, data/race_results 가 kcycle.storage 데이터셋이면 CSV·캐시 대신 그대로 읽습니다.
+# 이미 컬럼형이므로 캐시를 만들지 않고, years 는 연도= 디렉터리 단위로 걸러집니다.
+# 데이터셋은 키 외의 컬럼을 문자열로 저장하므로 읽은 뒤 csv_dtypes 로 CSV 경로와 같은 타입으로 맞춥니다.
+
+def _dataset_columns(columns):
+    return None if columns is None else set(columns) | set(KEY_COLS)
+
+
+def _dataset_rank(data_dir: Path, years) -> pd.Series:
+    from kcycle.storage import PartitionedDataset
+
+    results = PartitionedDataset(data_dir / 'race_results', 'race_results')
+    return rank_lookup(results.read(columns=RESULT_COLS, years=years))
+
+
+def _load_dataset(data_dir: Path, columns, years) -> pd.DataFrame:
+    from kcycle.storage import PartitionedDataset
+
+    info = PartitionedDataset(data_dir / 'race_info', 'race_info')
+    info = csv_dtypes(info.read(_dataset_columns(columns), years))
+    df = _categorize(attach_rank(info, _dataset_rank(data_dir, years)))
+    return df[columns] if columns is not None else df
+
+
+def _iter_dataset(data_dir: Path, chunksize: int, columns, years):
+    from kcycle.storage import PartitionedDataset
+
+    rank = _dataset_rank(data_dir, years)
+    info = PartitionedDataset(data_dir / 'race_info', 'race_info')
+    for chunk in info.iter_batches(chunksize, _dataset_columns(columns), years):
+        yield attach_rank(csv_dtypes(chunk), rank)
+
+
+def _use_dataset(data_dir: Path) -> bool:
+    return importlib.util.find_spec('pyarrow') is not None and all(
+        (data_dir / name).is_dir() for name in ('race_info', 'race_results')
+    )
+
+
+def parse_years(s: str) -> list:
+    """ 커맨드라인 --years 값: "2017-2020" (범위) 또는 "2017,2019,2021" (목록) → 연도 list """
+    a, _, b = s.partition('-')
+    return list(range(int(a), int(b) + 1)) if b else [int(y) for y in s.split(',')]
+
+
+def load_data(columns=None, years=None, data_dir='./data', cache=True):
+    """
+    race_info.csv 에 race_results.csv 의 rank 를 붙여 돌려줍니다.
+    data_dir 에 파티션 데이터셋(race_info/, race_results/)이 있으면 CSV 대신 데이터셋을 읽습니다.
+
+    Parameters
+    ----------
+    columns : list of str, optional
+        읽을 컬럼. 캐시가 있으면 해당 컬럼만 파일에서 읽습니다.
+    years : list of int, optional
+        읽을 연도. 캐시가 있으면 해당 연도의 row group 만, 데이터셋이면 해당 연도 디렉터리만 읽습니다.
+    data_dir : str, default='./data'
+        CSV 또는 파티션 데이터셋이 있는 디렉터리.
+    cache : bool, default=True
+        pyarrow 가 설치되어 있으면 data_dir/cache 의 Parquet 캐시를 사용합니다.
+    """
+    data_dir   = Path(data_dir)
+    cache_path = data_dir / 'cache' / 'race_data.parquet'
+    meta_path  = data_dir / 'cache' / 'race_data.json'
+    columns    = list(columns) if columns is not None else None
+    years      = [int(y) for y in years] if years is not None else None
+
+    if _use_dataset(data_dir):
+        return _load_dataset(data_dir, columns, years)
+
+    use_cache = cache and importlib.util.find_spec('pyarrow') is not None
+    if use_cache:
+        if not _cache_valid(data_dir, meta_path, cache_path):
+            _write_cache(_build(data_dir), data_dir, meta_path, cache_path)
+        return pd.read_parquet(
+            cache_path,
+            columns=columns,
+            filters=[('연도', 'in', years)] if years is not None else None,
+        )
+
+    df = _build(data_dir)
+    if years is not None:
+        df = df[df['연도'].isin(years)].reset_index(drop=True)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+# ───── 스트리밍 로드 ─────────────────────────────────────────────────────
+# 전체 기간을 한 번에 올리지 않고 chunksize 행 안팎의 조각으로 읽습니다.
+# 조각 끝에 걸친 경주는 다음 조각으로 넘겨 항상 7행짜리 경주 단위로 잘라 줍니다.
+# (원본 CSV·캐시는 크롤러가 경주 순서대로 기록하므로 같은 경주의 행은 연속합니다)
+
+def _iter_csv(data_dir: Path, chunksize: int, columns, years):
+    result_data = pd.read_csv(data_dir / 'race_results.csv', usecols=RESULT_COLS, low_memory=False)
+    if years is not None:
+        result_data = result_data[result_data['연도'].isin(years)]
+    rank = rank_lookup(result_data)
+    del result_data
+
+    usecols = None if columns is None else (lambda c: c in columns or c in KEY_COLS)
+    for chunk in pd.read_csv(data_dir / 'race_info.csv', usecols=usecols, chunksize=chunksize, low_memory=False):
+        if years is not None:
+            chunk = chunk[chunk['연도'].isin(years)]
+            if chunk.empty:
                 continue
-            records.append({
-                '연도': 연도,
-                '회차': 회차,
-                '일차': 일차,
-                '경주': 경주,
-                '번호': str(num).strip(),
-                'rank': rank
-            })
-
-    res_long = pd.DataFrame(records)
-
-    # 3) '경주' 컬럼에서 지역/번호 분리 (정수형 인덱스로 접근)
-    extracted = res_long['경주'].str.extract(r'(.+?)(\d+)$')
-    res_long['경주지역'] = extracted[0]
-    res_long['경주번호'] = extracted[1].str.zfill(2)
-
-    # 4) info_data key 컬럼 타입 통일
-    info_data['연도']     = info_data['연도'].astype(int)
-    info_data['회차']     = info_data['회차'].astype(int).astype(str).str.zfill(2)
-    info_data['일차']     = info_data['일차'].astype(int)
-    info_data['경주번호'] = info_data['경주번호'].astype(str).str.zfill(2)
-    info_data['번호']     = info_data['번호'].astype(str)
-
-    # 5) merge 로 rank 붙이기
-    info_with_rank = info_data.merge(
-        res_long[[
-            '연도','회차','일차',
-            '경주지역','경주번호','번호','rank'
-        ]],
-        on=['연도','회차','일차','경주지역','경주번호','번호'],
-        how='left'
+        yield attach_rank(chunk, rank)
+
+
+def _iter_parquet(cache_path: Path, chunksize: int, columns, years):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(cache_path)
+    row_groups = list(range(pf.num_row_groups))
+    if years is not None:
+        # row group 통계로 해당 연도가 없는 그룹은 읽지 않습니다
+        i = pf.schema_arrow.get_field_index('연도')
+        lo, hi = min(years), max(years)
+        row_groups = [
+            rg for rg in row_groups
+            if (st := pf.metadata.row_group(rg).column(i).statistics) is None
+            or not st.has_min_max or (st.min <= hi and st.max >= lo)
+        ]
+    read_cols = None if columns is None else [
+        c for c in pf.schema_arrow.names if c in columns or c in ('race_id', '연도')
+    ]
+    for batch in pf.iter_batches(batch_size=chunksize, row_groups=row_groups, columns=read_cols):
+        chunk = batch.to_pandas()
+        if years is not None:
+            chunk = chunk[chunk['연도'].isin(years)]
+        if len(chunk):
+            yield chunk
+
+
+def iter_data(chunksize=100_000, columns=None, years=None, data_dir='./data', cache=True, transform=None):
+    """
+    load_data 와 같은 행을 경주 단위로 끊어진 DataFrame 조각으로 차례로 돌려줍니다.
+    메모리 사용량은 전체 기간이 아니라 chunksize 에 비례합니다.
+
+    Parameters
+    ----------
+    chunksize : int, default=100_000
+        한 번에 읽을 행 수. 경주 경계에 맞추느라 조각마다 최대 6행 차이가 납니다.
+    columns, years, data_dir
+        load_data 와 같습니다.
+    cache : bool, default=True
+        유효한 Parquet 캐시가 있으면 캐시를 row group 단위로 읽고, 없으면 CSV 를 조각으로 읽습니다.
+        파티션 데이터셋이 있으면 cache 와 관계없이 데이터셋을 일차 순서대로 읽습니다.
+        (캐시를 새로 만들려면 전체를 올려야 하므로 여기서는 만들지 않습니다)
+    transform : callable, optional
+        조각마다 적용할 함수. 예) clean_race_data, pipe.transform
+
+        for chunk in iter_data(transform=clean_race_data):
+            pipe.partial_fit(chunk)
+    """
+    data_dir   = Path(data_dir)
+    cache_path = data_dir / 'cache' / 'race_data.parquet'
+    meta_path  = data_dir / 'cache' / 'race_data.json'
+    columns    = list(columns) if columns is not None else None
+    years      = [int(y) for y in years] if years is not None else None
+
+    use_cache = (
+        cache and importlib.util.find_spec('pyarrow') is not None
+        and _cache_valid(data_dir, meta_path, cache_path)
     )
+    if _use_dataset(data_dir):
+        chunks = _iter_dataset(data_dir, chunksize, columns, years)
+    elif use_cache:
+        chunks = _iter_parquet(cache_path, chunksize, columns, years)
+    else:
+        chunks = _iter_csv(data_dir, chunksize, columns, years)
+
+    def finish(df):
+        df = _categorize(df.reset_index(drop=True))
+        if columns is not None:
+            df = df[columns]
+        return transform(df) if transform is not None else df
 
-    return info_with_rank
+    carry = None
+    for chunk in chunks:
+        if carry is not None and len(carry):
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        # 마지막 경주는 다음 조각에서 이어질 수 있으므로 남겨 둡니다
+        race_id = chunk['race_id'].to_numpy()
+        other   = np.flatnonzero(race_id != race_id[-1])
+        cut     = other[-1] + 1 if len(other) else 0
+        carry   = chunk.iloc[cut:]
+        if cut:
+            yield finish(chunk.iloc[:cut])
+    if carry is not None and len(carry):
+        yield finish(carry)
@@ -0,0 +1,175 @@
+"""
+경주 단위 평가 지표.
+
+example.ipynb 의 compute_race_metrics 는 경주마다 np.argsort 를 돌리고,
+train/val/test × 단승/복승/삼복승 조합마다 따로 호출됩니다.
+여기서는 점수 행렬 전체에서 경주 안 예측 순위를 한 번에 구해 모든 k 의 상위 k 명을 얻고,
+모든 베팅 종류의 지표를 한 번에 계산합니다.
+
+    from kcycle.metrics import evaluate, RaceMetrics
+
+    evaluate(rt.rank, y_score)                 # {'단승': {...}, '복승': {...}, '삼복승': {...}}
+
+    acc = RaceMetrics()                        # 배치 단위로 누적
+    for rank, score in batches:
+        acc.update(rank, score)
+    acc.frame()
+
+지표 (베팅 종류별)
+    race_accuracy : 경주 안 상위 k 명 예측이 실제 입상자와 정확히 일치한 경주 비율
+    accuracy / f1 : 선수 단위, score > threshold 로 이진화
+    r2            : 선수 단위, 0/1 타깃에 대한 score 의 결정계수
+"""
+import numpy as np
+import pandas as pd
+
+from kcycle.tensor import TOP_K
+
+BET_TYPES = tuple(TOP_K)
+METRICS   = ('race_accuracy', 'accuracy', 'f1', 'r2')
+
+# 배치마다 누적하는 충분통계
+_STATS = ('races', 'race_hits', 'n', 'tp', 'fp', 'fn', 'pos', 'ss_res')
+
+
+def _positions_t(cols: np.ndarray) -> np.ndarray:
+    """ (m, n) 선수 축이 앞인 점수 → (m, n) 예측 순위. """
+    m, n = cols.shape
+    pos = np.zeros((m, n), dtype=np.int8)
+    for j in range(m):
+        pos += cols[j] > cols
+
+    tied = np.flatnonzero(pos.sum(axis=0, dtype=np.int32) != m * (m - 1) // 2)
+    if len(tied):
+        order = np.argsort(cols[:, tied].T, axis=1)
+        fixed = np.empty((len(tied), m), dtype=np.int8)
+        np.put_along_axis(fixed, order, np.arange(m - 1, -1, -1, dtype=np.int8)[None, :], axis=1)
+        pos[:, tied] = fixed.T
+    return pos
+
+
+def order_positions(y_score: np.ndarray) -> np.ndarray:
+    """
+    (n_races, m) 경주 안 예측 순위 (0 = 점수 최고). 상위 k 명은 pos < k 로 모든 k 에 대해 바로 나옵니다.
+
+    m 이 7 처럼 작으므로 정렬 대신 m 번의 벡터 비교로 "나보다 점수가 높은 선수 수"를 셉니다.
+    동점(또는 NaN)이 있는 경주는 순위 합이 m(m-1)/2 가 되지 않으므로 그 경주만
+    노트북과 같은 np.argsort(...)[-k:] 규칙으로 다시 매겨 기존 결과와 같게 둡니다.
+    """
+    # 선수 축을 앞으로 두면 비교 m 번이 모두 연속 메모리 위에서 돕니다
+    return _positions_t(np.ascontiguousarray(np.asarray(y_score).T)).T
+
+
+def top_k_index(y_score: np.ndarray, k: int) -> np.ndarray:
+    """ (n_races, k) 상위 k 명의 열 위치 (점수 높은 순) """
+    return np.argsort(order_positions(y_score), axis=1, kind='stable')[:, :k]
+
+
+def _score_stats(rank_t: np.ndarray, y_score: np.ndarray, bet_types, threshold: float) -> dict:
+    """ 점수 행렬 하나에 대해 bet_types 별 충분통계를 계산합니다. (rank_t 는 (m, n)) """
+    cols   = np.ascontiguousarray(y_score.T)
+    pos    = _positions_t(cols)
+    pred   = cols > threshold
+    n_pred = np.count_nonzero(pred)
+    ss     = np.dot(cols.ravel(), cols.ravel())
+
+    out = {}
+    for b in bet_types:
+        k      = TOP_K[b]
+        true   = rank_t <= k
+        tp     = np.count_nonzero(pred & true)
+        n_true = np.count_nonzero(true)
+        # sum((s - y)^2) = sum(s^2) - 2 sum(s·y) + sum(y)   (y 는 0/1)
+        s_true = np.dot(cols.ravel(), true.ravel())
+        out[b] = np.array([
+            true.shape[1],
+            np.count_nonzero((true == (pos < k)).all(axis=0)),
+            true.size,
+            tp,
+            n_pred - tp,
+            n_true - tp,
+            n_true,
+            ss - 2 * s_true + n_true,
+        ], dtype=np.float64)
+    return out
+
+
+def _finalize(s: np.ndarray) -> dict:
+    races, race_hits, n, tp, fp, fn, pos, ss_res = s
+    # 0/1 타깃의 분산: sum((y - mean)^2) = pos - pos^2/n
+    ss_tot = pos - pos * pos / n if n else 0.0
+    if ss_tot > 0:
+        r2 = 1.0 - ss_res / ss_tot
+    else:  # sklearn r2_score 와 같은 처리
+        r2 = 1.0 if ss_res == 0 else 0.0
+    denom = 2 * tp + fp + fn
+    return {
+        'race_accuracy': race_hits / races if races else np.nan,
+        'accuracy':      (n - fp - fn) / n if n else np.nan,
+        'f1':            2 * tp / denom if denom else 0.0,
+        'r2':            r2,
+    }
+
+
+class RaceMetrics:
+    """
+    배치 단위로 예측을 받아 지표를 누적합니다. 결과는 전체를 한 번에 evaluate 한 것과 같습니다.
+
+    update(rank, y_score)
+        rank    : (n_races, 7) 실제 착순 (입상 못 하면 NaN 또는 4 이상)
+        y_score : (n_races, 7) 하나를 모든 베팅 종류에 쓰거나, {bet_type: (n_races, 7)}
+    """
+
+    def __init__(self, bet_types=BET_TYPES, threshold: float = 0.5):
+        self.bet_types = tuple(bet_types)
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self._stats = {b: np.zeros(len(_STATS)) for b in self.bet_types}
+
+    def update(self, rank, y_score):
+        rank_t = np.ascontiguousarray(np.asarray(rank, dtype=np.float64).T)
+        if isinstance(y_score, dict):
+            groups = [((b,), y_score[b]) for b in self.bet_types]
+        else:
+            groups = [(self.bet_types, y_score)]  # 같은 점수 행렬은 순위 계산 한 번만
+        for bets, score in groups:
+            stats = _score_stats(rank_t, np.asarray(score, dtype=np.float64), bets, self.threshold)
+            for b, s in stats.items():
+                self._stats[b] += s
+        return self
+
+    def result(self) -> dict:
+        return {b: _finalize(self._stats[b]) for b in self.bet_types}
+
+    def frame(self) -> pd.DataFrame:
+        """ 베팅 종류 × 지표 DataFrame """
+        return pd.DataFrame(self.result()).T[list(METRICS)]
+
+
+def evaluate(rank, y_score, bet_types=BET_TYPES, threshold: float = 0.5) -> dict:
+    """ 한 번에 평가. {bet_type: {metric: value}} """
+    return RaceMetrics(bet_types, threshold).update(rank, y_score).result()
+
+
+def compute_race_metrics(
+    y_true: np.ndarray,
+    y_score: np.ndarray,
+    threshold: float = 0.5,
+    top_k: int = 2
+) -> pd.Series:
+    """
+    example.ipynb 의 compute_race_metrics 와 같은 인터페이스·결과 (경주 루프 없이 계산).
+    y_true, y_score 는 (n_races, n_classes) 입니다.
+    """
+    y_true  = np.asarray(y_true)
+    y_score = np.asarray(y_score)
+    if y_true.shape != y_score.shape:
+        raise ValueError(f"y_true.shape {y_true.shape}와 y_score.shape {y_score.shape}가 일치해야 합니다.")
+    if y_true.ndim != 2:
+        raise ValueError(f"입력 배열은 2D여야 합니다. (현재 ndim={y_true.ndim})")
+
+    y_pred_topk = order_positions(y_score) < top_k
+    race_acc = np.mean(np.all(y_true == y_pred_topk, axis=1))
+    return pd.Series({"race_accuracy": race_acc})
@@ -0,0 +1,238 @@
+"""
+경주 단위(7명 동시) 예측 모델.
+
+MultiOutputRaceClassifier 는 example.ipynb 의 MultiOutputClassifierCustom 을 대체합니다.
+슬롯(1번 ~ 7번)마다 estimator 를 하나씩 학습하는 것은 같지만,
+
+- 7개 학습을 프로세스 풀(joblib loky)에서 동시에 돌리고, 코어 예산을
+  동시 학습 수 × estimator 의 n_jobs 로 나눠 과다 구독을 막습니다.
+- 학습 행렬은 joblib 이 임시 파일로 한 번만 덤프하고 워커는 memmap 으로 읽습니다
+  (슬롯마다 X 를 pickle 로 보내지 않음).
+- predict_proba 는 (n_races, 7) 점수 행렬을 바로 돌려줍니다.
+
+RaceRanker 는 7명 모두를 가중치를 공유하는 랭킹 모델 하나(LightGBM lambdarank)로 점수화합니다.
+모델 1개로 학습·저장·추론하며, 같은 경주 안의 점수가 서로 비교 가능합니다.
+
+    from kcycle.models import MultiOutputRaceClassifier
+
+    model = MultiOutputRaceClassifier(LGBMClassifier(n_estimators=5000, early_stopping_rounds=100), n_jobs=-1)
+    model.fit(rt.per_race(), rt.targets('삼복승'), eval_set=[(rv.per_race(), rv.targets('삼복승'))],
+              categorical_feature=rt.cat_feature_indices())
+    y_score = model.predict_proba(rv.per_race())     # (n_races, 7)
+
+    ranker = RaceRanker().fit(rt, eval_set=[rv])
+    evaluate(rv.rank, ranker.predict_proba(rv))
+"""
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+
+from kcycle.tensor import RaceTensor
+
+
+def _as_matrix(X):
+    if sp.issparse(X):
+        return X
+    return X.per_race() if isinstance(X, RaceTensor) else np.asarray(X)
+
+
+def split_cores(n_jobs, n_tasks: int) -> tuple:
+    """
+    코어 예산 n_jobs(-1 이면 전체)를 (동시 작업 수, 작업당 스레드 수)로 나눕니다.
+        16코어, 7개 → (7, 2)    4코어, 7개 → (4, 1)
+    """
+    cores = effective_n_jobs(n_jobs)
+    outer = max(1, min(n_tasks, cores))
+    return outer, max(1, cores // outer)
+
+
+def with_threads(est, n_threads: int):
+    """
+    n_jobs 를 직접 지정한 estimator 만 작업당 스레드 수(split_cores 의 inner)로 바꿔 돌려줍니다.
+    지정하지 않았으면 워커의 OpenMP/BLAS 스레드 제한(inner_max_num_threads)을 따릅니다.
+    """
+    if est.get_params().get('n_jobs') is not None:
+        est.set_params(n_jobs=n_threads)
+    return est
+
+
+def _fit_one(est, X, y, eval_set, fit_kwargs):
+    if eval_set is not None:
+        fit_kwargs = {**fit_kwargs, 'eval_set': eval_set}
+    return est.fit(X, y, **fit_kwargs)
+
+
+def _positive_proba(est, X) -> np.ndarray:
+    p = est.predict_proba(X)
+    # binary classifier라면 p.shape = (n_samples, 2)
+    if p.shape[1] != 2:
+        raise ValueError("각 estimator는 이진 분류를 지원해야 합니다.")
+    return p[:, 1]
+
+
+class MultiOutputRaceClassifier(BaseEstimator, ClassifierMixin):
+    """
+    Parameters
+    ----------
+    estimator : 이진 분류기
+        슬롯마다 clone 해서 학습합니다.
+    n_jobs : int, default=-1
+        전체 코어 예산. 동시 학습 수와 estimator 의 n_jobs 로 나눠 씁니다.
+    max_nbytes : str or int, default='1M'
+        이보다 큰 배열은 워커에 memmap 으로 전달합니다 (joblib.Parallel 의 max_nbytes).
+    batch_size : int, default=65536
+        predict_proba 에서 한 번에 예측할 경주 수.
+    """
+
+    def __init__(self, estimator, n_jobs=-1, max_nbytes='1M', batch_size=65536):
+        self.estimator  = estimator
+        self.n_jobs     = n_jobs
+        self.max_nbytes = max_nbytes
+        self.batch_size = batch_size
+
+    def fit(self, X, y, eval_set=None, **fit_kwargs):
+        """
+        각 출력(y[:, i])마다 estimator를 복제하여 학습합니다.
+
+        Parameters
+        ----------
+        X : array-like (n_races, n_features) 또는 RaceTensor
+        y : array-like, shape (n_races,) or (n_races, n_outputs)
+        eval_set : list of (X_val, y_val) tuples, optional
+            모든 타깃에 공통으로 사용할 검증용 데이터. y_val 이 2D 면 타깃별로 나눠 전달합니다.
+        **fit_kwargs : dict
+            estimator.fit에 추가로 전달할 인자들 (예: categorical_feature)
+        """
+        X = _as_matrix(X)
+        y = np.asarray(y)
+        if y.ndim == 1:
+            y = y.reshape(-1, 1)
+        n_out = y.shape[1]
+
+        eval_set = [(_as_matrix(Xv), np.asarray(yv)) for Xv, yv in eval_set] if eval_set is not None else None
+
+        def eval_for(i):
+            if eval_set is None:
+                return None
+            return [(Xv, yv[:, i] if yv.ndim == 2 else yv) for Xv, yv in eval_set]
+
+        outer, inner = split_cores(self.n_jobs, n_out)
+        self.n_parallel_, self.n_threads_ = outer, inner
+        tasks = (
+            delayed(_fit_one)(with_threads(clone(self.estimator), inner), X, y[:, i], eval_for(i), fit_kwargs)
+            for i in range(n_out)
+        )
+        if outer == 1:
+            self.estimators_ = Parallel(n_jobs=1)(tasks)
+        else:
+            # 워커 안의 BLAS/OpenMP 스레드도 inner 개로 제한
+            with parallel_config(backend='loky', inner_max_num_threads=inner):
+                self.estimators_ = Parallel(n_jobs=outer, max_nbytes=self.max_nbytes, mmap_mode='r')(tasks)
+        self.n_outputs_ = n_out
+        return self
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        학습된 각 estimator의 클래스=1 확률을 (n_races, n_outputs) 행렬에 바로 채웁니다.
+        경주를 batch_size 씩 나누고, (estimator, batch) 작업을 스레드로 나눠 돌립니다.
+        """
+        X   = _as_matrix(X)
+        out = np.empty((X.shape[0], len(self.estimators_)), dtype=np.float64)
+        batches = [slice(s, s + self.batch_size) for s in range(0, X.shape[0], self.batch_size)]
+
+        def run(j, sl):
+            out[sl, j] = _positive_proba(self.estimators_[j], X[sl])
+
+        outer, _ = split_cores(self.n_jobs, len(self.estimators_) * len(batches))
+        Parallel(n_jobs=outer, prefer='threads')(
+            delayed(run)(j, sl) for j in range(len(self.estimators_)) for sl in batches
+        )
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        """ (n_races, n_outputs) 0/1 예측 """
+        return (self.predict_proba(X) > 0.5).astype(int)
+
+
+# ───── 경주 단위 랭킹 모델 ───────────────────────────────────────────────
+
+def relevance_labels(rank, top: int = 3) -> np.ndarray:
+    """ 착순 → 랭킹 관련도. 1착 3, 2착 2, 3착 1, 나머지(NaN 포함) 0 """
+    rank = np.asarray(rank, dtype=np.float64)
+    rel  = np.where(rank <= top, top + 1 - rank, 0)
+    return rel.astype(np.int32)
+
+
+def _per_player(X, per_race: int) -> tuple:
+    """ X → ((n_races*per_race, F) 행렬, n_races) """
+    if isinstance(X, RaceTensor):
+        return X.per_player(), X.n_races
+    # 희소 행렬(text_features.stack_features)은 선수 단위 행 그대로 씁니다
+    X = X.tocsr() if sp.issparse(X) else np.asarray(X)
+    if X.ndim == 3:
+        return X.reshape(-1, X.shape[2]), X.shape[0]
+    if X.shape[0] % per_race != 0:
+        raise ValueError(f"행 수({X.shape[0]})가 per_race({per_race})의 배수가 아닙니다.")
+    return X, X.shape[0] // per_race
+
+
+class RaceRanker(BaseEstimator):
+    """
+    가중치를 공유하는 경주 단위 랭킹 모델.
+
+    선수 단위 행(n_races*7, F)을 경주별 그룹(크기 7)으로 묶어 lambdarank 로 학습하고,
+    load_data 의 rank 를 관련도(relevance_labels)로 씁니다. 슬롯 번호는 피처('번호')로 들어갑니다.
+
+    Parameters
+    ----------
+    estimator : LGBMRanker, optional
+        기본값은 LGBMRanker(objective='lambdarank'). 다른 설정을 쓰려면 직접 넘깁니다.
+    per_race : int, default=7
+
+    fit(X, rank=None, eval_set=None, **fit_kwargs)
+        X 가 RaceTensor 면 rank 는 X.rank 를 씁니다. eval_set 은 RaceTensor 또는 (X, rank) 목록.
+        X 는 선수 단위 행의 배열이나 희소 행렬(text_features.stack_features)이어도 됩니다.
+    decision_function(X) → (n_races, 7) 랭킹 점수
+    predict_proba(X)     → (n_races, 7) 경주 안 softmax (1착 확률로 해석)
+    """
+
+    def __init__(self, estimator=None, per_race: int = 7):
+        self.estimator = estimator
+        self.per_race  = per_race
+
+    def _make_estimator(self):
+        if self.estimator is not None:
+            return clone(self.estimator)
+        from lightgbm import LGBMRanker
+        return LGBMRanker(objective='lambdarank', verbose=-1)
+
+    def _xy(self, X, rank=None) -> tuple:
+        if rank is None:
+            if not isinstance(X, RaceTensor) or X.rank is None:
+                raise ValueError("rank 가 필요합니다 (RaceTensor.rank 또는 rank 인자).")
+            rank = X.rank
+        M, n_races = _per_player(X, self.per_race)
+        return M, relevance_labels(rank).reshape(-1), np.full(n_races, self.per_race)
+
+    def fit(self, X, rank=None, eval_set=None, **fit_kwargs):
+        M, y, group = self._xy(X, rank)
+        if eval_set is not None:
+            evals = [self._xy(e) if isinstance(e, RaceTensor) else self._xy(*e) for e in eval_set]
+            fit_kwargs = {
+                'eval_set':   [(Me, ye) for Me, ye, _ in evals],
+                'eval_group': [ge for _, _, ge in evals],
+                'eval_at':    (1, 2, 3),
+                **fit_kwargs,
+            }
+        self.estimator_ = self._make_estimator().fit(M, y, group=group, **fit_kwargs)
+        return self
+
+    def decision_function(self, X) -> np.ndarray:
+        M, n_races = _per_player(X, self.per_race)
+        return np.asarray(self.estimator_.predict(M), dtype=np.float64).reshape(n_races, self.per_race)
+
+    def predict_proba(self, X) -> np.ndarray:
+        s = self.decision_function(X)
+        s = np.exp(s - s.max(axis=1, keepdims=True))
+        return s / s.sum(axis=1, keepdims=True)
@@ -0,0 +1,444 @@
+"""
+LightGBM 하이퍼파라미터 탐색.
+
+example.ipynb 에서는 설정 하나·베팅 종류 하나마다 노트북 전체를 다시 돌려 피처 행렬을 새로 만들고
+LightGBM 이 매번 다시 binning 합니다. 여기서는
+
+- 피처: 시간순 holdout(train / val) 을 backtest.FoldCache 로 한 번만 만들어 RaceTensor 로 저장합니다.
+- binning: 같은 binning 설정(max_bin, min_data_in_bin)의 trial 들은 lgb.Dataset 바이너리
+  (train.bin / valid.bin) 하나를 공유합니다. 처음 한 번만 만들고 이후 실행에서도 재사용합니다.
+- 모델: 7명이 가중치를 공유하는 선수 단위 모델 하나를 학습하고, 같은 점수로 단승·복승·삼복승을
+  모두 평가합니다. lambdarank 는 점수 하나를 그대로 쓰고, multiclass(1착·2착·3착·그 외)는
+  P(착순 ≤ k) 를 베팅 종류마다 점수로 씁니다.
+- 목적함수: val 의 RaceAccuracy (bets 의 평균). eval_every 라운드마다 계산해 조기 종료에 씁니다.
+- 조기 중단: ASHA. 라운드 min_rounds × eta^i 에 도달한 trial 은 그 단계에 먼저 도달한 trial 들 중
+  상위 1/eta 에 들지 못하면 그 자리에서 멈춥니다. trial 들은 프로세스 풀에서 동시에 돕니다.
+- 기록: trial 이 끝날 때마다 out/trials.jsonl 에 한 줄씩 씁니다. 다시 실행하면 끝난 trial 은 건너뛰고
+  (같은 seed 면 trial 설정이 같음) 기록된 단계 점수로 ASHA 를 이어 갑니다.
+
+    from kcycle.search import search
+
+    df = clean_race_data(load_data())
+    trials = search(df, n_trials=27, out='runs/search')
+    trials.head()        # score 내림차순. params_* 컬럼, best_iteration
+
+    python -m kcycle.search --data ./data --years 2019-2025 --trials 27 --out runs/search
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from pathlib import Path
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from kcycle.backtest import FoldCache, build_fold_features, holdout_slices, sort_races
+from kcycle.features import RaceFeaturePipeline
+from kcycle.metrics import BET_TYPES, RaceMetrics
+from kcycle.models import relevance_labels, split_cores
+from kcycle.tensor import PER_RACE, RaceTensor, TOP_K
+
+# 탐색 공간: 이름 → 고정값 또는 ('choice', [...]) / ('uniform', lo, hi) / ('loguniform', lo, hi) / ('int', lo, hi)
+DEFAULT_SPACE = {
+    'objective':         ('choice', ['lambdarank', 'multiclass']),
+    'learning_rate':     ('loguniform', 0.01, 0.2),
+    'num_leaves':        ('int', 15, 255),
+    'min_child_samples': ('int', 10, 200),
+    'feature_fraction':  ('uniform', 0.5, 1.0),
+    'bagging_fraction':  ('uniform', 0.5, 1.0),
+    'bagging_freq':      1,
+    'lambda_l2':         ('loguniform', 1e-3, 10.0),
+    'max_bin':           ('choice', [63, 255]),
+}
+
+# binning 에 쓰이는 파라미터. 값이 같은 trial 끼리 Dataset 바이너리를 공유합니다.
+DATASET_PARAMS = ('max_bin', 'min_data_in_bin')
+
+# 바이너리를 만들 때·읽을 때 공통 설정. trial 마다 min_child_samples 가 달라도 쓸 수 있게
+# min_data_in_leaf 기준의 피처 사전 제거를 끕니다.
+BINARY_PARAMS = {'feature_pre_filter': False, 'verbose': -1}
+
+# multiclass 의 클래스: 0 = 1착, 1 = 2착, 2 = 3착, 3 = 그 외
+N_CLASS = 4
+
+# trial 기록에서 완료로 보는 상태 (failed 는 다시 실행합니다)
+FINISHED = ('done', 'pruned')
+
+
+def sample_params(space: dict, rng: np.random.Generator) -> dict:
+    params = {}
+    for name, spec in space.items():
+        if not isinstance(spec, tuple):
+            params[name] = spec
+            continue
+        kind = spec[0]
+        if kind == 'choice':
+            params[name] = spec[1][int(rng.integers(len(spec[1])))]
+        elif kind == 'uniform':
+            params[name] = float(rng.uniform(spec[1], spec[2]))
+        elif kind == 'loguniform':
+            params[name] = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+        elif kind == 'int':
+            params[name] = int(rng.integers(spec[1], spec[2] + 1))
+        else:
+            raise ValueError(f"알 수 없는 탐색 공간 종류: {name}={spec!r}")
+    return params
+
+
+def sample_trials(space: dict, n_trials: int, seed: int = 0) -> list:
+    """ seed 가 같으면 앞쪽 trial 설정은 n_trials 와 관계없이 같습니다 (재개·추가 탐색용). """
+    rng = np.random.default_rng(seed)
+    return [sample_params(space, rng) for _ in range(n_trials)]
+
+
+def rung_rounds(min_rounds: int, max_rounds: int, eta: int) -> list:
+    """ ASHA 단계 라운드: min_rounds, min_rounds·eta, … (< max_rounds) """
+    out, r = [], min_rounds
+    while r < max_rounds:
+        out.append(r)
+        r *= eta
+    return out
+
+
+def _digest(obj) -> str:
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+# ───── 점수 → RaceAccuracy ───────────────────────────────────────────────
+
+def bet_scores(preds: np.ndarray, objective: str) -> dict:
+    """
+    LightGBM 예측 → {베팅 종류: (n_races, 7) 점수}.
+    lambdarank 는 모든 베팅 종류가 같은 점수, multiclass 는 P(착순 ≤ k) 입니다.
+    """
+    if objective == 'multiclass':
+        proba = np.asarray(preds).reshape(-1, PER_RACE, N_CLASS)
+        cum   = np.cumsum(proba, axis=2)
+        return {b: cum[:, :, TOP_K[b] - 1] for b in BET_TYPES}
+    score = np.asarray(preds, dtype=np.float64).reshape(-1, PER_RACE)
+    return {b: score for b in BET_TYPES}
+
+
+def race_accuracy(rank: np.ndarray, preds: np.ndarray, objective: str) -> dict:
+    """ 같은 예측으로 매긴 모든 베팅 종류(BET_TYPES)의 RaceAccuracy. 목적함수 평균은 호출하는 쪽에서 고릅니다. """
+    scores = bet_scores(preds, objective)
+    if objective != 'multiclass':
+        scores = scores[BET_TYPES[0]]   # 순위 계산 한 번만
+    res = RaceMetrics(BET_TYPES).update(rank, scores).result()
+    return {b: res[b]['race_accuracy'] for b in BET_TYPES}
+
+
+# ───── 피처·Dataset 캐시 ─────────────────────────────────────────────────
+
+def build_features(df: pd.DataFrame, cache_dir, val_size: float = 0.2, pipeline=None) -> Path:
+    """ 시간순 holdout 피처를 cache_dir/features 에 만들고(이미 있으면 재사용) 디렉터리를 돌려줍니다. """
+    df = sort_races(df)
+    train, val = holdout_slices(df, val_size)
+    cache = FoldCache(Path(cache_dir) / 'features')
+    key = build_fold_features(df, [('holdout', train, val)], cache, pipeline)[0]
+    return cache.path(key)
+
+
+def build_datasets(feature_dir: Path, ds_params: dict) -> Path:
+    """
+    feature_dir 의 train/test RaceTensor 로 binning 한 lgb.Dataset 바이너리를 만듭니다.
+    ds_params 가 같으면 이미 만든 디렉터리를 그대로 돌려줍니다.
+    """
+    import lightgbm as lgb
+
+    out = feature_dir / f"lgb-{_digest({**ds_params, **BINARY_PARAMS})}"
+    if (out / 'valid.bin').is_file():
+        return out
+
+    train = RaceTensor.load(feature_dir / 'train', mmap_mode='r')
+    val   = RaceTensor.load(feature_dir / 'test', mmap_mode='r')
+    params = {**ds_params, **BINARY_PARAMS}
+
+    def dataset(rt, reference=None):
+        return lgb.Dataset(
+            np.asarray(rt.per_player()), label=relevance_labels(rt.rank).reshape(-1),
+            group=np.full(rt.n_races, PER_RACE), feature_name=rt.feature_names('player'),
+            categorical_feature=rt.cat_feature_indices('player'), params=params,
+            reference=reference, free_raw_data=True,
+        ).construct()
+
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    tmp.mkdir(parents=True, exist_ok=True)
+    tr = dataset(train)
+    tr.save_binary(str(tmp / 'train.bin'))
+    dataset(val, reference=tr).save_binary(str(tmp / 'valid.bin'))
+    (tmp / 'params.json').write_text(json.dumps(ds_params), encoding='utf-8')
+    os.replace(tmp, out)
+    return out
+
+
+# ───── trial ────────────────────────────────────────────────────────────
+
+class Rungs:
+    """ ASHA 단계별 점수 기록. 프로세스 풀에서는 Manager 의 dict / Lock 을 씁니다. """
+
+    def __init__(self, eta: int, scores=None, lock=None):
+        self.eta    = eta
+        self.scores = scores if scores is not None else {}
+        self.lock   = lock if lock is not None else nullcontext()
+
+    def seed(self, records):
+        """ 이전 실행에서 끝난 trial 들의 단계 점수를 채워 넣습니다. """
+        for rec in records:
+            for r, s in rec.get('rungs', {}).items():
+                self.scores[int(r)] = self.scores.get(int(r), []) + [s]
+
+    def report(self, rung: int, score: float) -> bool:
+        """ 점수를 기록하고, 이 단계에서 상위 1/eta 안이면 True (계속) """
+        with self.lock:
+            seen = self.scores.get(rung, []) + [score]
+            self.scores[rung] = seen
+        if len(seen) < self.eta:
+            return True
+        cutoff = sorted(seen, reverse=True)[len(seen) // self.eta - 1]
+        return score >= cutoff
+
+
+def run_trial(trial: int, params: dict, data_dir, feature_dir, rungs: Rungs,
+              max_rounds: int, eval_every: int, patience: int, rung_list, bets, n_threads: int) -> dict:
+    """ trial 하나를 학습하고 기록(dict)을 돌려줍니다. 워커 프로세스에서도 실행됩니다. """
+    import lightgbm as lgb
+
+    t0 = time.perf_counter()
+    objective = params.get('objective', 'lambdarank')
+    ds_params = {k: params[k] for k in DATASET_PARAMS if k in params}
+    rank = np.asarray(RaceTensor.load(Path(feature_dir) / 'test', mmap_mode='r').rank)
+
+    train = lgb.Dataset(str(Path(data_dir) / 'train.bin'), params={**ds_params, **BINARY_PARAMS})
+    valid = lgb.Dataset(str(Path(data_dir) / 'valid.bin'), params={**ds_params, **BINARY_PARAMS}, reference=train)
+    lgb_params = {
+        **params, 'metric': 'None', 'verbose': -1, 'num_threads': n_threads,
+        'seed': trial, 'deterministic': True,
+    }
+    if objective == 'multiclass':
+        # 같은 바이너리의 관련도(3·2·1·0) → 클래스(0=1착 … 3=그 외)
+        train.construct().set_label(N_CLASS - 1 - train.get_label())
+        valid.construct().set_label(N_CLASS - 1 - valid.get_label())
+        lgb_params['num_class'] = N_CLASS
+
+    rung_set = set(rung_list)
+    state = {'calls': 0, 'score': np.nan, 'best': -np.inf, 'best_iter': 0, 'best_acc': {},
+             'rungs': {}, 'status': 'done'}
+
+    def feval(preds, _):
+        # 매 라운드 호출되지만 RaceAccuracy 는 eval_every 라운드와 ASHA 단계에서만 계산합니다
+        state['calls'] += 1
+        it = state['calls']
+        if it % eval_every == 0 or it in rung_set or it == max_rounds:
+            acc = race_accuracy(rank, preds, objective)
+            state['score'] = float(np.mean([acc[b] for b in bets]))
+            if state['score'] > state['best']:
+                state['best'], state['best_iter'], state['best_acc'] = state['score'], it, acc
+        return 'race_accuracy', state['score'], True
+
+    def stopper(env):
+        it = env.iteration + 1
+        if it in rung_set:
+            state['rungs'][it] = state['score']
+            if not rungs.report(it, state['score']):
+                state['status'] = 'pruned'
+                raise lgb.callback.EarlyStopException(max(state['best_iter'] - 1, 0), env.evaluation_result_list)
+        if patience and it - state['best_iter'] >= patience:
+            raise lgb.callback.EarlyStopException(max(state['best_iter'] - 1, 0), env.evaluation_result_list)
+
+    lgb.train(lgb_params, train, max_rounds, valid_sets=[valid], feval=feval, callbacks=[stopper])
+    return {
+        'trial':          trial,
+        'status':         state['status'],
+        'score':          state['best'],
+        'race_accuracy':  state['best_acc'],
+        'best_iteration': state['best_iter'],
+        'iterations':     state['calls'],
+        'rungs':          {str(k): v for k, v in state['rungs'].items()},
+        'seconds':        round(time.perf_counter() - t0, 3),
+        'params':         params,
+    }
+
+
+# ───── 탐색 ─────────────────────────────────────────────────────────────
+
+def read_log(path) -> list:
+    path = Path(path)
+    if not path.is_file():
+        return []
+    lines = path.read_text(encoding='utf-8').splitlines()
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def _append_log(path: Path, rec: dict):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(rec, ensure_ascii=False, default=float) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def trials_frame(records) -> pd.DataFrame:
+    """ trial 기록 → score 내림차순 DataFrame (params_*, 베팅 종류별 race_accuracy 컬럼) """
+    rows = []
+    for rec in records:
+        row = {k: rec.get(k) for k in ('trial', 'status', 'score', 'best_iteration', 'iterations', 'seconds')}
+        row.update(rec.get('race_accuracy') or {})
+        row.update({f'params_{k}': v for k, v in rec.get('params', {}).items()})
+        rows.append(row)
+    df = pd.DataFrame(rows)
+    return df.sort_values('score', ascending=False, na_position='last').reset_index(drop=True) if len(df) else df
+
+
+def search(
+    df: pd.DataFrame,
+    space: dict = None,
+    n_trials: int = 27,
+    min_rounds: int = 50,
+    max_rounds: int = 5000,
+    eta: int = 3,
+    eval_every: int = 10,
+    patience: int = 200,
+    val_size: float = 0.2,
+    bets=BET_TYPES,
+    pipeline: RaceFeaturePipeline = None,
+    out='./runs/search',
+    cache_dir='./data/cache/search',
+    n_jobs: int = -1,
+    seed: int = 0,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """
+    ASHA 하이퍼파라미터 탐색.
+
+    Parameters
+    ----------
+    df : clean_race_data 결과 (race_id, rank, 날짜 포함)
+    space : 탐색 공간 (기본 DEFAULT_SPACE). 'objective' 는 'lambdarank' 또는 'multiclass'.
+    n_trials : 전체 trial 수. 이미 기록된 trial 은 다시 돌리지 않습니다.
+    min_rounds, eta : ASHA 첫 단계 라운드와 감소율. 단계는 min_rounds × eta^i.
+    max_rounds : trial 당 최대 부스팅 라운드 (노트북의 n_estimators=5000).
+    eval_every : val RaceAccuracy 를 계산하는 라운드 간격.
+    patience : 이 라운드 동안 val RaceAccuracy 가 나아지지 않으면 멈춥니다 (0 이면 끄기).
+    val_size : 시간순 마지막 val_size 비율의 경주를 검증에 씁니다.
+    bets : 목적함수에 평균할 베팅 종류. 기록에는 세 종류를 모두 남깁니다.
+    out : trials.jsonl 을 쓸 디렉터리.
+    cache_dir : 피처·Dataset 바이너리 캐시.
+    n_jobs : 전체 코어 예산 (동시 trial 수 × trial 당 스레드).
+
+    Returns
+    -------
+    DataFrame (trials_frame). 지난 실행의 기록도 포함합니다.
+    """
+    space = DEFAULT_SPACE if space is None else space
+    out   = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    log   = out / 'trials.jsonl'
+    bets  = tuple(bets)
+
+    configs = sample_trials(space, n_trials, seed)
+    records = [r for r in read_log(log) if r.get('status') in FINISHED]
+    done    = {r['trial'] for r in records}
+    for r in records:
+        if r['trial'] < n_trials and _digest(r['params']) != _digest(configs[r['trial']]):
+            raise ValueError(f"{log} 의 trial {r['trial']} 설정이 현재 space/seed 와 다릅니다. 다른 out 을 쓰세요.")
+    pending = [i for i in range(n_trials) if i not in done]
+    if verbose:
+        print(f"trial {n_trials}개 중 {len(done)}개 완료, {len(pending)}개 실행")
+    if not pending:
+        return trials_frame(records)
+
+    t0 = time.perf_counter()
+    feature_dir = build_features(df, cache_dir, val_size, pipeline)
+    data_dirs = {}
+    for i in pending:
+        ds_params = {k: configs[i][k] for k in DATASET_PARAMS if k in configs[i]}
+        key = _digest(ds_params)
+        if key not in data_dirs:
+            data_dirs[key] = build_datasets(feature_dir, ds_params)
+    if verbose:
+        print(f"피처·Dataset 준비 {time.perf_counter() - t0:.1f}s (binning {len(data_dirs)}종)")
+
+    rung_list = rung_rounds(min_rounds, max_rounds, eta)
+    outer, inner = split_cores(n_jobs, len(pending))
+
+    def args(i, rungs):
+        ds_key = _digest({k: configs[i][k] for k in DATASET_PARAMS if k in configs[i]})
+        return (i, configs[i], str(data_dirs[ds_key]), str(feature_dir), rungs,
+                max_rounds, eval_every, patience, rung_list, bets, inner)
+
+    def finish(rec):
+        _append_log(log, rec)
+        records.append(rec)
+        if verbose:
+            acc = ' '.join(f"{b} {v:.4f}" for b, v in rec.get('race_accuracy', {}).items())
+            print(f"[trial {rec['trial']}] {rec['status']} score={rec.get('score', np.nan):.4f} "
+                  f"iter={rec.get('best_iteration')}/{rec.get('iterations')} {acc} ({rec.get('seconds')}s)", flush=True)
+
+    def failed(i, e):
+        rec = {'trial': i, 'status': 'failed', 'error': f"{type(e).__name__}: {e}", 'params': configs[i]}
+        _append_log(log, rec)
+        if verbose:
+            print(f"[trial {i}] 실패: {rec['error']}", flush=True)
+
+    if outer == 1:
+        rungs = Rungs(eta)
+        rungs.seed(records)
+        for i in pending:
+            try:
+                finish(run_trial(*args(i, rungs)))
+            except Exception as e:
+                failed(i, e)
+    else:
+        # LightGBM(OpenMP) 을 쓴 부모를 fork 하지 않도록 spawn
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Manager() as manager:
+            rungs = Rungs(eta, manager.dict(), manager.Lock())
+            rungs.seed(records)
+            with ProcessPoolExecutor(max_workers=outer, mp_context=ctx) as pool:
+                futures = {pool.submit(run_trial, *args(i, rungs)): i for i in pending}
+                for fut in as_completed(futures):
+                    try:
+                        finish(fut.result())
+                    except Exception as e:
+                        failed(futures[fut], e)
+
+    return trials_frame(records)
+
+
+if __name__ == "__main__":
+    from kcycle.features import clean_race_data
+    from kcycle.loader import load_data, parse_years
+
+    p = argparse.ArgumentParser(description="LightGBM 하이퍼파라미터 탐색 (ASHA, RaceAccuracy)")
+    p.add_argument("--data", default="./data", help="load_data 의 data_dir")
+    p.add_argument("--years", default=None, help="사용할 연도. 예: 2019-2025 또는 2023,2024")
+    p.add_argument("--region", default="광명", help="clean_race_data 의 경주장 (all 이면 전체)")
+    p.add_argument("--trials", type=int, default=27, help="전체 trial 수")
+    p.add_argument("--min-rounds", type=int, default=50, help="ASHA 첫 단계 라운드")
+    p.add_argument("--max-rounds", type=int, default=5000, help="trial 당 최대 라운드")
+    p.add_argument("--eta", type=int, default=3, help="ASHA 감소율")
+    p.add_argument("--eval-every", type=int, default=10, help="RaceAccuracy 계산 간격(라운드)")
+    p.add_argument("--patience", type=int, default=200, help="조기 종료 라운드 (0 이면 끄기)")
+    p.add_argument("--val-size", type=float, default=0.2, help="검증 경주 비율 (시간순 마지막)")
+    p.add_argument("--bets", nargs="+", default=list(BET_TYPES), choices=list(BET_TYPES), help="목적함수에 평균할 베팅 종류")
+    p.add_argument("--out", default="./runs/search", help="trials.jsonl 디렉터리")
+    p.add_argument("--cache-dir", default="./data/cache/search", help="피처·Dataset 캐시")
+    p.add_argument("--n-jobs", type=int, default=-1, help="전체 코어 예산")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    years = parse_years(args.years) if args.years else None
+    df = clean_race_data(load_data(years=years, data_dir=args.data),
+                         region=None if args.region == "all" else args.region)
+    trials = search(
+        df, n_trials=args.trials, min_rounds=args.min_rounds, max_rounds=args.max_rounds,
+        eta=args.eta, eval_every=args.eval_every, patience=args.patience, val_size=args.val_size,
+        bets=args.bets, out=args.out, cache_dir=args.cache_dir, n_jobs=args.n_jobs, seed=args.seed,
+    )
+    print(trials.head(10).to_string())
@@ -0,0 +1,365 @@
+"""
+경주 당일 추론 서비스.
+
+학습 때 fit 한 RaceFeaturePipeline 과 모델을 시작할 때 한 번만 읽어 두고,
+출주표(parse_one_race / parse_all_races 출력)를 받아 바로 top-1/2/3 번호를 돌려줍니다.
+노트북처럼 매번 학습 데이터로 인코더를 다시 fit 하지 않고, 피처는 RowEncoder 로
+행 단위로 만들어 경주 하나를 수 ms 안에 처리합니다.
+
+    from kcycle.serve import RacePredictor
+
+    RacePredictor(pipe, model).save('model')              # 학습 후 한 번 (번들 디렉터리, kcycle.artifacts)
+
+    predictor = RacePredictor.load('model')
+    predictor.predict(parse_one_race(2025, '16', '3', '20250418', '광명', '05'))
+
+번들은 sklearn · lightgbm 없이 읽고 점수를 내므로 프로세스 시작이 1초 안쪽입니다.
+경로가 .pkl 이면 예전처럼 pickle 로 저장·로드합니다.
+
+CLI
+    python -m kcycle.serve model --race 2025 16 3 20250418 05         # 경주 하나
+    python -m kcycle.serve model --day 2025 16 3 20250418             # 하루치 전 경주 (페이지 1회)
+    python -m kcycle.serve model --day 2025 16 3 20250418 --day 2025 16 2 20250417
+    python -m kcycle.serve model --http --port 8000
+        GET  /race?year=2025&tms=16&day=3&date=20250418&race_no=05
+        GET  /day?year=2025&tms=16&day=3&date=20250418
+        POST /predict     출주표 행(JSON 배열, COLUMNS 키)
+"""
+import sys
+import json
+import time
+import pickle
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kcycle.loader import _categorize, attach_rank, csv_dtypes, venue_code
+from kcycle.features import CAT_COLS, RowEncoder, clean_race_data
+from kcycle.metrics import top_k_index
+from kcycle.tensor import PER_RACE, TOP_K, RaceTensor
+
+# 결과를 모르는 당일 출주표에 붙이는 빈 rank 사전
+_NO_RANK = pd.Series(dtype=float)
+
+
+def card_frame(card: pd.DataFrame) -> pd.DataFrame:
+    """
+    파서 출력(모든 값이 문자열) → load_data 와 같은 형식 (race_id, 번호 문자열, category 컬럼, rank=NaN).
+
+    CSV 로 저장했다 읽은 것과 같게, 빈 칸은 결측으로 두고 모든 값이 숫자인 컬럼만 숫자로 바꿉니다.
+    """
+    df = _categorize(attach_rank(csv_dtypes(card.copy()), _NO_RANK))
+    # 선수 슬롯은 번호 순서 (RaceTensor / augment 와 같은 가정)
+    order = np.lexsort((pd.to_numeric(df['번호'], errors='coerce').to_numpy(), df['race_id'].to_numpy()))
+    return df.iloc[order].reset_index(drop=True)
+
+
+def group_races(rows, region: str = None) -> list:
+    """
+    출주표 행(dict) → [(race_id, 번호 순으로 정렬된 7행), ...] (race_id 순).
+    region 이 아닌 경주와 7명이 아닌 경주는 뺍니다.
+    """
+    races = {}
+    for r in rows:
+        if region is not None and r.get('경주지역') != region:
+            continue
+        race_id = (
+            ((int(r['연도']) * 100 + int(r['회차'])) * 10 + int(r['일차'])) * 10000
+            + venue_code(r['경주지역']) * 100 + int(r['경주번호'])
+        )
+        races.setdefault(race_id, []).append(r)
+    return [
+        (race_id, sorted(rs, key=lambda r: int(r['번호'])))
+        for race_id, rs in sorted(races.items()) if len(rs) == PER_RACE
+    ]
+
+
+class RacePredictor:
+    """
+    pipeline : fit 된 RaceFeaturePipeline
+    model    : RaceTensor 를 받아 (n_races, 7) 점수를 돌려주는 predict_proba
+               (MultiOutputRaceClassifier, RaceRanker)
+    region   : clean_race_data 의 region (학습 때와 같게)
+    scale    : 학습 때 RaceTensor.standardize_ 가 돌려준 (mean, std). 표준화하지 않았으면 None
+
+    출주표는 RowEncoder 로 행 단위로 피처를 만들고 (pandas 를 거치지 않음),
+    파이프라인 컬럼이 행 단위로 계산되지 않으면 clean_race_data → transform 으로 처리합니다.
+    """
+
+    def __init__(self, pipeline, model, region: str = '광명', scale=None):
+        self.pipeline = pipeline
+        self.model    = model
+        self.region   = region
+        self.scale    = scale
+        self._init_encoder()
+
+    def _init_encoder(self):
+        try:
+            self.encoder = RowEncoder(self.pipeline)
+        except ValueError:
+            self.encoder = None
+
+    # ───── 저장 / 로드 ─────
+    def __getstate__(self):
+        # RowEncoder 는 파이프라인에서 바로 만들 수 있으므로 저장하지 않습니다
+        return {k: v for k, v in self.__dict__.items() if k != 'encoder'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_encoder()
+
+    def save(self, path):
+        """
+        path 가 .pkl 이면 pickle, 아니면 번들 디렉터리(kcycle.artifacts)로 저장합니다.
+        번들 경로에 번들이 아닌 파일·디렉터리가 있으면 FileExistsError 를 냅니다.
+        """
+        if Path(path).suffix == '.pkl':
+            with open(path, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            from kcycle.artifacts import save_bundle
+            save_bundle(self, path)
+
+    @staticmethod
+    def load(path, backend: str = 'numpy') -> 'RacePredictor':
+        """ 번들 디렉터리 또는 pickle 을 읽습니다. backend 는 번들에만 쓰입니다 ('numpy', 'lightgbm'). """
+        if Path(path).is_dir():
+            from kcycle.artifacts import load_bundle
+            return load_bundle(path, backend)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    # ───── 추론 ─────
+    def _tensor_rows(self, rows) -> tuple:
+        races   = group_races(rows, self.region)
+        n_races = len(races)
+        flat    = [r for _, rs in races for r in rs]
+        # 해당 경주장 경주가 없는 출주표도 (0, 7, F) 가 되도록 폭을 명시합니다 (-1 은 0행에서 정할 수 없음)
+        X = self.encoder.transform(flat).reshape(n_races, PER_RACE, len(self.encoder.columns))
+
+        columns  = self.encoder.columns
+        cat_cols = [c for c in CAT_COLS if c in columns]
+        cat = X[..., [columns.index(c) for c in cat_cols]].astype(np.int32)
+        rt  = RaceTensor(X, cat, np.array([race_id for race_id, _ in races], dtype=np.int64),
+                         None, columns, cat_cols)
+        meta = {
+            '날짜':     [int(rs[0]['날짜']) for _, rs in races],
+            '경주지역': [rs[0]['경주지역'] for _, rs in races],
+            '경주번호': [f"{int(rs[0]['경주번호']):02d}" for _, rs in races],
+            '번호':     np.array([int(r['번호']) for r in flat], dtype=np.int64).reshape(n_races, PER_RACE),
+        }
+        return rt, meta
+
+    def _tensor_frame(self, card: pd.DataFrame) -> tuple:
+        df = clean_race_data(card_frame(card), self.region)
+        if len(df):
+            size = df.groupby('race_id', sort=False)['race_id'].transform('size').to_numpy()
+            df = df[size == PER_RACE].reset_index(drop=True)
+        rt   = RaceTensor.from_frame(self.pipeline.transform(df))
+        head = df.iloc[::PER_RACE]
+        meta = {
+            '날짜':     head['날짜'].astype(int).tolist(),
+            '경주지역': head['경주지역'].astype(str).tolist(),
+            '경주번호': head['경주번호'].tolist(),
+            '번호':     df['번호'].astype(int).to_numpy().reshape(rt.n_races, PER_RACE),
+        }
+        return rt, meta
+
+    def tensor(self, card) -> tuple:
+        """
+        출주표(DataFrame 또는 dict 목록) → (RaceTensor, 경주별 meta).
+        region 이 아니거나 7명이 아닌 경주는 빠지고, 경주는 race_id 순입니다.
+        """
+        if self.encoder is not None:
+            rows = card.to_dict('records') if isinstance(card, pd.DataFrame) else card
+            rt, meta = self._tensor_rows(rows)
+        else:
+            rt, meta = self._tensor_frame(card if isinstance(card, pd.DataFrame) else pd.DataFrame(card))
+        if self.scale is not None:
+            rt.standardize_(self.scale)
+        return rt, meta
+
+    def score(self, card) -> tuple:
+        """ → (RaceTensor, meta, (n_races, 7) 점수) """
+        rt, meta = self.tensor(card)
+        if rt.n_races == 0:
+            return rt, meta, np.empty((0, PER_RACE))
+        return rt, meta, np.asarray(self.model.predict_proba(rt), dtype=np.float64)
+
+    def predict(self, card, k: int = max(TOP_K.values())) -> list:
+        """
+        경주마다 {'race_id', '날짜', '경주지역', '경주번호', '단승', '복승', '삼복승', 'scores'}.
+        베팅 종류 값은 점수 높은 순의 번호 목록, scores 는 1번 ~ 7번 순서의 점수입니다.
+        """
+        rt, meta, y_score = self.score(card)
+        if rt.n_races == 0:
+            return []
+        top = np.take_along_axis(meta['번호'], top_k_index(y_score, k), axis=1)
+
+        out = []
+        for i, race_id in enumerate(rt.race_ids.tolist()):
+            rec = {'race_id': race_id, **{c: meta[c][i] for c in ('날짜', '경주지역', '경주번호')}}
+            rec.update({b: top[i, :n].tolist() for b, n in TOP_K.items() if n <= k})
+            rec['scores'] = np.round(y_score[i], 6).tolist()
+            out.append(rec)
+        return out
+
+
+# ───── 출주표 받기 ────────────────────────────────────────────────────────
+# requests · bs4 는 출주표를 받을 때만 필요하므로 여기서 import 합니다
+
+def fetch_race(year, 회차, 일차, 날짜, race_no, region='광명', fetcher: 'Fetcher' = None) -> pd.DataFrame:
+    from kcycle.kcycle_race_crawler import parse_one_race
+    return parse_one_race(int(year), str(회차), str(일차), str(날짜), region, f"{int(race_no):02d}", fetcher)
+
+
+def fetch_day(year, 회차, 일차, 날짜, fetcher: 'Fetcher' = None) -> pd.DataFrame:
+    """ 하루치 출주표 페이지를 한 번 받아 모든 경주를 파싱합니다. """
+    from kcycle.kcycle_race_crawler import parse_all_races
+    return parse_all_races(int(year), str(회차), str(일차), str(날짜), fetcher, refresh=True)
+
+
+def predict_days(predictor: RacePredictor, days, fetcher: 'Fetcher' = None, concurrency: int = 4) -> list:
+    """
+    여러 일차를 스레드로 동시에 받으면서, 페이지가 도착하는 대로 일차 단위로 한 번에 점수를 냅니다.
+    느린 페이지 하나가 뒤의 일차를 막지 않도록 완료 순서(as_completed)로 처리하고,
+    결과는 days 순서로 돌려줍니다.
+    days : [(year, 회차, 일차, 날짜), ...]
+
+    한 일차가 실패해도(아직 올라오지 않은 출주표, 재시도 후에도 5xx 등) 나머지 일차는 그대로 돌려주고,
+    실패한 일차는 그 자리에 {'day': [year, 회차, 일차, 날짜], 'error': "ValueError: ..."} 로 남깁니다.
+    """
+    from kcycle.fetcher import Fetcher
+
+    fetcher = fetcher or Fetcher()
+    picks = [[] for _ in days]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(fetch_day, *d, fetcher=fetcher): i for i, d in enumerate(days)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                card = fut.result()
+                if not card.empty:
+                    picks[i] = predictor.predict(card)
+            except Exception as e:
+                picks[i] = [{'day': list(days[i]), 'error': f"{type(e).__name__}: {e}"}]
+    return [p for day in picks for p in day]
+
+
+# ───── HTTP ─────────────────────────────────────────────────────────────
+
+def _json_default(o):
+    return o.item() if isinstance(o, np.generic) else str(o)
+
+
+def make_handler(predictor: RacePredictor, fetcher: 'Fetcher', region: str):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, code: int, body):
+            data = json.dumps(body, ensure_ascii=False, default=_json_default).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _run(self, func):
+            t0 = time.perf_counter()
+            try:
+                picks = func()
+            except (KeyError, ValueError) as e:
+                return self._send(400, {'error': str(e)})
+            except Exception as e:
+                return self._send(502, {'error': f"{type(e).__name__}: {e}"})
+            self._send(200, {'races': picks, 'elapsed_ms': round((time.perf_counter() - t0) * 1e3, 2)})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q   = {k: v[0] for k, v in parse_qs(url.query).items()}
+            day = lambda: (q['year'], q['tms'], q['day'], q['date'])
+            if url.path == '/race':
+                self._run(lambda: predictor.predict(
+                    fetch_race(*day(), q['race_no'], q.get('region', region), fetcher)
+                ))
+            elif url.path == '/day':
+                self._run(lambda: predictor.predict(fetch_day(*day(), fetcher)))
+            elif url.path == '/health':
+                self._send(200, {'status': 'ok'})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/predict':
+                return self._send(404, {'error': 'not found'})
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._run(lambda: predictor.predict(json.loads(body)))
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(predictor: RacePredictor, host: str = '127.0.0.1', port: int = 8000, fetcher: 'Fetcher' = None):
+    from kcycle.fetcher import Fetcher
+
+    fetcher = fetcher or Fetcher()
+    server = ThreadingHTTPServer((host, port), make_handler(predictor, fetcher, predictor.region))
+    print(f"🚀 http://{host}:{server.server_address[1]}  (/race, /day, /predict)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    from kcycle.fetcher import BASE_URL, Fetcher
+
+    p = argparse.ArgumentParser(description="경주 당일 top-k 추론 (RacePredictor.save 로 저장한 모델)")
+    p.add_argument("model", help="RacePredictor 번들 디렉터리 또는 pickle(.pkl) 경로")
+    p.add_argument("--backend", default="numpy", choices=["numpy", "lightgbm"],
+                   help="번들 트리 평가 방식 (numpy 는 lightgbm 을 import 하지 않음)")
+    p.add_argument("--race", nargs=5, metavar=("YEAR", "회차", "일차", "날짜", "경주번호"),
+                   help="경주 하나 예측")
+    p.add_argument("--day", nargs=4, action="append", metavar=("YEAR", "회차", "일차", "날짜"),
+                   help="하루치 전 경주 예측 (여러 번 지정하면 동시에 받음)")
+    p.add_argument("--region", default=None, help="--race 의 경주지역 (기본: 모델의 region)")
+    p.add_argument("--http", action="store_true", help="로컬 HTTP 서버로 실행")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--concurrency", type=int, default=4, help="--day 동시 페이지 수")
+    p.add_argument("--base-url", default=BASE_URL, help="출주표 호스트 (로컬 fixture 서버 테스트용)")
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    predictor = RacePredictor.load(args.model, args.backend)
+    print(f"모델 로드 {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    fetcher = Fetcher(base_url=args.base_url, pool_size=max(10, args.concurrency))
+
+    if args.http:
+        serve(predictor, args.host, args.port, fetcher)
+    else:
+        if args.race:
+            picks = predictor.predict(fetch_race(*args.race, args.region or predictor.region, fetcher))
+        elif args.day:
+            picks = predict_days(predictor, args.day, fetcher, args.concurrency)
+        else:
+            p.error("--race, --day, --http 중 하나가 필요합니다.")
+        failed = 0
+        for rec in picks:
+            if 'error' in rec:
+                failed += 1
+                print(f"⚠️ 실패: {' '.join(map(str, rec['day']))} ({rec['error']})", file=sys.stderr)
+                continue
+            print(json.dumps(rec, ensure_ascii=False, default=_json_default))
+        if failed:
+            sys.exit(1)
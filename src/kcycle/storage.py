@@ -0,0 +1,247 @@
+"""
+연도·회차로 파티션한 Parquet 데이터셋.
+
+크롤러가 일차를 파싱할 때마다 그 일차가 속한 파티션만 다시 씁니다. 전체 CSV 를 다시 쓰거나
+연도별 DataFrame 을 모아 concat 할 필요가 없습니다.
+
+    data/race_info/연도=2024/회차=16/part.parquet
+    data/race_results/연도=2024/회차=16/part.parquet
+
+- 스키마는 고정입니다. 키·정수 컬럼은 int64, 나머지는 문자열이라 일차마다 타입이 달라지지 않습니다.
+  load_data 는 읽은 뒤 loader.csv_dtypes 로 숫자 컬럼(승률·기어배수 등)을 CSV 경로와 같은 타입으로 맞춥니다.
+  연도·회차는 디렉터리 이름에만 있고, 읽을 때 hive 파티션으로 복원됩니다.
+- 파티션(회차)마다 파일 하나입니다. 일차를 쓰면 같은 회차의 기존 일차(많아야 2~3일)와 합쳐
+  임시 파일에 쓴 뒤 os.replace 로 바꿔 넣으므로, 중단돼도 반쯤 쓰인 파티션이 보이지 않고
+  같은 일차를 다시 받으면 그 일차의 행만 교체됩니다.
+  (일차마다 파일을 두면 전체 읽기에서 파일 여는 비용이 CSV 파싱보다 커집니다)
+- 파일 메타데이터에 기록한 일차 목록을 두므로 7명 경주가 없는 일차도 완료로 남고,
+  데이터셋 자체가 완료 일차 목록(Manifest)을 대신합니다.
+- 읽을 때 years 를 주면 해당 연도 디렉터리만 엽니다 (파티션 가지치기).
+- 한 데이터셋에 동시에 쓰는 프로세스는 하나여야 합니다.
+
+    from kcycle.storage import PartitionedDataset
+
+    ds = PartitionedDataset('./data/race_info', 'race_info')
+    ds.write_day('2024-16-3', df)                    # 크롤러 on_day
+    df = ds.read(columns=['race_id', ...], years=[2024, 2025])
+
+    python -m kcycle.storage --csv data/race_info.csv --out data/race_info --kind race_info
+"""
+import os
+import json
+import shutil
+import argparse
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+
+from kcycle import telemetry
+from kcycle.card_parser import COLUMNS as INFO_COLUMNS
+from kcycle.checkpoint import day_key
+
+PARTITION_COLS = ['연도', '회차']
+
+# 출주표에서 정수로 저장할 컬럼 (나머지는 문자열)
+INFO_INT_COLS = ['날짜', '연도', '회차', '일차', '경주번호', '번호', '기수', '나이', '훈련일수']
+
+RESULT_COLUMNS = [
+    '연도', '회차', '일차', '경주',
+    '1착 번호', '1착 이름', '2착 번호', '2착 이름', '3착 번호', '3착 이름',
+    '연승식', '쌍승식', '복승식', '삼복승식', '쌍복승식', '삼쌍승식',
+]
+RESULT_INT_COLS = ['연도', '회차', '일차']
+
+
+def _schema(columns, int_cols) -> pa.Schema:
+    return pa.schema([(c, pa.int64() if c in int_cols else pa.string()) for c in columns])
+
+
+# 데이터셋 종류 → 전체 스키마 (파티션 컬럼 포함)
+SCHEMAS = {
+    'race_info':    _schema(INFO_COLUMNS, INFO_INT_COLS),
+    'race_results': _schema(RESULT_COLUMNS, RESULT_INT_COLS),
+}
+
+PARTITIONING = pads.partitioning(
+    pa.schema([('연도', pa.int64()), ('회차', pa.int64())]), flavor='hive'
+)
+
+PART_FILE = 'part.parquet'
+
+# 파티션 파일 메타데이터에 기록하는 일차 목록 (JSON)
+DAYS_KEY = b'kcycle.days'
+
+
+def _column(s: pd.Series, typ: pa.DataType) -> pa.Array:
+    if pa.types.is_integer(typ):
+        # '' · '-' 같은 숫자가 아닌 값은 null
+        return pa.array(pd.to_numeric(s, errors='coerce').astype('Int64'), type=typ, from_pandas=True)
+    return pa.array(s.astype('string'), type=typ, from_pandas=True)
+
+
+def _file_days(schema: pa.Schema) -> set:
+    return set(json.loads((schema.metadata or {}).get(DAYS_KEY, b'[]')))
+
+
+class PartitionedDataset:
+    """ root/연도=YYYY/회차=NN/part.parquet 로 회차마다 파일 하나를 두는 데이터셋 """
+
+    def __init__(self, root, kind: str = 'race_info'):
+        if kind not in SCHEMAS:
+            raise ValueError(f"알 수 없는 데이터셋 종류: {kind} (가능: {list(SCHEMAS)})")
+        self.root   = Path(root)
+        self.kind   = kind
+        self.schema = SCHEMAS[kind]
+        # 파일에는 파티션 컬럼을 빼고 저장합니다
+        self.file_schema = pa.schema([f for f in self.schema if f.name not in PARTITION_COLS])
+        self._days = None
+
+    # ───── 경로·완료 일차 ─────
+    def path(self, year, 회차) -> Path:
+        # 회차를 두 자리로 맞춰 디렉터리 이름 순서가 곧 일차 순서가 되게 합니다
+        return self.root / f"연도={int(year)}" / f"회차={int(회차):02d}" / PART_FILE
+
+    def _index(self) -> dict:
+        """ (연도, 회차) → 기록된 일차 집합. 처음 한 번만 파일 메타데이터를 훑습니다. """
+        if self._days is None:
+            self._days = {}
+            for f in self.root.glob(f'연도=*/회차=*/{PART_FILE}'):
+                key = (int(f.parent.parent.name[3:]), int(f.parent.name[3:]))
+                self._days[key] = _file_days(pq.read_schema(f))
+        return self._days
+
+    def __contains__(self, key) -> bool:
+        y, c, d = (int(x) for x in key.split('-'))
+        return d in self._index().get((y, c), ())
+
+    def keys(self) -> set:
+        """ 저장된 일차 키("2024-16-3") 집합 """
+        return {day_key(y, c, d) for (y, c), days in self._index().items() for d in days}
+
+    def years(self) -> list:
+        return sorted({y for y, _ in self._index()})
+
+    # ───── 쓰기 ─────
+    def to_table(self, df: pd.DataFrame) -> pa.Table:
+        """ df → 파일 스키마 Table. 스키마에 없는 컬럼이 있으면 ValueError. """
+        unknown = [c for c in df.columns if c not in self.schema.names]
+        if unknown:
+            raise ValueError(f"{self.kind} 스키마에 없는 컬럼: {unknown}")
+        empty = pd.Series([None] * len(df), index=df.index, dtype=object)
+        return pa.Table.from_arrays(
+            [_column(df[f.name] if f.name in df.columns else empty, f.type) for f in self.file_schema],
+            schema=self.file_schema,
+        )
+
+    def _write_partition(self, year: int, 회차: int, table: pa.Table, days: set):
+        """ (year, 회차) 파티션에서 days 의 행을 table 로 바꿔 원자적으로 다시 씁니다. """
+        path = self.path(year, 회차)
+        with telemetry.timer("write_parquet"):
+            if path.is_file():
+                old = pq.ParquetFile(path)
+                keep = old.read().filter(~pc.field('일차').isin(sorted(days)))
+                days = days | _file_days(old.schema_arrow)
+                table = pa.concat_tables([keep, table])
+            # 일차 순으로, 같은 일차 안에서는 크롤링 순서 그대로 (안정 정렬)
+            table = table.take(pc.sort_indices(table, [('일차', 'ascending')]))
+            table = table.replace_schema_metadata({DAYS_KEY: json.dumps(sorted(days))})
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            pq.write_table(table, tmp, compression='zstd')
+            os.replace(tmp, path)
+        self._index()[(year, 회차)] = days
+
+    def write_day(self, key: str, df: pd.DataFrame):
+        """
+        일차 하나(key = "연도-회차-일차")를 씁니다. 이미 있는 일차면 그 일차의 행만 교체합니다.
+        df 가 비어 있어도 완료 일차로 기록합니다.
+        """
+        y, c, d = (int(x) for x in key.split('-'))
+        self._write_partition(y, c, self.to_table(df), {d})
+        telemetry.count("rows_written", len(df))
+
+    # Manifest 와 같은 이름으로도 쓸 수 있게 (crawl_year(on_day=ds.add))
+    add = write_day
+
+    def write(self, df: pd.DataFrame) -> int:
+        """ 여러 일차가 섞인 df 를 파티션별로 나눠 씁니다. 쓴 일차 수를 돌려줍니다. """
+        keys = df[['연도', '회차', '일차']].apply(pd.to_numeric, errors='coerce')
+        ok   = keys.notna().all(axis=1).to_numpy()
+        df, keys = df[ok], keys[ok].astype('int64')
+        n = 0
+        for (y, c), part in df.groupby([keys['연도'], keys['회차']], sort=False):
+            days = set(keys.loc[part.index, '일차'].tolist())
+            self._write_partition(int(y), int(c), self.to_table(part), days)
+            telemetry.count("rows_written", len(part))
+            n += len(days)
+        return n
+
+    def clear(self):
+        """ 데이터셋 전체를 지웁니다 (--full). """
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self._days = None
+
+    # ───── 읽기 ─────
+    def dataset(self) -> pads.Dataset:
+        return pads.dataset(
+            self.root, format='parquet', partitioning=PARTITIONING, schema=self.schema,
+        )
+
+    def _scan_args(self, columns=None, years=None) -> dict:
+        cols = None if columns is None else [c for c in self.schema.names if c in columns]
+        filt = pads.field('연도').isin([int(y) for y in years]) if years is not None else None
+        return {'columns': cols, 'filter': filt}
+
+    def read_table(self, columns=None, years=None) -> pa.Table:
+        if not self.root.is_dir():
+            return self.schema.empty_table().select(self._scan_args(columns)['columns'] or self.schema.names)
+        return self.dataset().to_table(**self._scan_args(columns, years))
+
+    def read(self, columns=None, years=None) -> pd.DataFrame:
+        """
+        columns 의 컬럼(스키마 순서)과 years 의 연도만 읽습니다.
+        years 필터는 연도= 디렉터리 단위로 걸러져 다른 연도의 파일은 열지 않습니다.
+        """
+        return self.read_table(columns, years).to_pandas()
+
+    def iter_batches(self, batch_size: int = 100_000, columns=None, years=None):
+        """ 일차 순서대로 batch_size 행 이하의 DataFrame 조각을 돌려줍니다. """
+        if not self.root.is_dir():
+            return
+        for batch in self.dataset().to_batches(batch_size=batch_size, **self._scan_args(columns, years)):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+def convert_csv(csv_path, root, kind: str = 'race_info', chunksize: int = 200_000) -> int:
+    """ 기존 크롤러 CSV 를 파티션 데이터셋으로 옮깁니다. 쓴 일차 수를 돌려줍니다. """
+    ds = PartitionedDataset(root, kind)
+    n, pending = 0, None
+    for chunk in pd.read_csv(csv_path, dtype=str, chunksize=chunksize, keep_default_na=False, na_values=['']):
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        # 조각 끝의 회차는 다음 조각에서 이어질 수 있으므로 남겨 둡니다
+        last = (chunk['연도'] + '-' + chunk['회차']).to_numpy()
+        cut  = len(chunk) - (last[::-1] == last[-1]).argmin() if (last != last[-1]).any() else 0
+        pending = chunk.iloc[cut:]
+        n += ds.write(chunk.iloc[:cut])
+    if pending is not None:
+        n += ds.write(pending)
+    return n
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="크롤러 CSV → 연도·회차 파티션 Parquet 데이터셋 변환")
+    p.add_argument("--csv", required=True, help="변환할 CSV (race_info.csv / race_results.csv)")
+    p.add_argument("--out", required=True, help="데이터셋 디렉터리 (예: data/race_info)")
+    p.add_argument("--kind", default="race_info", choices=list(SCHEMAS), help="데이터셋 종류")
+    args = p.parse_args()
+
+    n_days = convert_csv(args.csv, args.out, args.kind)
+    print(f"✅ {args.csv} → {args.out} ({n_days} 일차)")
@@ -0,0 +1,344 @@
+"""
+합성 출주표·경주 결과 생성기 (벤치마크용).
+
+크롤러 출력(parse_all_races → race_info.csv, parse_race_results → race_results.csv)과
+같은 컬럼·문자열 형식으로 임의의 기간을 만듭니다. 선수마다 숨은 실력(ability)을 두고
+착순과 승률·200m·최근 성적 같은 지표를 모두 그 실력에서 뽑으므로 모델이 배울 신호가 있습니다.
+
+- 규모는 실제 9년치(REAL_VOLUME)의 배수(scale)로 정합니다. 10× 는 90년, 100× 는 900년치입니다.
+- 값이 몇 가지뿐인 컬럼은 문자열 사전을 만들어 두고 번호만 뽑아 채웁니다 (행마다 포맷하지 않음).
+- 연도 단위로 만들어 CSV 에 이어 쓰므로 100× 도 한 해 분량의 메모리만 씁니다.
+
+    from kcycle.synth import write_synthetic
+
+    write_synthetic('./bench_data/x1', scale=1)       # race_info.csv, race_results.csv, synth.json
+    load_data(data_dir='./bench_data/x1')
+"""
+import json
+import math
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kcycle.card_parser import COLUMNS
+from kcycle.checkpoint import append_csv
+
+# 실제 수집 기간(2017~2025)의 대략적인 규모: 연 50회차 × 3일차, 일차당 30경주 (≈ 4만 경주, 28만 행)
+REAL_VOLUME = {
+    'years':         9,
+    'days_per_year': 150,
+    'races_per_day': {'광명': 16, '창원': 7, '부산': 7},
+}
+
+RESULT_COLUMNS = [
+    '연도', '회차', '일차', '경주',
+    '1착 번호', '1착 이름', '2착 번호', '2착 이름', '3착 번호', '3착 이름',
+    '연승식', '쌍승식', '복승식', '삼복승식', '쌍복승식', '삼쌍승식',
+]
+
+# 등급 묶음 → (경주종류, 선수 수, 등급 목록)
+CLASSES = [
+    ('선발', 240, ['B1', 'B2', 'B3']),
+    ('우수', 230, ['A1', 'A2', 'A3']),
+    ('특선',  90, ['S1', 'S2', 'S3']),
+]
+N_PLAYERS = sum(n for _, n, _ in CLASSES)
+
+# 최근 성적 칸의 경주종류 약칭 (\S{2})
+RECENT_TYPES = ['선발', '우수', '특선', '선결', '우결', '특결']
+TACTICS      = ['', '', '', '', '', '', '선', '젖', '추', '마']
+VENUE_MARK   = {'광명': '광', '창원': '창', '부산': '부'}
+TRAIN_SITES  = ['광명', '창원', '부산', '대전', '일산', '인천', '김해', '청주', '수원', '가평', '진주', '동서울']
+TRAIN_TEXTS  = [
+    '도로에서 오르막 등판훈련과 내리막 훈련을 하였으며, 보조훈련으로 웨이트 트레이닝을 하였습니다.',
+    '지난 주는 피스타에서 긴 거리 댓쉬훈련과 근력 강화를 위해 웨이트 트레이닝 훈련을 병행하였으며, 이번 주는 피스타에서 경주 적응훈련을 하였습니다.',
+    '벨로드롬에서 선행 위주의 스피드 훈련을 하였으며, 롤러로 회전력을 보완하였습니다.',
+    '도로 장거리 지구력 훈련과 피스타 단거리 인터벌 훈련을 번갈아 하였습니다.',
+    '부상 회복을 위해 가벼운 롤러 훈련과 재활 위주의 웨이트 트레이닝을 하였습니다.',
+    '피스타에서 젖히기 타이밍 훈련과 추입 연습을 집중적으로 하였습니다.',
+    '오전에는 도로 훈련, 오후에는 웨이트 트레이닝으로 근지구력 강화에 중점을 두었습니다.',
+    '경주 감각 유지를 위해 피스타에서 실전 모의 경주 훈련을 하였습니다.',
+]
+SURNAMES = list('김이박최정강조윤장임한오서신권황안송류전홍고문양손배백허유남심노하곽성차주우구민진지엄채원천방공현함변염여추도소석선설마길연위표명기반왕금옥육인맹제모탁국어은편용')
+GIVEN    = list('민준서연지우현수도윤하은예성재호영진태경상동혁훈규석철기병우범준찬')
+
+
+def _strings(values) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+# 문자열 사전 (번호로 뽑아 씀)
+GEAR_VOCAB   = _strings([f'{3.50 + i * 0.01:.2f}' for i in range(100)])
+T200_VOCAB   = _strings([f'{(1050 + i) // 100}"{(1050 + i) % 100:02d}' for i in range(251)])  # 10"50 ~ 13"00
+GRADES       = [g for _, _, gs in CLASSES for g in gs]
+GRADE_VOCAB  = _strings([f'(현재) {a}(이전) {b}' for a in GRADES for b in GRADES])
+RECENT_VOCAB = _strings(
+    [f'{t} {no}-{r}{tac}' for t in RECENT_TYPES for no in range(1, 8) for r in range(1, 8) for tac in TACTICS]
+    + ['결  장'] + [f'{t} {no}실격' for t in RECENT_TYPES for no in range(1, 8)]
+)
+N_RECENT_OK  = len(RECENT_TYPES) * 7 * 7 * len(TACTICS)
+PLACE_VOCAB  = _strings([f'{m}{mm:02d}{dd:02d}' for m in VENUE_MARK.values() for mm in range(1, 13) for dd in range(1, 29)])
+
+
+class PlayerPool:
+    """ 등급 묶음별 선수 (이름·기수·나이·훈련지·실력·등급) """
+
+    def __init__(self, rng: np.random.Generator):
+        self.cls     = np.repeat(np.arange(len(CLASSES)), [n for _, n, _ in CLASSES])
+        self.ability = rng.normal(size=N_PLAYERS) + self.cls * 1.0
+        # 이름은 겹칠 수 있으므로 기수와 함께 선수를 구분합니다
+        self.name  = _strings([
+            rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN, size=2)) for _ in range(N_PLAYERS)
+        ])
+        self.gen   = rng.integers(1, 31, size=N_PLAYERS)
+        self.age0  = np.clip(20 + self.gen + rng.integers(0, 6, size=N_PLAYERS), 21, 58)
+        self.site  = rng.integers(0, len(TRAIN_SITES), size=N_PLAYERS)
+        # 묶음 안 실력 순위로 세부 등급 (1 이 상위)
+        self.grade = np.empty(N_PLAYERS, dtype=np.int64)
+        for c in range(len(CLASSES)):
+            idx = np.flatnonzero(self.cls == c)
+            order = np.argsort(-self.ability[idx])
+            self.grade[idx[order]] = c * 3 + np.minimum(np.arange(len(idx)) * 3 // len(idx), 2)
+        # 전체 실력 백분위 (0 = 최하, 1 = 최상)
+        self.pct = np.argsort(np.argsort(self.ability)) / (N_PLAYERS - 1)
+
+
+def _day_layout(races_per_day: dict) -> tuple:
+    """ 일차 하나의 경주 배치 → (경주지역, 경주번호, 등급 묶음) 배열 """
+    regions, numbers, classes = [], [], []
+    for region, n in races_per_day.items():
+        for no in range(1, n + 1):
+            regions.append(region)
+            numbers.append(no)
+            classes.append(min((no - 1) * len(CLASSES) // n, len(CLASSES) - 1))
+    return np.array(regions, dtype=object), np.array(numbers), np.array(classes)
+
+
+def _race_types(cls: np.ndarray, numbers: np.ndarray, 일차: np.ndarray) -> np.ndarray:
+    """ 마지막 일차의 각 묶음 마지막 경주는 결승 """
+    base = np.array([c for c, _, _ in CLASSES], dtype=object)[cls]
+    last = np.r_[cls[1:] != cls[:-1], True] | np.r_[numbers[1:] <= numbers[:-1], True]
+    final = (일차 == 3) & last
+    return np.where(final, base + '결승', base)
+
+
+def synth_year(year: int, n_days: int, pool: PlayerPool, rng: np.random.Generator,
+               races_per_day: dict = None) -> tuple:
+    """
+    year 의 앞쪽 n_days 일차 분량 (race_info, race_results) DataFrame.
+    일차는 회차마다 3일(금·토·일), 회차는 주 단위입니다.
+    """
+    races_per_day = races_per_day or REAL_VOLUME['races_per_day']
+    regions, numbers, classes = _day_layout(races_per_day)
+    n_r   = len(regions)
+    k     = np.arange(n_days)
+    회차, 일차 = k // 3 + 1, k % 3 + 1
+    start = datetime.date(year, 1, 1)
+    start += datetime.timedelta(days=(4 - start.weekday()) % 7)   # 첫 금요일
+    dates = [start + datetime.timedelta(days=int(7 * (c - 1) + (d - 1))) for c, d in zip(회차, 일차)]
+    ymd   = _strings([d.strftime('%Y%m%d') for d in dates])
+
+    # 경주 단위 (일차 × 배치)
+    r_day   = np.repeat(k, n_r)
+    r_cls   = np.tile(classes, n_days)
+    r_no    = np.tile(numbers, n_days)
+    r_reg   = np.tile(regions, n_days)
+    r_type  = _race_types(r_cls, r_no, 일차[r_day])
+
+    # 일차마다 묶음 안에서 겹치지 않게 7명씩 배정
+    players = np.empty((n_days * n_r, 7), dtype=np.int64)
+    for c in range(len(CLASSES)):
+        ids  = np.flatnonzero(pool.cls == c)
+        sel  = classes == c
+        need = sel.sum() * 7
+        if need == 0:
+            continue
+        pick = ids[np.argsort(rng.random((n_days, len(ids))), axis=1)[:, :need]]
+        players[np.repeat(sel[None, :], n_days, axis=0).ravel()] = pick.reshape(-1, 7)
+
+    # 착순: 실력 + Gumbel 잡음
+    strength = pool.ability[players] + rng.gumbel(size=players.shape) * 0.9
+    order    = np.argsort(-strength, axis=1)              # 착순별 슬롯
+
+    info = _card_rows(year, 회차, 일차, ymd, r_day, r_reg, r_no, r_type, players, pool, rng)
+    results = _result_rows(year, 회차, 일차, r_day, r_reg, r_no, players, order, pool, rng)
+    return info, results
+
+
+def _card_rows(year, 회차, 일차, ymd, r_day, r_reg, r_no, r_type, players, pool, rng) -> pd.DataFrame:
+    n_races = len(r_day)
+    n   = n_races * 7
+    p   = players.ravel()
+    pct = pool.pct[p]
+    day = np.repeat(r_day, 7)
+    noise = lambda scale=1.0: rng.normal(scale=scale, size=n)
+
+    win   = np.clip(np.rint(pct * 45 + noise(8)), 0, 100).astype(int)
+    top2  = np.clip(win + np.rint(15 + noise(6)), 0, 100).astype(int)
+    top3  = np.clip(top2 + np.rint(15 + noise(6)), 0, 100).astype(int)
+    starts = rng.integers(4, 90, size=n)
+    placed = np.rint(starts * top3 / 100).astype(int)
+
+    t200 = np.clip(np.rint((12.3 - pct * 1.2 + noise(0.15) - 10.5) * 100), 0, len(T200_VOCAB) - 1).astype(int)
+    t200 = np.where(rng.random(n) < 0.02, '', T200_VOCAB[t200])
+    prev_grade = np.clip(pool.grade[p] + rng.integers(-1, 2, size=n), 0, len(GRADES) - 1)
+    local = 80 + pct * 30 + noise(3)
+    total = local + noise(2)
+    rank_all = np.clip(np.rint((1 - pct) * (N_PLAYERS - 1) + noise(15)), 0, N_PLAYERS - 1).astype(int) + 1
+
+    # 훈련동참자: 60% 는 '개인', 나머지는 같은 묶음 선수 1~3명
+    partners = np.where(
+        rng.random(n) < 0.6, '개인',
+        _strings([', '.join(pool.name[rng.integers(0, N_PLAYERS, size=m)]) for m in rng.integers(1, 4, size=n)]),
+    )
+
+    def recent(slot_rank_bias):
+        """ 최근 성적 칸: 실력이 좋을수록 앞 착순. 3% 결장, 1% 실격 """
+        r  = np.clip(np.rint(1 + (1 - pct) * 5 + noise(1.5) + slot_rank_bias), 1, 7).astype(int) - 1
+        t  = rng.integers(0, len(RECENT_TYPES), size=n)
+        no = rng.integers(0, 7, size=n)
+        tac = rng.integers(0, len(TACTICS), size=n)
+        idx = ((t * 7 + no) * 7 + r) * len(TACTICS) + tac
+        u = rng.random(n)
+        idx = np.where(u < 0.03, N_RECENT_OK, idx)
+        idx = np.where((u >= 0.03) & (u < 0.04), N_RECENT_OK + 1 + t * 7 + no, idx)
+        return RECENT_VOCAB[idx]
+
+    cols = {
+        '날짜':     ymd[day],
+        '연도':     np.full(n, year),
+        '회차':     (회차[day]).astype(str),
+        '일차':     (일차[day]).astype(str),
+        '경주지역': np.repeat(r_reg, 7),
+        '경주번호': _strings([f'{x:02d}' for x in range(100)])[np.repeat(r_no, 7)],
+        '경주종류': np.repeat(r_type, 7),
+        '경주시간': _strings([f'{11 + x // 2}:{(x % 2) * 30 + 2:02d}' for x in range(100)])[np.repeat(r_no, 7)],
+        '이름':     pool.name[p],
+        '번호':     np.tile(np.arange(1, 8), n_races).astype(str),
+        '기수':     _strings([f'{x:02d}' for x in range(100)])[pool.gen[p]],
+        '나이':     (pool.age0[p] + (year % 30)).clip(max=60).astype(str),
+        '기어배수': GEAR_VOCAB[np.clip(np.rint(40 + pct * 40 + noise(8)), 0, len(GEAR_VOCAB) - 1).astype(int)],
+        '200m':     t200,
+        '훈련지':   _strings(TRAIN_SITES)[pool.site[p]],
+        '승률':     win.astype(str),
+        '연대율':   top2.astype(str),
+        '삼연대율': top3.astype(str),
+        '입상/출전': _strings([f'{a}/{b}' for a, b in zip(placed.tolist(), starts.tolist())]),
+        '선행':     rng.poisson(1.0, size=n).astype(str),
+        '젖히기':   rng.poisson(0.8, size=n).astype(str),
+        '추입':     rng.poisson(0.8, size=n).astype(str),
+        '마크':     rng.poisson(1.2, size=n).astype(str),
+        '등급조정': GRADE_VOCAB[pool.grade[p] * len(GRADES) + prev_grade],
+        '최근3득점': _strings([f'(광명) {a:.2f}(종합) {b:.2f}' for a, b in zip(local.tolist(), total.tolist())]),
+        '최근3순위': _strings([f'{r}/{N_PLAYERS}' for r in rank_all.tolist()]),
+        '훈련일수': rng.integers(1, 8, size=n).astype(str),
+        '훈련동참자': partners,
+        '훈련내용': _strings(TRAIN_TEXTS)[rng.integers(0, len(TRAIN_TEXTS), size=n)],
+    }
+    for j, prefix in enumerate(['최근3', '최근2', '최근1']):
+        place = PLACE_VOCAB[rng.integers(0, len(PLACE_VOCAB), size=n)]
+        missing = rng.random(n) < 0.05 * (3 - j)
+        cols[f'{prefix}_장소일자'] = np.where(missing, '', place)
+        for d in (1, 2, 3):
+            cols[f'{prefix}_{d}일'] = np.where(missing, '', recent(0))
+    # 금회: 이번 회차의 앞선 일차만 채워짐
+    today = np.repeat(일차[r_day], 7)
+    for d in (1, 2, 3):
+        cols[f'금회_{d}일'] = np.where(today > d, recent(0), '')
+    return pd.DataFrame(cols, columns=COLUMNS)
+
+
+def _odds(rng, n, base) -> np.ndarray:
+    return np.round(np.exp(rng.normal(np.log(base), 0.8, size=n)) + 1.0, 1)
+
+
+def _result_rows(year, 회차, 일차, r_day, r_reg, r_no, players, order, pool, rng) -> pd.DataFrame:
+    n = len(r_day)
+    top = order[:, :3] + 1                                 # 1~3착 번호
+    name = pool.name[np.take_along_axis(players, order[:, :3], axis=1)]
+    t = top.tolist()
+
+    def combo(k, sep='-'):
+        return [sep.join(str(x) for x in row[:k]) for row in t]
+
+    o = {b: _odds(rng, n, base).tolist() for b, base in
+         [('연승', 2), ('쌍승', 15), ('복승', 8), ('삼복승', 25), ('쌍복승', 40), ('삼쌍승', 120)]}
+    place = _odds(rng, n * 3, 2).reshape(n, 3).tolist()
+    c2, c3 = combo(2), combo(3)
+    return pd.DataFrame({
+        '연도':     np.full(n, year),
+        '회차':     _strings([f'{x:02d}' for x in range(100)])[회차[r_day]],
+        '일차':     일차[r_day],
+        '경주':     _strings([f'{r}{x:02d}' for r, x in zip(r_reg.tolist(), r_no.tolist())]),
+        '1착 번호': top[:, 0], '1착 이름': name[:, 0],
+        '2착 번호': top[:, 1], '2착 이름': name[:, 1],
+        '3착 번호': top[:, 2], '3착 이름': name[:, 2],
+        '연승식':   ['|'.join(f'{x}|{y}' for x, y in zip(row, pl)) for row, pl in zip(t, place)],
+        '쌍승식':   [f'{c}|{x}' for c, x in zip(c2, o['쌍승'])],
+        '복승식':   [f'{c}|{x}' for c, x in zip(c2, o['복승'])],
+        '삼복승식': [f'{c}|{x}' for c, x in zip(c3, o['삼복승'])],
+        '쌍복승식': [f'{c}|{x}' for c, x in zip(c3, o['쌍복승'])],
+        '삼쌍승식': [f'{c}|{x}' for c, x in zip(c3, o['삼쌍승'])],
+    }, columns=RESULT_COLUMNS)
+
+
+def synth_volume(scale: float = 1.0, volume: dict = None) -> dict:
+    """ scale 배 규모의 (연도 수, 일차 수, 경주 수, 행 수) """
+    v = volume or REAL_VOLUME
+    days  = max(1, int(round(scale * v['years'] * v['days_per_year'])))
+    races = days * sum(v['races_per_day'].values())
+    return {
+        'scale': scale, 'years': math.ceil(days / v['days_per_year']),
+        'days': days, 'races': races, 'rows': races * 7,
+    }
+
+
+def synth_meta(scale: float = 1.0, seed: int = 0, start_year: int = 2017, volume: dict = None) -> dict:
+    """ write_synthetic 이 out/synth.json 에 남기는 설정 """
+    return {**synth_volume(scale, volume), 'seed': seed, 'start_year': start_year, 'volume': volume or REAL_VOLUME}
+
+
+def is_synthetic(out, meta: dict) -> bool:
+    """ out 에 meta 설정으로 만든 합성 데이터가 있는지 """
+    path = Path(out) / 'synth.json'
+    return path.is_file() and json.loads(path.read_text(encoding='utf-8')) == meta
+
+
+def iter_synthetic(scale: float = 1.0, seed: int = 0, start_year: int = 2017, volume: dict = None):
+    """ 연도마다 (year, race_info, race_results) 를 차례로 돌려줍니다. """
+    v    = volume or REAL_VOLUME
+    rng  = np.random.default_rng(seed)
+    pool = PlayerPool(rng)
+    left = synth_volume(scale, v)['days']
+    year = start_year
+    while left > 0:
+        n_days = min(left, v['days_per_year'])
+        info, results = synth_year(year, n_days, pool, rng, v['races_per_day'])
+        yield year, info, results
+        left -= n_days
+        year += 1
+
+
+def write_synthetic(out, scale: float = 1.0, seed: int = 0, start_year: int = 2017, volume: dict = None,
+                    force: bool = False) -> dict:
+    """
+    out/race_info.csv, out/race_results.csv 를 연도 단위로 이어 써서 만듭니다.
+    같은 설정으로 이미 만든 디렉터리(out/synth.json)는 그대로 둡니다.
+    """
+    out  = Path(out)
+    meta = synth_meta(scale, seed, start_year, volume)
+    meta_path = out / 'synth.json'
+    if not force and is_synthetic(out, meta):
+        return meta
+
+    out.mkdir(parents=True, exist_ok=True)
+    meta_path.unlink(missing_ok=True)
+    for name in ('race_info.csv', 'race_results.csv'):
+        (out / name).unlink(missing_ok=True)
+    for _, info, results in iter_synthetic(scale, seed, start_year, volume):
+        append_csv(info, out / 'race_info.csv')
+        append_csv(results, out / 'race_results.csv')
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding='utf-8')
+    return meta
@@ -0,0 +1,297 @@
+"""
+크롤러 계측.
+
+크롤링이 느릴 때 네트워크·html 파싱·concat/CSV 쓰기 중 어디가 원인인지 보려고,
+fetcher / card_parser / 두 크롤러의 주요 구간에 훅을 걸어 둡니다.
+훅은 install() 로 Telemetry 를 설치했을 때만 기록하고, 아니면 아무 일도 하지 않습니다.
+
+- timer(name)      : 구간 소요 시간 히스토그램 (로그 버킷, 스레드 안전)
+- count(name, n)   : 누적 카운터 (bytes, 요청 수, 캐시 적중, 행 수 …)
+- failure(stage, e): 구간·예외 타입별 실패 횟수와 최근 메시지
+- profiled(fn)     : 프로파일링 중이면 스레드마다 cProfile 로 감싸 실행 (워커 스레드 포함)
+
+    from kcycle import telemetry
+
+    with telemetry.session('runs/crawl.json', profile='runs/crawl.prof') as tel:
+        crawl_year(2024, concurrency=8, fetcher=fetcher)
+    # runs/crawl.json : 구간별 count / p50 / p90 / p99 / max, 카운터, 실패 집계
+    # runs/crawl.prof : python -m pstats runs/crawl.prof
+
+    python -m kcycle.telemetry runs/old.json runs/new.json   # 두 실행의 구간별 비교
+"""
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import argparse
+import datetime
+import threading
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+
+# 히스토그램 버킷 상한 (ms): 0.01ms ~ 약 84초, 2배 간격
+BUCKETS_MS = [0.01 * 2 ** i for i in range(24)]
+
+# 실패마다 남길 최근 메시지 수
+MAX_MESSAGES = 5
+
+
+class Histogram:
+    """ 로그 버킷 지연 히스토그램. 메모리는 버킷 수에 고정됩니다. """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.n      = 0
+        self.total  = 0.0
+        self.max    = 0.0
+
+    def add(self, ms: float):
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.n     += 1
+        self.total += ms
+        self.max    = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """ q 분위수 (ms). 해당 버킷 안에서는 선형 보간합니다. """
+        if not self.n:
+            return 0.0
+        target, seen = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= target:
+                lo = BUCKETS_MS[i - 1] if i else 0.0
+                hi = min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+                return lo + (hi - lo) * (target - seen) / c
+            seen += c
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count":    self.n,
+            "total_s":  round(self.total / 1e3, 4),
+            "mean_ms":  round(self.total / self.n, 3) if self.n else 0.0,
+            "p50_ms":   round(self.quantile(0.50), 3),
+            "p90_ms":   round(self.quantile(0.90), 3),
+            "p99_ms":   round(self.quantile(0.99), 3),
+            "max_ms":   round(self.max, 3),
+            "buckets":  {f"le_{b:g}": c for b, c in zip(BUCKETS_MS + [float("inf")], self.counts) if c},
+        }
+
+
+class Telemetry:
+    """
+    한 번의 실행(run) 동안의 지연 히스토그램·카운터·실패 집계.
+    모든 기록은 lock 하나로 보호되어 크롤러 스레드 풀에서 함께 써도 됩니다.
+    """
+
+    def __init__(self, profile: bool = False):
+        self.lock     = threading.Lock()
+        self.timers   = {}
+        self.counters = {}
+        self.failures = {}
+        self.started  = time.time()
+        self.t0       = time.perf_counter()
+        self.profile  = profile
+        self._profiles = []
+        self._local    = threading.local()
+
+    # ───── 기록 ─────
+    def observe(self, name: str, ms: float):
+        with self.lock:
+            h = self.timers.get(name)
+            if h is None:
+                h = self.timers[name] = Histogram()
+            h.add(ms)
+
+    @contextmanager
+    def timer(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - t) * 1e3)
+
+    def count(self, name: str, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def failure(self, stage: str, exc, where: str = None):
+        key = f"{stage}:{exc if isinstance(exc, str) else type(exc).__name__}"
+        with self.lock:
+            f = self.failures.setdefault(key, {"count": 0, "recent": []})
+            f["count"] += 1
+            f["recent"] = (f["recent"] + [f"{where or ''} {exc}".strip()])[-MAX_MESSAGES:]
+
+    # ───── 프로파일 ─────
+    def _thread_profile(self) -> cProfile.Profile:
+        prof = getattr(self._local, "profile", None)
+        if prof is None:
+            prof = self._local.profile = cProfile.Profile()
+            with self.lock:
+                self._profiles.append(prof)
+        return prof
+
+    def profiled(self, fn):
+        if not self.profile:
+            return fn
+
+        def run(*args, **kwargs):
+            prof = self._thread_profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # 3.12+ 는 프로파일러가 하나만 켜지며, 켜진 프로파일러가 모든 스레드를 봅니다
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+        return run
+
+    def dump_profile(self, path):
+        """ 스레드별 프로파일을 합쳐 pstats 파일로 저장합니다. """
+        profiles = [p for p in self._profiles if p.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for p in profiles[1:]:
+            stats.add(p)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(path))
+        return stats
+
+    # ───── 보고서 ─────
+    def report(self, meta: dict = None) -> dict:
+        with self.lock:
+            return {
+                "started":   datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "elapsed_s": round(time.perf_counter() - self.t0, 3),
+                "argv":      sys.argv,
+                "meta":      meta or {},
+                "timers":    {k: h.summary() for k, h in sorted(self.timers.items())},
+                "counters":  dict(sorted(self.counters.items())),
+                "failures":  dict(sorted(self.failures.items())),
+            }
+
+    def write(self, path, meta: dict = None) -> dict:
+        rep  = self.report(meta)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+        return rep
+
+
+# ───── 모듈 훅 (설치된 Telemetry 가 없으면 no-op) ─────────────────────────
+
+_current = None
+
+
+def install(tel: Telemetry = None) -> Telemetry:
+    global _current
+    _current = tel if tel is not None else Telemetry()
+    return _current
+
+
+def uninstall():
+    global _current
+    _current = None
+
+
+def current():
+    return _current
+
+
+def timer(name: str):
+    return _current.timer(name) if _current is not None else nullcontext()
+
+
+def observe(name: str, ms: float):
+    if _current is not None:
+        _current.observe(name, ms)
+
+
+def count(name: str, n=1):
+    if _current is not None:
+        _current.count(name, n)
+
+
+def failure(stage: str, exc, where: str = None):
+    if _current is not None:
+        _current.failure(stage, exc, where)
+
+
+def profiled(fn):
+    return _current.profiled(fn) if _current is not None else fn
+
+
+@contextmanager
+def session(report=None, profile=None, meta: dict = None):
+    """
+    Telemetry 를 설치하고, 끝나면 report(JSON) 와 profile(pstats) 을 저장합니다.
+    둘 다 None 이면 아무것도 설치하지 않습니다 (훅은 no-op).
+    """
+    if report is None and profile is None:
+        yield None
+        return
+    tel = install(Telemetry(profile=profile is not None))
+    main_prof = tel._thread_profile() if tel.profile else None
+    if main_prof is not None:
+        main_prof.enable()
+    try:
+        yield tel
+    finally:
+        if main_prof is not None:
+            main_prof.disable()
+        uninstall()
+        if report is not None:
+            tel.write(report, meta)
+        if profile is not None:
+            tel.dump_profile(profile)
+
+
+def add_cli_args(p: argparse.ArgumentParser):
+    """ 크롤러 CLI 공통 옵션 --metrics / --profile """
+    p.add_argument(
+        "--metrics", default=None,
+        help="구간별 지연·바이트·실패 집계를 저장할 JSON 경로"
+    )
+    p.add_argument(
+        "--profile", default=None,
+        help="cProfile 결과(pstats)를 저장할 경로 (워커 스레드 포함)"
+    )
+
+
+def compare(old: dict, new: dict) -> list:
+    """ 두 보고서의 구간별 (이름, old p50, new p50, old p90, new p90, total 비율) """
+    rows = []
+    for name in sorted(set(old["timers"]) | set(new["timers"])):
+        a = old["timers"].get(name, {})
+        b = new["timers"].get(name, {})
+        ratio = b.get("total_s", 0) / a["total_s"] if a.get("total_s") else None
+        rows.append((name, a.get("p50_ms"), b.get("p50_ms"), a.get("p90_ms"), b.get("p90_ms"), ratio))
+    return rows
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="두 크롤링 계측 보고서 비교")
+    p.add_argument("old")
+    p.add_argument("new")
+    args = p.parse_args()
+
+    old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    print(f"{'구간':<20}{'p50(old)':>10}{'p50(new)':>10}{'p90(old)':>10}{'p90(new)':>10}{'total':>8}")
+    for name, a50, b50, a90, b90, ratio in compare(old, new):
+        fmt = lambda v: f"{v:>10.2f}" if v is not None else f"{'-':>10}"
+        print(f"{name:<20}{fmt(a50)}{fmt(b50)}{fmt(a90)}{fmt(b90)}{(f'{ratio:.2f}x' if ratio else '-'):>8}")
+    print(f"elapsed: {old['elapsed_s']}s → {new['elapsed_s']}s")
+    for key in sorted(set(old["failures"]) | set(new["failures"])):
+        print(f"failure {key}: {old['failures'].get(key, {}).get('count', 0)} → {new['failures'].get(key, {}).get('count', 0)}")
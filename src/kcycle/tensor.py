@@ -0,0 +1,225 @@
+"""
+경주 단위(7명) 학습 데이터를 담는 NumPy 버퍼.
+
+example.ipynb 의 reshape_by_race 는 DataFrame 을 np.asarray 로 바꾸면서 범주/객체 컬럼 때문에
+object 배열이 되고, X → X_race → 스케일링 → X_df 로 학습 행렬이 여러 번 복사됩니다.
+RaceTensor 는 피처를 한 번만 float32 (n_races, 7, n_features) 버퍼에 채우고,
+선수 단위 / 경주 단위 레이아웃은 같은 버퍼의 view 로 돌려줍니다.
+
+    from kcycle.tensor import RaceTensor
+
+    X  = pipe.transform(train_df)                 # race_id 인덱스 + rank
+    rt = RaceTensor.from_frame(X)
+    rt.per_player()            # (n_races*7, F)  선수 단위 모델 입력 (view)
+    rt.per_race()              # (n_races, 7*F)  경주 단위 모델 입력 (view)
+    rt.targets('삼복승')        # (n_races, 7)    0/1 타깃
+    rt.cat_feature_indices()   # 경주 단위 레이아웃의 범주형 피처 위치
+
+    rt.save('cache/fold0/train')                               # 배열별 .npy
+    RaceTensor.load('cache/fold0/train', mmap_mode='r')        # 복사 없이 memmap
+"""
+import os
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kcycle.features import CAT_COLS, KEY_COL, LABEL_COL
+
+PER_RACE = 7
+
+# 베팅 종류 → 입상으로 보는 등수
+TOP_K = {'단승': 1, '복승': 2, '삼복승': 3}
+
+
+def top_k_of(bet_type: str) -> int:
+    if bet_type not in TOP_K:
+        raise ValueError(f"알 수 없는 bet_type: {bet_type!r}. ('단승','복승','삼복승' 중 하나)")
+    return TOP_K[bet_type]
+
+
+def check_races(race_id, per_race: int = PER_RACE) -> np.ndarray:
+    """
+    race_id 가 경주마다 per_race 행씩 연속으로 놓여 있는지 확인하고 (n_races,) 경주 키를 돌려줍니다.
+    """
+    race_id = np.asarray(race_id)
+    if race_id.size % per_race != 0:
+        raise ValueError(f"행 수({race_id.size})가 per_race({per_race})의 배수가 아닙니다.")
+    blocks = race_id.reshape(-1, per_race)
+    bad = np.flatnonzero((blocks != blocks[:, :1]).any(axis=1))
+    if len(bad):
+        raise ValueError(f"경주 {blocks[bad[0], 0]} 의 행이 {per_race}개 연속으로 놓여 있지 않습니다.")
+    keys = blocks[:, 0]
+    if pd.Index(keys).has_duplicates:
+        raise ValueError("같은 race_id 가 떨어진 위치에 두 번 이상 나옵니다.")
+    return keys
+
+
+class RaceTensor:
+    """
+    X        : float32 (n_races, per_race, n_features)  모든 피처 (범주 코드 포함)
+    cat      : int32   (n_races, per_race, n_cat)       범주형 피처의 정수 코드
+    race_ids : int64   (n_races,)
+    rank     : float32 (n_races, per_race) 또는 None     (입상 못 하면 NaN)
+    columns / cat_cols : 피처 이름
+
+    X 는 C-contiguous 이므로 per_player / per_race 는 복사 없이 view 를 돌려줍니다.
+    """
+
+    def __init__(self, X, cat, race_ids, rank=None, columns=(), cat_cols=()):
+        self.X        = X
+        self.cat      = cat
+        self.race_ids = race_ids
+        self.rank     = rank
+        self.columns  = list(columns)
+        self.cat_cols = list(cat_cols)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, cat_cols=None, per_race: int = PER_RACE):
+        """
+        RaceFeaturePipeline.transform 결과(race_id 인덱스 또는 컬럼, rank 선택)로 만듭니다.
+        피처 값은 컬럼별로 한 번씩만 float32 버퍼에 복사됩니다.
+        """
+        if KEY_COL in df.columns:
+            race_id = df[KEY_COL].to_numpy()
+        elif df.index.name == KEY_COL:
+            race_id = df.index.to_numpy()
+        else:
+            raise ValueError(f"'{KEY_COL}' 인덱스나 컬럼이 필요합니다.")
+        race_ids = check_races(race_id, per_race)
+        n_races  = len(race_ids)
+
+        columns  = [c for c in df.columns if c not in (KEY_COL, LABEL_COL)]
+        cat_cols = [c for c in (CAT_COLS if cat_cols is None else cat_cols) if c in columns]
+
+        X = np.empty((len(df), len(columns)), dtype=np.float32)
+        for j, col in enumerate(columns):
+            X[:, j] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+        cat = np.empty((len(df), len(cat_cols)), dtype=np.int32)
+        for j, col in enumerate(cat_cols):
+            cat[:, j] = df[col].to_numpy()
+
+        rank = None
+        if LABEL_COL in df.columns:
+            rank = df[LABEL_COL].to_numpy(dtype=np.float32, na_value=np.nan).reshape(n_races, per_race)
+
+        return cls(
+            X.reshape(n_races, per_race, len(columns)),
+            cat.reshape(n_races, per_race, len(cat_cols)),
+            race_ids, rank, columns, cat_cols,
+        )
+
+    # ───── 모양 ─────
+    @property
+    def n_races(self) -> int:
+        return self.X.shape[0]
+
+    @property
+    def per_race_size(self) -> int:
+        return self.X.shape[1]
+
+    @property
+    def n_features(self) -> int:
+        return self.X.shape[2]
+
+    def __len__(self) -> int:
+        return self.n_races
+
+    def __repr__(self) -> str:
+        return f"RaceTensor(n_races={self.n_races}, per_race={self.per_race_size}, n_features={self.n_features})"
+
+    # ───── 레이아웃 (view) ─────
+    def per_player(self) -> np.ndarray:
+        """ (n_races*per_race, n_features) """
+        return self.X.reshape(-1, self.n_features)
+
+    def per_race(self) -> np.ndarray:
+        """ (n_races, per_race*n_features). 선수 p 의 피처 f 는 p*n_features + f 위치 """
+        return self.X.reshape(self.n_races, -1)
+
+    def cat_feature_indices(self, layout: str = 'race') -> list:
+        """ per_race() (layout='race') 또는 per_player() (layout='player') 에서 범주형 피처의 열 위치 """
+        idx = [self.columns.index(c) for c in self.cat_cols]
+        if layout == 'player':
+            return sorted(idx)
+        return sorted(p * self.n_features + i for p in range(self.per_race_size) for i in idx)
+
+    def feature_names(self, layout: str = 'race') -> list:
+        if layout == 'player':
+            return list(self.columns)
+        return [f"{c}_p{p}" for p in range(self.per_race_size) for c in self.columns]
+
+    # ───── 타깃 ─────
+    def targets(self, bet_type: str = '복승') -> np.ndarray:
+        """ (n_races, per_race) int8. 단승 rank==1, 복승 rank<=2, 삼복승 rank<=3 """
+        if self.rank is None:
+            raise ValueError("rank 가 없는 RaceTensor 입니다.")
+        return (self.rank <= top_k_of(bet_type)).astype(np.int8)
+
+    # ───── 부분 선택 ─────
+    def take(self, races) -> 'RaceTensor':
+        """
+        경주 선택. slice 면 같은 버퍼의 view, 정수/불리언 배열이면 복사본을 돌려줍니다.
+        """
+        return RaceTensor(
+            self.X[races], self.cat[races], self.race_ids[races],
+            None if self.rank is None else self.rank[races],
+            self.columns, self.cat_cols,
+        )
+
+    # ───── 표준화 ─────
+    def scale_stats(self, layout: str = 'race') -> tuple:
+        """
+        StandardScaler 와 같은 (mean, std). layout='race' 면 (per_race, F) — 경주 단위
+        레이아웃의 열마다, 'player' 면 (F,) — 선수 단위 레이아웃의 열마다 구합니다.
+        """
+        axis = 0 if layout == 'race' else (0, 1)
+        mean = self.X.mean(axis=axis, dtype=np.float64)
+        std  = self.X.std(axis=axis, dtype=np.float64)
+        std[std == 0] = 1.0
+        return mean.astype(np.float32), std.astype(np.float32)
+
+    def standardize_(self, stats: tuple = None, layout: str = 'race') -> tuple:
+        """
+        X 를 제자리에서 표준화하고 사용한 (mean, std) 를 돌려줍니다.
+        검증/테스트에는 학습 데이터의 stats 를 넘깁니다. (cat 블록은 그대로)
+        """
+        mean, std = stats if stats is not None else self.scale_stats(layout)
+        self.X -= mean
+        self.X /= std
+        return mean, std
+
+    # ───── 저장 / 로드 ─────
+    _ARRAYS = ('X', 'cat', 'race_ids', 'rank')
+
+    def save(self, path):
+        """
+        path 디렉터리에 배열마다 .npy 하나와 meta.json 을 씁니다.
+        임시 디렉터리에 쓴 뒤 이름을 바꾸므로 중간에 끊겨도 반쯤 쓴 디렉터리가 남지 않습니다.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        for name in self._ARRAYS:
+            arr = getattr(self, name)
+            if arr is not None:
+                np.save(tmp / f'{name}.npy', np.ascontiguousarray(arr))
+        meta = {'columns': self.columns, 'cat_cols': self.cat_cols}
+        (tmp / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None) -> 'RaceTensor':
+        """ save 한 디렉터리를 읽습니다. mmap_mode='r' 이면 배열을 memmap 으로 엽니다. """
+        path = Path(path)
+        meta = json.loads((path / 'meta.json').read_text(encoding='utf-8'))
+        arrs = {
+            name: np.load(path / f'{name}.npy', mmap_mode=mmap_mode) if (path / f'{name}.npy').is_file() else None
+            for name in cls._ARRAYS
+        }
+        return cls(arrs['X'], arrs['cat'], arrs['race_ids'], arrs['rank'], meta['columns'], meta['cat_cols'])
@@ -0,0 +1,271 @@
+"""
+훈련내용 · 훈련동참자 희소 피처.
+
+clean_race_data 는 자유 텍스트인 훈련내용과 훈련동참자를 버립니다. 이 모듈은 두 컬럼을
+dense 컬럼으로 펼치지 않고 CSR 희소 행렬로 만듭니다.
+
+- 훈련내용 : HashingVectorizer (음절 2~3-gram, 단어 경계 안). 형태소 분석 없이 "댓쉬훈련과" 와
+  "댓쉬훈련을" 이 같은 n-gram 을 공유하고, 어휘 사전을 두지 않아 메모리가 n_features 로 고정됩니다.
+  같은 문장이 많으므로 고유 문장만 한 번 변환합니다.
+- 훈련동참자 : 선수 사전(fit 데이터의 이름·동참자) 위의 행별 동참자 표시(행 × 선수)와,
+  fit 데이터에서 쌓은 선수 × 선수 동반 훈련 횟수 행렬(adjacency_).
+  행마다 동참자 수, 같은 경주에 나온 동참자 수(어느 쪽이 적었든), 같은 경주에서 과거에 함께
+  훈련한 선수 수를 숫자 열로 덧붙입니다.
+
+열 순서: [훈련내용 해시 n_features] [동참자 선수 len(players_)] [EXTRA_COLS]
+
+    from kcycle.text_features import TrainingTextEncoder, cached_transform, row_index, stack_features
+
+    raw = load_data()                                    # 훈련내용·훈련동참자가 남아 있는 원본
+    enc = TrainingTextEncoder().fit(raw[train_rows])
+    T   = cached_transform(enc, raw, 'data/cache/text')  # 데이터 내용이 같으면 .npz 를 바로 읽음
+
+    df = clean_race_data(raw)
+    rt = RaceTensor.from_frame(pipe.transform(df))
+    X  = stack_features(rt, T[row_index(raw, df)])       # (n_races*7, F + T 열) CSR
+    RaceRanker().fit(X, rank=rt.rank)
+
+- 선수 키는 이름입니다 (훈련동참자에 이름만 적혀 있음). fit 에 없던 이름은 동참자 열에서 빠지고,
+  같은 경주 동참자 수는 사전과 관계없이 그 경주의 이름으로 셉니다.
+- 캐시 키는 입력 행의 키·텍스트 컬럼 내용 해시(데이터 버전)와 인코더 설정·선수 사전의 해시입니다.
+"""
+import os
+import re
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from kcycle.features import KEY_COL
+from kcycle.tensor import RaceTensor
+
+TEXT_COL    = '훈련내용'
+PARTNER_COL = '훈련동참자'
+NAME_COL    = '이름'
+SLOT_COL    = '번호'
+
+# 캐시 키(데이터 버전)에 쓰는 입력 컬럼
+SOURCE_COLS = [KEY_COL, SLOT_COL, NAME_COL, PARTNER_COL, TEXT_COL]
+
+# 동참자가 없다는 뜻의 값
+SOLO = {'개인', '단독', '없음', '-'}
+
+_SPLIT_RE = re.compile(r"[,·/\s]+")
+
+EXTRA_COLS = ['동참자수', '경주내_동참자수', '경주내_동반훈련수']
+
+
+def split_partners(value) -> list:
+    """ '노범연, 마기경' → ['노범연', '마기경'], '개인' · 결측 → [] """
+    if not isinstance(value, str):
+        return []
+    return [v for v in _SPLIT_RE.split(value.strip()) if v and v not in SOLO]
+
+
+def _partner_pairs(df: pd.DataFrame) -> pd.DataFrame:
+    """ 행마다 동참자 하나씩: (row, partner) """
+    partners = df[PARTNER_COL].to_numpy()
+    values, inverse = np.unique(partners.astype(str), return_inverse=True)
+    split = [split_partners(v) if v != 'nan' else [] for v in values]
+    counts = np.array([len(s) for s in split], dtype=np.int64)[inverse]
+    flat = np.array([p for s in split for p in s], dtype=object)
+    offsets = np.r_[0, np.cumsum([len(s) for s in split])]
+    # 행 i 의 동참자 = flat[offsets[inverse[i]] : offsets[inverse[i]+1]]
+    rows = np.repeat(np.arange(len(df)), counts)
+    start = np.repeat(offsets[inverse], counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return pd.DataFrame({'row': rows, 'partner': flat[start + within]})
+
+
+def _onehot(codes: np.ndarray, n_cols: int) -> sp.csr_matrix:
+    """ 행마다 codes 위치에 1 (code < 0 이면 빈 행) """
+    ok = codes >= 0
+    return sp.csr_matrix(
+        (np.ones(ok.sum(), dtype=np.float32), (np.flatnonzero(ok), codes[ok])),
+        shape=(len(codes), n_cols),
+    )
+
+
+class TrainingTextEncoder:
+    """
+    n_features   : 훈련내용 해시 차원
+    ngram_range  : 음절 n-gram 범위 (char_wb)
+    min_count    : fit 데이터에 이보다 적게 나온 이름은 선수 사전에서 뺍니다
+
+    fit 결과
+        players_   : 선수 이름 목록 (동참자 열 순서)
+        adjacency_ : (선수, 선수) CSR, 같이 훈련했다고 적힌 횟수 (대칭)
+    """
+
+    def __init__(self, n_features: int = 2 ** 16, ngram_range=(2, 3), min_count: int = 1):
+        self.n_features  = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.min_count   = min_count
+
+    def _vectorizer(self) -> HashingVectorizer:
+        return HashingVectorizer(
+            analyzer='char_wb', ngram_range=self.ngram_range, n_features=self.n_features,
+            alternate_sign=False, norm='l2', dtype=np.float32,
+        )
+
+    def params(self) -> dict:
+        return {'n_features': self.n_features, 'ngram_range': list(self.ngram_range), 'min_count': self.min_count}
+
+    # ───── fit ─────
+    def fit(self, df: pd.DataFrame):
+        pairs = _partner_pairs(df)
+        names = pd.concat([df[NAME_COL].astype(str), pairs['partner'].astype(str)], ignore_index=True)
+        counts = names.value_counts()
+        self.players_ = sorted(counts.index[counts >= self.min_count])
+        self._index = {p: i for i, p in enumerate(self.players_)}
+
+        # 행 선수 → 동참자 간선을 양쪽으로 쌓습니다
+        own = self._codes(df[NAME_COL].to_numpy()[pairs['row'].to_numpy()])
+        mate = self._codes(pairs['partner'].to_numpy())
+        ok = (own >= 0) & (mate >= 0) & (own != mate)
+        n = len(self.players_)
+        adj = sp.coo_matrix(
+            (np.ones(2 * ok.sum(), dtype=np.float32), (np.r_[own[ok], mate[ok]], np.r_[mate[ok], own[ok]])),
+            shape=(n, n),
+        ).tocsr()
+        adj.sum_duplicates()
+        self.adjacency_ = adj
+        return self
+
+    def _codes(self, names) -> np.ndarray:
+        index = self._index
+        return np.fromiter((index.get(str(v), -1) for v in names), dtype=np.int64, count=len(names))
+
+    def __getstate__(self):
+        # 이름 → 번호 사전은 players_ 로 다시 만듭니다
+        return {k: v for k, v in self.__dict__.items() if k != '_index'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'players_' in state:
+            self._index = {p: i for i, p in enumerate(self.players_)}
+
+    def digest(self) -> str:
+        """ 설정·선수 사전·adjacency 해시 (캐시 키) """
+        h = hashlib.sha256(json.dumps(self.params()).encode('utf-8'))
+        h.update('\n'.join(self.players_).encode('utf-8'))
+        for arr in (self.adjacency_.indptr, self.adjacency_.indices, self.adjacency_.data):
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+    # ───── transform ─────
+    def transform_text(self, df: pd.DataFrame) -> sp.csr_matrix:
+        """ 훈련내용 → (n, n_features) CSR. 고유 문장만 변환해 행으로 펼칩니다. """
+        text = df[TEXT_COL].fillna('').astype(str).to_numpy()
+        values, inverse = np.unique(text, return_inverse=True)
+        return self._vectorizer().transform(values).tocsr()[inverse]
+
+    def transform_partners(self, df: pd.DataFrame) -> sp.csr_matrix:
+        """ 훈련동참자 → (n, len(players_) + len(EXTRA_COLS)) CSR """
+        n, n_players = len(df), len(self.players_)
+        pairs = _partner_pairs(df)
+        rows  = pairs['row'].to_numpy()
+        mate  = self._codes(pairs['partner'].to_numpy())
+        ok    = mate >= 0
+        listed = sp.csr_matrix(
+            (np.ones(ok.sum(), dtype=np.float32), (rows[ok], mate[ok])), shape=(n, n_players)
+        )
+        listed.sum_duplicates()
+        listed.data[:] = 1
+
+        n_partners = np.bincount(rows, minlength=n).astype(np.float32)
+
+        # 같은 경주 동참자: (race_id, 동참자 이름) 을 (race_id, 이름) 에 붙여 같은 경주 행 쌍을 찾고 양방향으로 셉니다
+        race = df[KEY_COL].to_numpy()
+        names = pd.DataFrame({KEY_COL: race, 'partner': df[NAME_COL].astype(str).to_numpy(), 'mate_row': np.arange(n)})
+        edges = pd.DataFrame({KEY_COL: race[rows], 'partner': pairs['partner'].astype(str).to_numpy(), 'row': rows})
+        edges = edges.merge(names, on=[KEY_COL, 'partner'])
+        edges = edges[edges['row'] != edges['mate_row']]
+        both = np.unique(np.r_[edges[['row', 'mate_row']].to_numpy(), edges[['mate_row', 'row']].to_numpy()], axis=0)
+        in_race = np.bincount(both[:, 0], minlength=n).astype(np.float32)
+
+        # 같은 경주에서 과거(fit 데이터)에 함께 훈련한 선수 수: A[own] ⊙ (경주의 선수 표시)
+        own = _onehot(self._codes(df[NAME_COL].to_numpy()), n_players)
+        race_codes, races = pd.factorize(race)
+        G = _onehot(race_codes, len(races))
+        mates = G @ (G.T @ own)
+        history = np.asarray((own @ self.adjacency_).multiply(mates).astype(bool).sum(axis=1), dtype=np.float32).ravel()
+
+        extra = sp.csr_matrix(np.column_stack([n_partners, in_race, history]))
+        return sp.hstack([listed, extra], format='csr', dtype=np.float32)
+
+    def transform(self, df: pd.DataFrame) -> sp.csr_matrix:
+        """ → (len(df), n_features + len(players_) + len(EXTRA_COLS)) float32 CSR """
+        return sp.hstack([self.transform_text(df), self.transform_partners(df)], format='csr', dtype=np.float32)
+
+    def fit_transform(self, df: pd.DataFrame) -> sp.csr_matrix:
+        return self.fit(df).transform(df)
+
+    def feature_names(self) -> list:
+        return (
+            [f'훈련내용_{i}' for i in range(self.n_features)]
+            + [f'동참_{p}' for p in self.players_]
+            + EXTRA_COLS
+        )
+
+
+# ───── 캐시 ───────────────────────────────────────────────────────────────
+
+def data_version(df: pd.DataFrame) -> str:
+    """ 키·텍스트 컬럼 내용 해시 """
+    h = hashlib.sha256()
+    for col in SOURCE_COLS:
+        h.update(col.encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(df[col].astype(str), index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def cached_transform(encoder: TrainingTextEncoder, df: pd.DataFrame, cache_dir=None) -> sp.csr_matrix:
+    """
+    encoder.transform(df) 를 cache_dir/<데이터 버전>-<인코더 해시>.npz 에 저장해 두고,
+    같은 데이터·같은 인코더면 다시 변환하지 않고 읽습니다. cache_dir 가 None 이면 캐시하지 않습니다.
+    """
+    if cache_dir is None:
+        return encoder.transform(df)
+    path = Path(cache_dir) / f"{data_version(df)[:16]}-{encoder.digest()[:16]}.npz"
+    if path.is_file():
+        return sp.load_npz(path).tocsr()
+    T = encoder.transform(df)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.stem}.{os.getpid()}.tmp.npz')
+    sp.save_npz(tmp, T, compressed=False)
+    os.replace(tmp, path)
+    return T
+
+
+# ───── 학습 행렬과 합치기 ─────────────────────────────────────────────────
+
+def row_index(src: pd.DataFrame, dst: pd.DataFrame) -> np.ndarray:
+    """
+    dst 의 각 행(race_id, 번호)이 src 의 몇 번째 행인지.
+    src 로 만든 희소 행렬을 clean_race_data / RaceTensor 행 순서로 고를 때 씁니다.
+    """
+    keys = pd.MultiIndex.from_arrays([src[KEY_COL].to_numpy(), src[SLOT_COL].astype(str).to_numpy()])
+    idx = keys.get_indexer(pd.MultiIndex.from_arrays([dst[KEY_COL].to_numpy(), dst[SLOT_COL].astype(str).to_numpy()]))
+    if (idx < 0).any():
+        raise ValueError(f"src 에 없는 (race_id, 번호) 행이 {(idx < 0).sum()}개 있습니다.")
+    return idx
+
+
+def stack_features(X, T: sp.spmatrix, layout: str = 'player', per_race: int = 7) -> sp.csr_matrix:
+    """
+    숫자 피처 X (RaceTensor 또는 (n_races*per_race, F) 배열) 옆에 희소 행렬 T 를 붙인 CSR.
+    T 는 X 의 선수 행 순서여야 합니다 (row_index). layout='race' 면 경주마다 7명을 한 행으로
+    펼쳐 MultiOutputRaceClassifier 입력 (n_races, per_race*(F + T 열)) 을 만듭니다.
+    """
+    dense = X.per_player() if isinstance(X, RaceTensor) else np.asarray(X)
+    if dense.shape[0] != T.shape[0]:
+        raise ValueError(f"행 수가 다릅니다: X {dense.shape[0]}, T {T.shape[0]}")
+    M = sp.hstack([sp.csr_matrix(dense, dtype=np.float32), T], format='csr', dtype=np.float32)
+    if layout == 'race':
+        M = M.reshape((M.shape[0] // per_race, per_race * M.shape[1])).tocsr()
+    return M
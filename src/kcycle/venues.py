@@ -0,0 +1,198 @@
+"""
+경주장(경주지역)별 샤드 학습.
+
+clean_race_data 의 기본 region='광명' 대신 경주장마다 노트북을 따로 돌리면 데이터 로드·정리·피처
+생성이 경주장 수만큼 반복됩니다. 여기서는 데이터를 한 번 읽어 모든 경주장을 한 번에 정리하고
+(region=None) 경주지역으로 샤드를 나눈 뒤,
+
+- 경주장과 무관한 통계(등급별 평균, 범주 사전, 상수 컬럼)는 파이프라인 하나에 모든 샤드의
+  train 구간을 partial_fit 으로 누적해 공유합니다 (전체 train 을 한 번에 fit 한 것과 같음).
+  경주지역은 샤드 안에서 상수이므로 피처에서 뺍니다.
+- 샤드별 train/test RaceTensor 를 out/<경주장>/ 에 저장하고,
+- 경주장별 모델 학습·평가를 프로세스 풀에서 동시에 돌립니다. 워커는 피처를 memmap 으로 읽고,
+  코어 예산은 동시 경주장 수 × 모델 스레드로 나눕니다 (backtest 와 같음).
+
+결과는 경주장별 지표 표와 RacePredictor(region=경주장) 이며, 각 예측기는 out/<경주장>/model 번들로 저장됩니다.
+
+    from kcycle.venues import train_venues
+
+    df = clean_race_data(load_data(), region=None)
+    report, predictors = train_venues(df, RaceRanker(), out='./models/venues')
+    report[['train_races', 'test_races', '단승', '복승', '삼복승']]
+    predictors['창원'].predict(card)
+
+    python -m kcycle.venues --data ./data --out ./models/venues
+    python -m kcycle.serve ./models/venues/창원/model --day 2025 16 3 20250418
+"""
+import copy
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, parallel_config
+from sklearn.base import clone
+
+from kcycle.backtest import fit_predict, holdout_slices, sort_races
+from kcycle.features import UNUSED_COLS, RaceFeaturePipeline
+from kcycle.metrics import BET_TYPES, RaceMetrics
+from kcycle.models import split_cores, with_threads
+from kcycle.serve import RacePredictor
+from kcycle.tensor import RaceTensor
+
+VENUE_COL = '경주지역'
+
+
+def shard_venues(df: pd.DataFrame, venues=None) -> dict:
+    """
+    clean_race_data(region=None) 결과 → {경주장: race_id 순으로 정렬된 DataFrame}.
+    venues 를 주면 그 경주장만, 순서대로 돌려줍니다.
+    """
+    groups = df.groupby(df[VENUE_COL].astype(str), sort=True, observed=True).indices
+    names  = list(groups) if venues is None else [v for v in venues if v in groups]
+    missing = [] if venues is None else [v for v in venues if v not in groups]
+    if missing:
+        raise ValueError(f"데이터에 없는 경주장: {missing} (있는 경주장: {list(groups)})")
+    return {v: sort_races(df.iloc[groups[v]]) for v in names}
+
+
+def fit_shared_pipeline(shards: dict, splits: dict, pipeline: RaceFeaturePipeline = None) -> RaceFeaturePipeline:
+    """ 모든 샤드의 train 구간으로 파이프라인 하나를 누적 fit 합니다 (pipeline 은 복사해서 씁니다). """
+    pipe = copy.deepcopy(pipeline) if pipeline is not None else RaceFeaturePipeline(unused_cols=UNUSED_COLS + [VENUE_COL])
+    for i, (venue, shard) in enumerate(shards.items()):
+        part = shard.iloc[splits[venue][0]]
+        pipe.fit(part) if i == 0 else pipe.partial_fit(part)
+    return pipe
+
+
+def _train_venue(model, venue_dir: Path, scale: bool, bet_type: str, fit_kwargs) -> tuple:
+    # 표준화는 제자리 연산이므로 memmap(읽기 전용) 대신 메모리로 읽습니다
+    mmap = None if scale else 'r'
+    train = RaceTensor.load(venue_dir / 'train', mmap)
+    test  = RaceTensor.load(venue_dir / 'test', mmap)
+    stats = None
+    if scale:
+        stats = train.standardize_()
+        test.standardize_(stats)
+    y_score = fit_predict(model, train, test, bet_type, fit_kwargs)
+    return model, stats, np.array(test.rank), y_score, train.n_races
+
+
+def _report_row(venue, n_train, n_test, res: dict, metrics) -> dict:
+    row = {'venue': venue, 'train_races': n_train, 'test_races': n_test}
+    for b, vals in res.items():
+        for m in metrics:
+            row[b if len(metrics) == 1 else f'{b}_{m}'] = vals[m]
+    return row
+
+
+def _save_predictor(predictor: RacePredictor, venue_dir: Path) -> Path:
+    # LightGBM 모델은 번들로, 그 밖의 모델은 pickle 로 저장합니다
+    try:
+        predictor.save(venue_dir / 'model')
+        return venue_dir / 'model'
+    except ValueError:
+        predictor.save(venue_dir / 'model.pkl')
+        return venue_dir / 'model.pkl'
+
+
+def train_venues(
+    df: pd.DataFrame,
+    model,
+    venues=None,
+    test_size: float = 0.2,
+    bet_type: str = '삼복승',
+    scale: bool = False,
+    pipeline: RaceFeaturePipeline = None,
+    out='./models/venues',
+    n_jobs: int = -1,
+    fit_kwargs: dict = None,
+    metrics=('race_accuracy',),
+    verbose: bool = False,
+) -> tuple:
+    """
+    경주장별 샤드로 모델을 학습·평가합니다.
+
+    Parameters
+    ----------
+    df : clean_race_data(..., region=None) 결과
+    model : RaceRanker 또는 MultiOutputRaceClassifier. 경주장마다 clone 해서 학습합니다.
+    venues : 학습할 경주장 목록. None 이면 데이터에 있는 모든 경주장.
+    test_size : 경주장마다 시간순 마지막 경주 비율을 test 로 둡니다.
+    pipeline : 공유할 RaceFeaturePipeline (기본: 경주지역을 뺀 기본 설정). 모든 샤드의 train 으로 fit 됩니다.
+    out : 경주장별 피처(train/, test/)와 예측기(model/)를 저장할 디렉터리
+    n_jobs : 전체 코어 예산 (동시 경주장 수 × 모델 스레드)
+
+    Returns
+    -------
+    (report, predictors)
+        report : index 는 경주장, 컬럼은 train_races, test_races 와 베팅 종류별 지표.
+                 마지막 '전체' 행은 모든 경주장의 test 를 합쳐 계산한 값입니다.
+        predictors : {경주장: RacePredictor(region=경주장)}
+    """
+    out = Path(out)
+    shards = shard_venues(df, venues)
+    if not shards:
+        raise ValueError("학습할 경주장이 없습니다.")
+    splits = {v: holdout_slices(shard, test_size) for v, shard in shards.items()}
+    pipe = fit_shared_pipeline(shards, splits, pipeline)
+
+    for v, shard in shards.items():
+        train, test = splits[v]
+        RaceTensor.from_frame(pipe.transform(shard.iloc[train])).save(out / v / 'train')
+        RaceTensor.from_frame(pipe.transform(shard.iloc[test])).save(out / v / 'test')
+        if verbose:
+            print(f"[{v}] 피처 생성: train {train.stop - train.start:,}행, test {test.stop - test.start:,}행")
+    del shards
+
+    outer, inner = split_cores(n_jobs, len(splits))
+    tasks = (
+        delayed(_train_venue)(with_threads(clone(model), inner), out / v, scale, bet_type, fit_kwargs)
+        for v in splits
+    )
+    if outer == 1:
+        results = Parallel(n_jobs=1)(tasks)
+    else:
+        with parallel_config(backend='loky', inner_max_num_threads=inner):
+            results = Parallel(n_jobs=outer)(tasks)
+
+    total, rows, predictors = RaceMetrics(BET_TYPES), [], {}
+    for v, (fitted, stats, rank, y_score, n_train) in zip(splits, results):
+        total.update(rank, y_score)
+        rows.append(_report_row(v, n_train, len(rank), RaceMetrics(BET_TYPES).update(rank, y_score).result(), metrics))
+        predictors[v] = RacePredictor(pipe, fitted, region=v, scale=stats)
+        path = _save_predictor(predictors[v], out / v)
+        if verbose:
+            print(f"[{v}] 모델 저장: {path}")
+    rows.append(_report_row('전체', sum(r[4] for r in results), sum(len(r[2]) for r in results), total.result(), metrics))
+
+    report = pd.DataFrame(rows).set_index('venue')
+    report.attrs['n_parallel'], report.attrs['n_threads'] = outer, inner
+    return report, predictors
+
+
+if __name__ == "__main__":
+    from lightgbm import LGBMRanker
+    from kcycle.features import clean_race_data
+    from kcycle.loader import load_data, parse_years
+    from kcycle.models import RaceRanker
+
+    p = argparse.ArgumentParser(description="경주장별 샤드 학습·평가 (공유 파이프라인, 경주장 병렬)")
+    p.add_argument("--data", default="./data", help="load_data 의 data_dir")
+    p.add_argument("--years", default=None, help="사용할 연도. 예: 2019-2025 또는 2023,2024")
+    p.add_argument("--venues", default=None, help="경주장 목록. 예: 광명,창원,부산 (기본: 전체)")
+    p.add_argument("--estimators", type=int, default=500, help="LGBMRanker n_estimators")
+    p.add_argument("--test-size", type=float, default=0.2, help="경주장별 test 경주 비율 (시간순 마지막)")
+    p.add_argument("--out", default="./models/venues", help="경주장별 피처·모델 디렉터리")
+    p.add_argument("--n-jobs", type=int, default=-1, help="전체 코어 예산")
+    args = p.parse_args()
+
+    years = parse_years(args.years) if args.years else None
+    df = clean_race_data(load_data(years=years, data_dir=args.data), region=None)
+    report, _ = train_venues(
+        df, RaceRanker(LGBMRanker(n_estimators=args.estimators, verbose=-1)),
+        venues=args.venues.split(',') if args.venues else None,
+        test_size=args.test_size, out=args.out, n_jobs=args.n_jobs, verbose=True,
+    )
+    report.to_csv(Path(args.out) / 'report.csv')
+    print(report.to_string())
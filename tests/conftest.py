@@ -0,0 +1,22 @@
+"""
+테스트 공용 fixture.
+"""
+import pytest
+
+from kcycle.synth import write_synthetic
+
+
+@pytest.fixture(scope='session')
+def synthetic_dir(tmp_path_factory):
+    """
+    synthetic_dir(scale, seed) → race_info.csv / race_results.csv 가 있는 합성 데이터 디렉터리.
+    같은 (scale, seed) 는 세션에서 한 번만 만들어 공유하므로 테스트는 읽기만 합니다.
+    """
+    root = tmp_path_factory.mktemp('synthetic')
+
+    def make(scale: float = 0.01, seed: int = 0):
+        out = root / f"x{scale}-s{seed}"
+        write_synthetic(out, scale=scale, seed=seed)
+        return out
+
+    return make
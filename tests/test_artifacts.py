@@ -0,0 +1,55 @@
+"""
+save_bundle 은 번들 디렉터리만 바꿔 쓰고, 그 밖의 경로는 건드리지 않아야 합니다.
+"""
+import pickle
+
+import numpy as np
+import pytest
+from lightgbm import LGBMRanker
+
+from kcycle.features import RaceFeaturePipeline, clean_race_data
+from kcycle.loader import load_data
+from kcycle.models import RaceRanker
+from kcycle.serve import RacePredictor
+from kcycle.tensor import RaceTensor
+
+
+@pytest.fixture(scope='module')
+def trained(synthetic_dir):
+    df   = clean_race_data(load_data(data_dir=synthetic_dir(0.01, 7), cache=False))
+    pipe = RaceFeaturePipeline().fit(df)
+    rt   = RaceTensor.from_frame(pipe.transform(df))
+    model = RaceRanker(LGBMRanker(n_estimators=5, min_child_samples=5, verbose=-1)).fit(rt)
+    return RacePredictor(pipe, model), rt
+
+
+def test_overwrites_existing_bundle(trained, tmp_path):
+    predictor, rt = trained
+    path = tmp_path / 'model'
+    predictor.save(path)
+    predictor.save(path)
+
+    loaded = RacePredictor.load(path)
+    assert np.allclose(loaded.model.predict_proba(rt), predictor.model.predict_proba(rt))
+
+
+def test_refuses_non_bundle_directory(trained, tmp_path):
+    predictor, _ = trained
+    path = tmp_path / 'model'
+    path.mkdir()
+    (path / 'notes.txt').write_text('keep me', encoding='utf-8')
+
+    with pytest.raises(FileExistsError):
+        predictor.save(path)
+    assert (path / 'notes.txt').read_text(encoding='utf-8') == 'keep me'
+    assert [p.name for p in tmp_path.iterdir()] == ['model']
+
+
+def test_refuses_extensionless_pickle(trained, tmp_path):
+    predictor, _ = trained
+    path = tmp_path / 'model'
+    path.write_bytes(pickle.dumps(predictor))
+
+    with pytest.raises(FileExistsError):
+        predictor.save(path)
+    assert isinstance(RacePredictor.load(path), RacePredictor)
@@ -0,0 +1,37 @@
+"""
+augment 는 선수를 옮겨도 번호 피처는 슬롯 자리(슬롯 = 번호 - 1) 그대로 두어야 합니다.
+"""
+import numpy as np
+
+from kcycle.augment import augment
+from kcycle.tensor import RaceTensor
+
+
+def make_tensor(n_races: int = 40) -> RaceTensor:
+    rng = np.random.default_rng(0)
+    X   = rng.random((n_races, 7, 3)).astype(np.float32)
+    X[:, :, 1] = np.arange(7)                           # 번호 코드 = 슬롯
+    cat  = np.tile(np.arange(7, dtype=np.int32)[None, :, None], (n_races, 1, 1))
+    rank = np.tile(np.arange(1, 8, dtype=np.float32), (n_races, 1))
+    return RaceTensor(X, cat, np.arange(n_races), rank, ['기어배수', '번호', '승률'], ['번호'])
+
+
+def test_back_no_stays_on_slot():
+    rt  = make_tensor()
+    out = augment(rt, shuffle=0.5, reverse=0.5, multiplier=3, exclude_back_no=[3], seed=1)
+
+    assert out.n_races == rt.n_races * 4
+    assert (out.X[:, :, 1] == np.arange(7)).all()
+    assert (out.cat[:, :, 0] == np.arange(7)).all()
+
+
+def test_players_move_with_rank():
+    rt  = make_tensor()
+    out = augment(rt, shuffle=1.0, reverse=0.0, exclude_back_no=[3], seed=2, include_original=False)
+
+    # 옮긴 선수의 피처와 rank 는 함께 움직이고, exclude_back_no 의 3번 슬롯은 제자리입니다
+    src  = rt.X[out.race_ids]
+    perm = out.rank.astype(int) - 1
+    assert np.array_equal(np.take_along_axis(src[:, :, 0], perm, axis=1), out.X[:, :, 0])
+    assert (perm[:, 2] == 2).all()
+    assert (perm != np.arange(7)).any()
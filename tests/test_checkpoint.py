@@ -0,0 +1,35 @@
+"""
+크롤러 on_day 로 쓰는 DayWriter: CSV + 매니페스트와 파티션 데이터셋 두 출력.
+"""
+import pandas as pd
+
+from kcycle.checkpoint import Manifest, open_day_writer
+
+DAY = pd.DataFrame({
+    '연도': ['2024'] * 2, '회차': ['16'] * 2, '일차': ['3'] * 2, '경주': ['광명01', '광명02'],
+    '1착 번호': ['4', '2'], '2착 번호': ['6', '1'], '3착 번호': ['1', '7'],
+})
+
+
+def test_csv_writer_appends_and_marks_done(tmp_path):
+    out = tmp_path / 'race_results.csv'
+    writer = open_day_writer(out)
+    writer('2024-16-3', DAY)
+    writer('2024-16-2', DAY.iloc[:0])
+
+    assert writer.n_rows == 2 and writer.output == out
+    assert len(pd.read_csv(out)) == 2
+    # 경주가 없는 일차도 완료로 남고, 다시 열면 이어서 씁니다
+    assert {'2024-16-3', '2024-16-2'} <= Manifest(f"{out}.manifest.json").done
+    assert '2024-16-3' in open_day_writer(out).manifest
+
+
+def test_dataset_writer_is_its_own_manifest(tmp_path):
+    root = tmp_path / 'race_results'
+    writer = open_day_writer(tmp_path / 'unused.csv', dataset=root, kind='race_results')
+    writer('2024-16-3', DAY)
+
+    assert writer.manifest is writer.store and '2024-16-3' in writer.manifest
+    assert [p.relative_to(root).as_posix() for p in root.rglob('*.parquet')] == ['연도=2024/회차=16/part.parquet']
+    assert not (tmp_path / 'unused.csv').exists()
+    assert open_day_writer(tmp_path / 'unused.csv', full=True, dataset=root, kind='race_results').manifest.keys() == set()
@@ -0,0 +1,124 @@
+"""
+load_data 의 결과 long 변환·rank 결합이 예전 iterrows 구현과 행 단위로 같은지 확인합니다.
+"""
+import zlib
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from kcycle import loader
+
+SAMPLE = Path(__file__).resolve().parents[1] / 'data' / '20250420_광명01경주_sample.csv'
+
+
+def reference_load(data_dir: Path) -> pd.DataFrame:
+    """ 벡터화 이전 load_data (iterrows + 6컬럼 문자열 merge) """
+    info_data   = pd.read_csv(data_dir / 'race_info.csv',    low_memory=False)
+    result_data = pd.read_csv(data_dir / 'race_results.csv', low_memory=False)
+
+    records = []
+    for _, row in result_data.iterrows():
+        연도 = int(row['연도'])
+        회차 = str(row['회차']).zfill(2)
+        일차 = int(row['일차'])
+        경주 = row['경주']
+        for rank in (1, 2, 3):
+            num = row[f"{rank}착 번호"]
+            if pd.isna(num) or str(num).strip() in ('', '-'):
+                continue
+            records.append({
+                '연도': 연도, '회차': 회차, '일차': 일차, '경주': 경주,
+                '번호': str(num).strip(), 'rank': rank,
+            })
+
+    res_long = pd.DataFrame(records)
+    extracted = res_long['경주'].str.extract(r'(.+?)(\d+)$')
+    res_long['경주지역'] = extracted[0]
+    res_long['경주번호'] = extracted[1].str.zfill(2)
+
+    info_data['연도']     = info_data['연도'].astype(int)
+    info_data['회차']     = info_data['회차'].astype(int).astype(str).str.zfill(2)
+    info_data['일차']     = info_data['일차'].astype(int)
+    info_data['경주번호'] = info_data['경주번호'].astype(str).str.zfill(2)
+    info_data['번호']     = info_data['번호'].astype(str)
+
+    keys = ['연도', '회차', '일차', '경주지역', '경주번호', '번호']
+    return info_data.merge(res_long[keys + ['rank']], on=keys, how='left')
+
+
+def assert_same_as_reference(data_dir: Path):
+    new = loader.load_data(data_dir=data_dir, cache=False).drop(columns='race_id')
+    # category 변환은 캐시용이라 비교에서 뺍니다
+    for col in loader.CATEGORY_COLS:
+        new[col] = new[col].astype(object)
+    old = reference_load(data_dir)
+    for col in loader.CATEGORY_COLS:
+        old[col] = old[col].astype(object)
+    pd.testing.assert_frame_equal(new, old)
+
+
+def test_matches_reference_on_sample(tmp_path):
+    shutil.copy(SAMPLE, tmp_path / 'race_info.csv')
+    # 빈 칸·'-'·동착('1/2')·출주표에 없는 경주가 섞인 결과
+    pd.DataFrame({
+        '연도':      [2025, 2025, 2025],
+        '회차':      ['16', '16', '16'],
+        '일차':      [3, 3, 2],
+        '경주':      ['광명01', '광명02', '광명01'],
+        '1착 번호':  ['4', '1/2', '3'],
+        '2착 번호':  ['6', '-', '5'],
+        '3착 번호':  ['-', '', '1'],
+    }).to_csv(tmp_path / 'race_results.csv', index=False)
+
+    assert_same_as_reference(tmp_path)
+    df = loader.load_data(data_dir=tmp_path, cache=False)
+    assert df.set_index('번호')['rank'].dropna().to_dict() == {'4': 1.0, '6': 2.0}
+
+
+def test_matches_reference_on_synthetic(synthetic_dir):
+    data_dir = synthetic_dir(0.01, 3)
+
+    assert_same_as_reference(data_dir)
+    n_results = len(pd.read_csv(data_dir / 'race_results.csv'))
+    assert loader.load_data(data_dir=data_dir, cache=False)['rank'].notna().sum() == n_results * 3
+
+
+def test_float_result_numbers_keep_rank(tmp_path):
+    # 빈 칸만 있는 착 번호 컬럼은 float 로 읽힙니다. 예전 구현은 '6.0' ≠ '6' 이라 rank 를 잃었습니다.
+    shutil.copy(SAMPLE, tmp_path / 'race_info.csv')
+    pd.DataFrame({
+        '연도': [2025, 2025], '회차': [16, 16], '일차': [3, 2], '경주': ['광명01', '광명01'],
+        '1착 번호': [4, 3], '2착 번호': [6, None], '3착 번호': [None, 1],
+    }).to_csv(tmp_path / 'race_results.csv', index=False)
+
+    df = loader.load_data(data_dir=tmp_path, cache=False)
+    assert df.set_index('번호')['rank'].dropna().to_dict() == {'4': 1.0, '6': 2.0}
+
+
+def test_race_id_orders_by_day():
+    race_id = loader.make_race_id([2025, 2025, 2024], [16, 16, 50], [3, 3, 1], ['광명', '창원', '광명'], [5, 5, 12])
+    assert race_id.tolist() == [20251630105, 20251630205, 20245010112]
+
+
+def test_hashed_venue_code_collision_raises(monkeypatch):
+    monkeypatch.setattr(loader, '_HASHED_CODES', {})
+    seen = {}
+    for i in range(1000):
+        name = f'경주장{i}'
+        code = 10 + zlib.crc32(name.encode('utf-8')) % 90
+        if code in seen:
+            a, b = seen[code], name
+            break
+        seen[code] = name
+
+    assert loader.venue_code(a) == loader.venue_code(a)
+    with pytest.raises(ValueError, match='충돌'):
+        loader.make_race_id([2025, 2025], [1, 1], [1, 1], [a, b], [1, 1])
+
+
+def test_parse_years():
+    assert loader.parse_years('2019-2021') == [2019, 2020, 2021]
+    assert loader.parse_years('2023,2025') == [2023, 2025]
+    assert loader.parse_years('2024') == [2024]
@@ -0,0 +1,30 @@
+"""
+search 는 목적함수(bets)만 평균하고, 기록에는 세 베팅 종류의 RaceAccuracy 를 모두 남겨야 합니다.
+"""
+import numpy as np
+import pytest
+
+from kcycle.features import clean_race_data
+from kcycle.loader import load_data
+from kcycle.metrics import BET_TYPES
+from kcycle.search import search
+
+SPACE = {
+    'objective':         ('choice', ['lambdarank', 'multiclass']),
+    'learning_rate':     0.1,
+    'num_leaves':        7,
+    'min_child_samples': 5,
+}
+
+
+@pytest.mark.parametrize('bets', [('단승',), ('복승', '삼복승')])
+def test_logs_all_bets_and_scores_chosen(synthetic_dir, tmp_path, bets):
+    df = clean_race_data(load_data(data_dir=synthetic_dir(0.01, 7), cache=False))
+    trials = search(
+        df, space=SPACE, n_trials=2, min_rounds=5, max_rounds=10, eval_every=5, patience=0, bets=bets,
+        out=tmp_path / 'runs', cache_dir=tmp_path / 'cache', n_jobs=1, verbose=False,
+    )
+
+    assert set(trials['status']) <= {'done', 'pruned'} and len(trials) == 2
+    assert set(BET_TYPES) <= set(trials.columns)
+    assert np.allclose(trials['score'], trials[list(bets)].mean(axis=1))
@@ -0,0 +1,109 @@
+"""
+RacePredictor 추론 경로: 빈 출주표와 일차별 병렬 추론.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kcycle import serve
+from kcycle.features import RaceFeaturePipeline, clean_race_data
+from kcycle.loader import load_data
+from kcycle.serve import RacePredictor, predict_days
+
+
+class FirstFeatureModel:
+    """ 첫 피처를 점수로 쓰는 학습 없는 모델 """
+
+    def predict_proba(self, rt):
+        return rt.X[..., 0]
+
+
+@pytest.fixture(scope='module')
+def synthetic(synthetic_dir):
+    out = synthetic_dir(0.01, 5)
+    # 파서 출력처럼 모든 값이 문자열인 출주표
+    card = pd.read_csv(out / 'race_info.csv', dtype=str, keep_default_na=False)
+    return load_data(data_dir=out, cache=False), card
+
+
+@pytest.fixture(scope='module')
+def predictor(synthetic):
+    raw, _ = synthetic
+    return RacePredictor(RaceFeaturePipeline().fit(clean_race_data(raw)), FirstFeatureModel())
+
+
+def one_day(card: pd.DataFrame, 일차: str) -> pd.DataFrame:
+    first = card[card['일차'] == 일차]
+    return first[first['회차'] == first['회차'].iloc[0]]
+
+
+def test_predict_day(predictor, synthetic):
+    _, card = synthetic
+    day = one_day(card, '1')
+    picks = predictor.predict(day)
+
+    n_races = ((day['경주지역'] == '광명').sum()) // 7
+    assert len(picks) == n_races > 0
+    assert all(len(p['삼복승']) == 3 and len(p['scores']) == 7 for p in picks)
+
+
+@pytest.mark.parametrize('row_encoder', [True, False])
+def test_card_without_region_races(predictor, synthetic, row_encoder, monkeypatch):
+    _, card = synthetic
+    other = one_day(card, '1')
+    other = other[other['경주지역'] != predictor.region]
+    if not row_encoder:
+        monkeypatch.setattr(predictor, 'encoder', None)
+
+    assert len(other) > 0
+    assert predictor.predict(other) == []
+    if row_encoder:
+        assert predictor.predict(other.to_dict('records')) == []
+    rt, meta, y_score = predictor.score(other)
+    assert rt.n_races == 0 and y_score.shape == (0, 7)
+
+
+def test_predict_days_keeps_day_order(predictor, synthetic, monkeypatch):
+    _, card = synthetic
+    cards = {d: one_day(card, d) for d in ('1', '2', '3')}
+    delay = {'1': 0.3, '2': 0.0, '3': 0.1}
+    scored = []
+
+    def fake_fetch_day(year, 회차, 일차, 날짜, fetcher=None):
+        time.sleep(delay[일차])
+        return cards[일차]
+
+    predict = predictor.predict
+    monkeypatch.setattr(serve, 'fetch_day', fake_fetch_day)
+    monkeypatch.setattr(predictor, 'predict', lambda c: scored.append(c['일차'].iloc[0]) or predict(c))
+
+    days = [(2017, 1, d, '20170101') for d in ('1', '2', '3')]
+    picks = predict_days(predictor, days, fetcher=object(), concurrency=3)
+
+    # 늦게 도착한 1일차가 먼저 도착한 일차의 점수 계산을 막지 않습니다
+    assert scored == ['2', '3', '1']
+    expected = [p for d in ('1', '2', '3') for p in predict(cards[d])]
+    assert [p['race_id'] for p in picks] == [p['race_id'] for p in expected]
+    assert np.allclose([p['scores'] for p in picks], [p['scores'] for p in expected])
+
+
+def test_predict_days_keeps_other_days_on_failure(predictor, synthetic, monkeypatch):
+    _, card = synthetic
+    cards = {d: one_day(card, d) for d in ('1', '3')}
+
+    def fake_fetch_day(year, 회차, 일차, 날짜, fetcher=None):
+        if 일차 == '2':
+            raise ValueError("경주를 찾을 수 없습니다.")
+        return cards[일차]
+
+    monkeypatch.setattr(serve, 'fetch_day', fake_fetch_day)
+    days = [(2017, 1, d, '20170101') for d in ('1', '2', '3')]
+    picks = predict_days(predictor, days, fetcher=object(), concurrency=3)
+
+    n1, n3 = len(predictor.predict(cards['1'])), len(predictor.predict(cards['3']))
+    assert len(picks) == n1 + 1 + n3
+    # 실패한 2일차는 days 순서 그 자리에 남습니다
+    assert picks[n1] == {'day': [2017, 1, '2', '20170101'], 'error': "ValueError: 경주를 찾을 수 없습니다."}
+    assert all('race_id' in p for p in picks[:n1] + picks[n1 + 1:])
@@ -0,0 +1,56 @@
+"""
+파티션 데이터셋으로 읽은 load_data / iter_data 가 CSV 경로와 값·타입까지 같은지 확인합니다.
+"""
+import shutil
+
+import pandas as pd
+import pytest
+
+from kcycle.loader import iter_data, load_data
+from kcycle.storage import PartitionedDataset, convert_csv
+
+
+@pytest.fixture(scope='module')
+def csv_dir(synthetic_dir):
+    return synthetic_dir(0.05, 1)
+
+
+def test_converted_dataset_matches_csv(csv_dir, tmp_path):
+    convert_csv(csv_dir / 'race_info.csv', tmp_path / 'race_info', 'race_info')
+    convert_csv(csv_dir / 'race_results.csv', tmp_path / 'race_results', 'race_results')
+
+    expected = load_data(data_dir=csv_dir, cache=False)
+    pd.testing.assert_frame_equal(load_data(data_dir=tmp_path), expected)
+    assert expected['승률'].dtype == 'int64' and expected['기어배수'].dtype == 'float64'
+
+    years = [int(expected['연도'].iloc[-1])]
+    pd.testing.assert_frame_equal(
+        load_data(columns=['race_id', '기어배수', 'rank'], years=years, data_dir=tmp_path),
+        load_data(columns=['race_id', '기어배수', 'rank'], years=years, data_dir=csv_dir, cache=False),
+    )
+
+
+def test_crawled_dataset_matches_csv(csv_dir, tmp_path):
+    # 크롤러 on_day 처럼 빈 칸이 '' 인 파서 출력 문자열을 일차별로 씁니다
+    for name, kind in (('race_info.csv', 'race_info'), ('race_results.csv', 'race_results')):
+        raw = pd.read_csv(csv_dir / name, dtype=str, keep_default_na=False)
+        ds  = PartitionedDataset(tmp_path / kind, kind)
+        for key, day in raw.groupby(raw['연도'] + '-' + raw['회차'] + '-' + raw['일차'], sort=False):
+            ds.write_day(key, day)
+
+    pd.testing.assert_frame_equal(load_data(data_dir=tmp_path), load_data(data_dir=csv_dir, cache=False))
+
+
+def test_iter_data_matches_csv(csv_dir, tmp_path):
+    shutil.copytree(csv_dir, tmp_path / 'csv')
+    convert_csv(csv_dir / 'race_info.csv', tmp_path / 'ds' / 'race_info', 'race_info')
+    convert_csv(csv_dir / 'race_results.csv', tmp_path / 'ds' / 'race_results', 'race_results')
+
+    from_csv = list(iter_data(20_000, data_dir=tmp_path / 'csv', cache=False))
+    from_ds  = list(iter_data(20_000, data_dir=tmp_path / 'ds'))
+    # 조각마다 타입을 추론하는 것은 read_csv(chunksize) 도 같으므로, 조각 경계가 다른 두 경로는 값만 비교합니다
+    pd.testing.assert_frame_equal(
+        pd.concat(from_ds, ignore_index=True), pd.concat(from_csv, ignore_index=True), check_dtype=False,
+    )
+    for chunk in from_ds:
+        assert chunk['승률'].dtype == 'int64' and chunk['기어배수'].dtype == 'float64'